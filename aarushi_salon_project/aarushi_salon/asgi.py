@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aarushi_salon.settings')
+# Route the booking APIs to their async views (see ASYNC_API_VIEWS in settings)
+os.environ.setdefault('SALON_ASYNC_API_VIEWS', '1')
 
 application = get_asgi_application()
@@ -24,7 +24,7 @@ urlpatterns = [
     path('', include('salon.urls')),
 ] + admin_urlpatterns
 
-# Serve media files in development
+# FileServingMiddleware serves these; this covers development with it switched off
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -1,15 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.admin import AdminSite
+from django.db import transaction
+from django.utils import timezone
 from django.utils.html import format_html
-from django.urls import path
+from django.contrib import messages
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.shortcuts import redirect
 from .models import (
     ServiceCategory, Service, TeamMember, Testimonial, CustomerFeedback,
     GalleryImage, BlogPost, BlogComment, ContactInfo, Appointment,
     SiteContent, ThemeSettings, SiteImages, ServiceIcons, SiteSettings,
     SEOSettings, GoogleAnalytics, SEOPageContent, BusinessHours, AppointmentSlot,
-    AppointmentService, ContactMessage
+    AppointmentService, ContactMessage, Task, Notification
 )
+from .db_functions import service_names_subquery
+from .exports import EXPORTS
+from .forms import SlotBulkActionForm
+from .notifications import send_pending_notifications
+from .appointment_utils import get_appointment_availability_manager
+from .profiling import PROFILE_NAME, TOKEN_HEADER, TOKEN_PARAM, get_profile_dir, list_profiles, make_token
+from .stats import get_dashboard_data, schedule_stats_refresh
+from .task_queue import enqueue
 
 
 class CustomAdminSite(AdminSite):
@@ -17,12 +33,102 @@ class CustomAdminSite(AdminSite):
     site_title = "Aarushi Salon Admin"
     index_title = "Welcome to Aarushi Salon Administration"
     site_url = "/"
+    dashboard_ranges = [7, 30, 90]
+
+    def get_urls(self):
+        urls = [
+            path('dashboard/', self.admin_view(self.dashboard_view), name='dashboard'),
+            path('profiling/', self.admin_view(self.profiling_view), name='profiling'),
+            path('profiling/<str:filename>', self.admin_view(self.profile_download_view), name='profile_download'),
+        ]
+        return urls + super().get_urls()
+
+    def dashboard_view(self, request):
+        """Operations dashboard, read from the DailyBookingStats/DailyServiceStats rollups"""
+        try:
+            days = int(request.GET.get('days', 30))
+        except ValueError:
+            days = 30
+        if days not in self.dashboard_ranges:
+            days = 30
+        today = timezone.localdate()
+        # Show the recent past plus the upcoming week of bookings
+        data = get_dashboard_data(today - timedelta(days=days - 1), today + timedelta(days=7))
+        context = {
+            **self.each_context(request),
+            'title': 'Operations dashboard',
+            'selected_days': days,
+            'dashboard_ranges': self.dashboard_ranges,
+            'today': today,
+            **data,
+        }
+        return TemplateResponse(request, 'admin/dashboard.html', context)
+
+    def profiling_view(self, request):
+        """Issue a profiling token and list the stored request profiles"""
+        context = {
+            **self.each_context(request),
+            'title': 'Request profiling',
+            'token': make_token(request.user),
+            'token_param': TOKEN_PARAM,
+            'token_header': TOKEN_HEADER,
+            'token_max_age': getattr(settings, 'PROFILE_TOKEN_MAX_AGE', 3600) // 60,
+            'profiling_enabled': getattr(settings, 'PROFILING_ENABLED', True),
+            'profiles': list_profiles(),
+        }
+        return TemplateResponse(request, 'admin/profiling.html', context)
+
+    def profile_download_view(self, request, filename):
+        if not PROFILE_NAME.match(filename) or not (get_profile_dir() / filename).is_file():
+            raise Http404('No such profile')
+        return FileResponse(open(get_profile_dir() / filename, 'rb'), as_attachment=True, filename=filename)
 
 
 # Create custom admin site instance
 admin_site = CustomAdminSite(name='custom_admin')
 
 
+class ServiceListFilter(admin.RelatedFieldListFilter):
+    """Service filter that loads categories up front (Service.__str__ uses the category name)"""
+
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin) or Service._meta.ordering
+        services = Service.objects.select_related('category').order_by(*ordering)
+        return [(service.pk, str(service)) for service in services]
+
+
+class ExportActionsMixin:
+    """Adds streaming CSV/NDJSON export actions backed by salon.exports.EXPORTS[export_name]"""
+    export_name = None
+    actions = ['export_as_csv', 'export_as_ndjson']
+
+    def export_as_csv(self, request, queryset):
+        return EXPORTS[self.export_name].response(queryset, 'csv')
+    export_as_csv.short_description = "Export selected rows as CSV"
+
+    def export_as_ndjson(self, request, queryset):
+        return EXPORTS[self.export_name].response(queryset, 'ndjson')
+    export_as_ndjson.short_description = "Export selected rows as NDJSON"
+
+
+class AppointmentColumnMixin:
+    """
+    Renders an ``appointment`` FK column without per-row queries.
+
+    The changelist queryset must select_related('appointment') and annotate
+    ``appointment_service_names`` with service_names_subquery('appointment').
+    """
+
+    def appointment_display(self, obj):
+        appointment = obj.appointment
+        if appointment is None:
+            return '-'
+        appointment.service_names = obj.appointment_service_names
+        return str(appointment)
+    appointment_display.short_description = "Appointment"
+    appointment_display.admin_order_field = "appointment"
+
+
 @admin.register(ServiceCategory, site=admin_site)
 class ServiceCategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'is_active', 'created_at']
@@ -61,7 +167,8 @@ class TestimonialAdmin(admin.ModelAdmin):
 
 
 @admin.register(CustomerFeedback, site=admin_site)
-class CustomerFeedbackAdmin(admin.ModelAdmin):
+class CustomerFeedbackAdmin(ExportActionsMixin, admin.ModelAdmin):
+    export_name = 'feedback'
     list_display = ['name', 'service_received', 'rating', 'status', 'is_featured', 'created_at']
     list_filter = ['rating', 'status', 'is_featured', 'is_anonymous', 'created_at']
     search_fields = ['name', 'email', 'service_received', 'feedback']
@@ -91,7 +198,8 @@ class BlogPostAdmin(admin.ModelAdmin):
 
 
 @admin.register(BlogComment, site=admin_site)
-class BlogCommentAdmin(admin.ModelAdmin):
+class BlogCommentAdmin(ExportActionsMixin, admin.ModelAdmin):
+    export_name = 'blog_comments'
     list_display = ['name', 'post', 'is_approved', 'created_at']
     list_filter = ['is_approved', 'created_at']
     search_fields = ['name', 'email', 'comment', 'post__title']
@@ -164,6 +272,7 @@ class ServiceIconsAdmin(admin.ModelAdmin):
     list_editable = ['is_active']
     ordering = ['service_category', 'icon_class']
     raw_id_fields = ['service_category']
+    list_select_related = ['service_category']
 
 
 @admin.register(SiteSettings, site=admin_site)
@@ -286,9 +395,9 @@ class BusinessHoursAdmin(admin.ModelAdmin):
 
 
 @admin.register(AppointmentSlot, site=admin_site)
-class AppointmentSlotAdmin(admin.ModelAdmin):
-    list_display = ['date', 'start_time', 'end_time', 'service', 'is_available', 'is_booked', 'appointment', 'created_at']
-    list_filter = ['date', 'is_available', 'is_booked', 'service__category', 'service', 'created_at']
+class AppointmentSlotAdmin(AppointmentColumnMixin, admin.ModelAdmin):
+    list_display = ['date', 'start_time', 'end_time', 'service', 'is_available', 'is_booked', 'appointment_display', 'created_at']
+    list_filter = ['date', 'is_available', 'is_booked', 'service__category', ('service', ServiceListFilter), 'created_at']
     search_fields = ['service__name', 'appointment__first_name', 'appointment__last_name']
     list_editable = ['is_available']
     ordering = ['date', 'start_time']
@@ -307,12 +416,92 @@ class AppointmentSlotAdmin(admin.ModelAdmin):
         }),
     )
 
+    actions = ['block_selected_slots', 'unblock_selected_slots', 'manage_range_for_services']
+
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('service', 'appointment')
+        return super().get_queryset(request).select_related('service__category', 'appointment').annotate(
+            appointment_service_names=service_names_subquery('appointment')
+        )
+
+    def get_urls(self):
+        urls = [
+            path('bulk/', self.admin_site.admin_view(self.bulk_slots_view), name='salon_appointmentslot_bulk'),
+        ]
+        return urls + super().get_urls()
+
+    def _set_selected_availability(self, queryset, is_available):
+        schedule_stats_refresh(*queryset.order_by().values_list('date', flat=True).distinct())
+        return queryset.update(is_available=is_available, updated_at=timezone.now())
+
+    def block_selected_slots(self, request, queryset):
+        # Booked slots are left to be rescheduled, not blocked under their appointment
+        booked = queryset.filter(is_booked=True).count()
+        updated = self._set_selected_availability(queryset.filter(is_booked=False), False)
+        message = f"Blocked {updated} slot(s)."
+        if booked:
+            message += f" Left {booked} booked slot(s) as they are; reschedule those appointments first."
+        self.message_user(request, message, messages.SUCCESS)
+    block_selected_slots.short_description = "Block selected slots"
+
+    def unblock_selected_slots(self, request, queryset):
+        updated = self._set_selected_availability(queryset, True)
+        self.message_user(request, f"Unblocked {updated} slot(s).", messages.SUCCESS)
+    unblock_selected_slots.short_description = "Unblock selected slots"
+
+    def manage_range_for_services(self, request, queryset):
+        service_ids = queryset.order_by().values_list('service_id', flat=True).distinct()
+        query = '&'.join(f'services={service_id}' for service_id in service_ids)
+        return redirect(f"{reverse('admin:salon_appointmentslot_bulk', current_app=self.admin_site.name)}?{query}")
+    manage_range_for_services.short_description = "Block/unblock a date range for the selected slots' services"
+
+    def bulk_slots_view(self, request):
+        """Block, unblock, mark holidays or regenerate a date range with set-based queries"""
+        if request.method == 'POST':
+            form = SlotBulkActionForm(request.POST)
+            if form.is_valid():
+                self.message_user(request, self.apply_bulk_operation(form.cleaned_data), messages.SUCCESS)
+                return redirect(reverse('admin:salon_appointmentslot_changelist', current_app=self.admin_site.name))
+        else:
+            form = SlotBulkActionForm(initial={'services': request.GET.getlist('services')})
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Bulk slot management',
+            'opts': self.model._meta,
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/salon/appointmentslot/bulk_slots.html', context)
+
+    def apply_bulk_operation(self, data):
+        """Run the requested operation in one transaction and describe what changed"""
+        manager = get_appointment_availability_manager()
+        operation = data['operation']
+        services = list(data['services'])
+        start_date, end_date = data['start_date'], data['end_date']
+
+        with transaction.atomic():
+            if operation == 'regenerate':
+                deleted, created = manager.regenerate_slots(start_date, end_date, services)
+                return f"Regenerated slots: removed {deleted} unbooked slot(s), created {created}."
+
+            if operation == 'holiday':
+                updated = manager.set_slots_availability(False, start_date, end_date, services)
+                booked = manager.slots_in_range(start_date, end_date, services).filter(is_booked=True).count()
+                message = f"Marked {start_date} to {end_date} as a holiday: blocked {updated} slot(s)."
+                if booked:
+                    message += f" {booked} booked slot(s) in this range need rescheduling."
+                return message
+
+            is_available = operation == 'unblock'
+            updated = manager.set_slots_availability(
+                is_available, start_date, end_date, services, data['start_time'], data['end_time']
+            )
+            return f"{'Unblocked' if is_available else 'Blocked'} {updated} slot(s)."
 
 
 @admin.register(Appointment, site=admin_site)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(ExportActionsMixin, admin.ModelAdmin):
+    export_name = 'appointments'
     list_display = ['full_name', 'get_services', 'preferred_date', 'preferred_time', 'status', 'booking_reference', 'total_price', 'created_at']
     list_filter = ['status', 'preferred_date', 'created_at']
     search_fields = ['first_name', 'last_name', 'email', 'phone', 'booking_reference']
@@ -340,33 +529,38 @@ class AppointmentAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related('services__service').select_related('appointment_slot')
+        return super().get_queryset(request).select_related('appointment_slot').annotate(
+            service_names=service_names_subquery()
+        )
 
     def get_services(self, obj):
         """Display services for this appointment"""
-        services = obj.services.all()
-        if services.exists():
-            return ", ".join([service.service.name for service in services])
-        return "No services"
+        return obj.get_service_names() or "No services"
     get_services.short_description = "Services"
 
 
 @admin.register(AppointmentService, site=admin_site)
-class AppointmentServiceAdmin(admin.ModelAdmin):
-    list_display = ['appointment', 'service', 'service_price', 'created_at']
+class AppointmentServiceAdmin(AppointmentColumnMixin, admin.ModelAdmin):
+    list_display = ['appointment_display', 'service', 'service_price', 'created_at']
     list_filter = ['service__category', 'created_at']
     search_fields = ['appointment__first_name', 'appointment__last_name', 'service__name']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
     raw_id_fields = ['appointment', 'service']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('appointment', 'service__category').annotate(
+            appointment_service_names=service_names_subquery('appointment')
+        )
+
     def service_price(self, obj):
         return f"${obj.service.price}"
     service_price.short_description = "Price"
 
 
 @admin.register(ContactMessage, site=admin_site)
-class ContactMessageAdmin(admin.ModelAdmin):
+class ContactMessageAdmin(ExportActionsMixin, admin.ModelAdmin):
+    export_name = 'contact_messages'
     list_display = ['name', 'email', 'subject', 'status', 'created_at']
     list_filter = ['status', 'created_at', 'subject']
     search_fields = ['name', 'email', 'subject', 'message']
@@ -388,6 +582,46 @@ class ContactMessageAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(Task, site=admin_site)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'error_summary', 'created_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedupe_key', 'last_error']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'finished_at', 'locked_by', 'locked_at', 'last_error']
+    actions = ['retry_tasks']
+
+    def error_summary(self, obj):
+        # The last line of the traceback names the exception
+        return obj.last_error.strip().splitlines()[-1][:120] if obj.last_error else ''
+    error_summary.short_description = "Last error"
+
+    def retry_tasks(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', attempts=0, run_at=timezone.now(), finished_at=None,
+        )
+        self.message_user(request, f"Queued {updated} task(s) to run again.", messages.SUCCESS)
+    retry_tasks.short_description = "Run selected tasks again"
+
+
+@admin.register(Notification, site=admin_site)
+class NotificationAdmin(admin.ModelAdmin):
+    # No foreign keys in the list: each would add a join or a query per row
+    list_display = ['kind', 'dedupe_key', 'recipients', 'status', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['dedupe_key', 'recipients']
+    ordering = ['-created_at']
+    raw_id_fields = ['appointment', 'contact_message']
+    readonly_fields = ['created_at', 'attempted_at', 'sent_at', 'error']
+    actions = ['resend_notifications']
+
+    def resend_notifications(self, request, queryset):
+        updated = queryset.exclude(status='sending').update(status='pending', error='')
+        enqueue(send_pending_notifications, dedupe_key='send_pending_notifications')
+        self.message_user(request, f"Queued {updated} email(s) to be sent again.", messages.SUCCESS)
+    resend_notifications.short_description = "Send selected emails again"
+
+
 # Custom admin URLs
 admin_urlpatterns = [
     path('admin/', admin_site.urls),
@@ -6,9 +6,71 @@ from django.views import View
 from django.utils import timezone
 from datetime import datetime, timedelta
 import json
+import logging
 
 from .models import Service, AppointmentSlot
-from .appointment_utils import get_appointment_availability_manager
+from .appointment_utils import get_appointment_availability_manager, available_slots
+
+
+logger = logging.getLogger(__name__)
+
+INVALID_SERVICE_IDS = 'Service IDs must be a list of integers'
+
+
+def _parse_service_ids(values):
+    """``values`` as a list of distinct ints, or None unless it is a list of integers or digit strings"""
+    if not isinstance(values, list):
+        return None
+    service_ids = []
+    for value in values:
+        # bool is an int subclass, but true is not service 1
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            return None
+        try:
+            service_ids.append(int(value))
+        except ValueError:
+            return None
+    return list(dict.fromkeys(service_ids))
+
+
+def _slot_data(slot, service):
+    return {
+        'start_time': slot.start_time.strftime('%H:%M'),
+        'end_time': slot.end_time.strftime('%H:%M'),
+        'display_time': slot.start_time.strftime('%I:%M %p'),
+        'service_id': service.id,
+        'service_name': service.name
+    }
+
+
+def _unique_slots(all_slots):
+    """Keep the first slot offered at each start time, sorted by time"""
+    unique_slots = {}
+    for slot in all_slots:
+        unique_slots.setdefault(slot['start_time'], slot)
+    return sorted(unique_slots.values(), key=lambda x: x['start_time'])
+
+
+def _date_data(date):
+    return {
+        'date': date.strftime('%Y-%m-%d'),
+        'display_date': date.strftime('%A, %B %d, %Y'),
+        'day_name': date.strftime('%A'),
+        'day_number': date.day,
+        'month_name': date.strftime('%B')
+    }
+
+
+def _service_data(service):
+    return {
+        'id': service.id,
+        'name': service.name,
+        'category': service.category.name,
+        'price': float(service.price),
+        'duration': service.duration,
+        'duration_minutes': service.duration_minutes,
+        'description': service.description
+    }
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -21,6 +83,9 @@ class GetAvailableSlotsView(View):
         
         if not service_ids or not date_str:
             return JsonResponse({'error': 'Service IDs and date are required'}, status=400)
+        service_ids = _parse_service_ids(service_ids)
+        if service_ids is None:
+            return JsonResponse({'error': INVALID_SERVICE_IDS}, status=400)
         
         try:
             # Parse date
@@ -36,28 +101,16 @@ class GetAvailableSlotsView(View):
             all_slots = []
             
             for service in services:
-                slots = availability_manager.get_available_slots(service.id, appointment_date, appointment_date)
-                print(f"Service {service.name}: Found {slots.count()} slots")
+                slots = list(availability_manager.get_available_slots(service.id, appointment_date, appointment_date))
+                logger.debug("Service %s: found %d slots", service.name, len(slots))
                 for slot in slots:
-                    all_slots.append({
-                        'start_time': slot.start_time.strftime('%H:%M'),
-                        'end_time': slot.end_time.strftime('%H:%M'),
-                        'display_time': slot.start_time.strftime('%I:%M %p'),
-                        'service_id': service.id,
-                        'service_name': service.name
-                    })
+                    all_slots.append(_slot_data(slot, service))
             
-            print(f"Total slots found: {len(all_slots)}")
+            logger.debug("Total slots found: %d", len(all_slots))
             
             # Remove duplicates and sort by time
-            unique_slots = {}
-            for slot in all_slots:
-                time_key = slot['start_time']
-                if time_key not in unique_slots:
-                    unique_slots[time_key] = slot
-            
-            slot_data = sorted(unique_slots.values(), key=lambda x: x['start_time'])
-            print(f"Unique slots: {len(slot_data)}")
+            slot_data = _unique_slots(all_slots)
+            logger.debug("Unique slots: %d", len(slot_data))
             
             return JsonResponse({
                 'success': True,
@@ -80,6 +133,9 @@ class GetAvailableDatesView(View):
         
         if not service_ids:
             return JsonResponse({'error': 'Service IDs are required'}, status=400)
+        service_ids = _parse_service_ids(service_ids)
+        if service_ids is None:
+            return JsonResponse({'error': INVALID_SERVICE_IDS}, status=400)
         
         try:
             # Get services
@@ -102,15 +158,7 @@ class GetAvailableDatesView(View):
                     all_dates.update(dates)
             
             # Format dates for frontend
-            date_data = []
-            for date in sorted(all_dates):
-                date_data.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'display_date': date.strftime('%A, %B %d, %Y'),
-                    'day_name': date.strftime('%A'),
-                    'day_number': date.day,
-                    'month_name': date.strftime('%B')
-                })
+            date_data = [_date_data(date) for date in sorted(all_dates)]
             
             return JsonResponse({
                 'success': True,
@@ -134,6 +182,9 @@ class CheckSlotAvailabilityView(View):
             
             if not all([service_ids, date_str, time_str]):
                 return JsonResponse({'error': 'Service IDs, date, and time are required'}, status=400)
+            service_ids = _parse_service_ids(service_ids)
+            if service_ids is None:
+                return JsonResponse({'error': INVALID_SERVICE_IDS}, status=400)
             
             # Parse date and time
             appointment_date = datetime.strptime(date_str, '%Y-%m-%d').date()
@@ -166,17 +217,7 @@ def get_services_api(request):
     try:
         services = Service.objects.filter(is_active=True).select_related('category')
         
-        service_data = []
-        for service in services:
-            service_data.append({
-                'id': service.id,
-                'name': service.name,
-                'category': service.category.name,
-                'price': float(service.price),
-                'duration': service.duration,
-                'duration_minutes': service.duration_minutes,
-                'description': service.description
-            })
+        service_data = [_service_data(service) for service in services]
         
         return JsonResponse({
             'success': True,
@@ -185,3 +226,132 @@ def get_services_api(request):
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+# Async versions of the booking APIs, routed instead of the views above when the site
+# is served over ASGI (settings.ASYNC_API_VIEWS). Each one runs a fixed number of
+# queries however many services are selected.
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncGetAvailableSlotsView(View):
+    """Async GetAvailableSlotsView"""
+
+    async def get(self, request):
+        service_ids = request.GET.getlist('service_id')
+        date_str = request.GET.get('date')
+
+        if not service_ids or not date_str:
+            return JsonResponse({'error': 'Service IDs and date are required'}, status=400)
+        service_ids = _parse_service_ids(service_ids)
+        if service_ids is None:
+            return JsonResponse({'error': INVALID_SERVICE_IDS}, status=400)
+
+        try:
+            appointment_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+
+            services = [
+                service async for service in
+                Service.objects.filter(id__in=service_ids, is_active=True).only('id', 'name')
+            ]
+            if not services:
+                return JsonResponse({'error': 'No valid services found'}, status=404)
+
+            slots_by_service = {service.id: [] for service in services}
+            async for slot in available_slots(list(slots_by_service), appointment_date, appointment_date):
+                slots_by_service[slot.service_id].append(slot)
+
+            all_slots = [
+                _slot_data(slot, service) for service in services for slot in slots_by_service[service.id]
+            ]
+            return JsonResponse({
+                'success': True,
+                'slots': _unique_slots(all_slots),
+                'date': appointment_date.strftime('%A, %B %d, %Y')
+            })
+
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date format'}, status=400)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncGetAvailableDatesView(View):
+    """Async GetAvailableDatesView"""
+
+    async def get(self, request):
+        service_ids = request.GET.getlist('service_id')
+
+        if not service_ids:
+            return JsonResponse({'error': 'Service IDs are required'}, status=400)
+        service_ids = _parse_service_ids(service_ids)
+        if service_ids is None:
+            return JsonResponse({'error': INVALID_SERVICE_IDS}, status=400)
+
+        try:
+            services = Service.objects.filter(id__in=service_ids, is_active=True)
+            if not await services.aexists():
+                return JsonResponse({'error': 'No valid services found'}, status=404)
+
+            # The services filter becomes a subquery of the dates query
+            active_ids = services.values('id')
+            dates = available_slots(active_ids).values_list('date', flat=True).distinct().order_by('date')
+            return JsonResponse({
+                'success': True,
+                'dates': [_date_data(date) async for date in dates]
+            })
+
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCheckSlotAvailabilityView(View):
+    """Async CheckSlotAvailabilityView"""
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body)
+            service_ids = data.get('service_ids', [])
+            date_str = data.get('date')
+            time_str = data.get('time')
+
+            if not all([service_ids, date_str, time_str]):
+                return JsonResponse({'error': 'Service IDs, date, and time are required'}, status=400)
+            service_ids = _parse_service_ids(service_ids)
+            if service_ids is None:
+                return JsonResponse({'error': INVALID_SERVICE_IDS}, status=400)
+
+            appointment_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            appointment_time = datetime.strptime(time_str, '%H:%M').time()
+
+            open_slots = AppointmentSlot.objects.filter(
+                service_id__in=service_ids, date=appointment_date, start_time=appointment_time,
+                is_available=True, is_booked=False
+            )
+            # Available when every service has an open slot at that time
+            available = await open_slots.values('service_id').distinct().acount()
+
+            return JsonResponse({
+                'success': True,
+                'is_available': available == len(service_ids)
+            })
+
+        except ValueError as e:
+            return JsonResponse({'error': f'Invalid date/time format: {str(e)}'}, status=400)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+async def async_get_services_api(request):
+    """Async get_services_api"""
+    try:
+        services = Service.objects.filter(is_active=True).select_related('category')
+        return JsonResponse({
+            'success': True,
+            'services': [_service_data(service) async for service in services]
+        })
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
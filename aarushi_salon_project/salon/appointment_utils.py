@@ -1,6 +1,30 @@
+from django.db import transaction
 from django.utils import timezone
 from datetime import datetime, timedelta, time
 from .models import BusinessHours, AppointmentSlot, Service
+from .stats import schedule_stats_refresh_range
+
+
+SLOT_DURATION_MINUTES = 60
+
+
+def available_slots(service_ids, start_date=None, end_date=None):
+    """
+    Queryset of bookable slots for any of ``service_ids`` (30 days from today by default).
+
+    Building it runs no queries, so async views can iterate it with ``async for``.
+    """
+    if not start_date:
+        start_date = timezone.now().date()
+    if not end_date:
+        end_date = start_date + timedelta(days=30)
+    return AppointmentSlot.objects.filter(
+        service_id__in=service_ids,
+        date__gte=start_date,
+        date__lte=end_date,
+        is_available=True,
+        is_booked=False
+    ).order_by('date', 'start_time')
 
 
 class AppointmentAvailabilityManager:
@@ -15,21 +39,7 @@ class AppointmentAvailabilityManager:
     
     def get_available_slots(self, service_id, start_date=None, end_date=None):
         """Get available appointment slots for a service within date range"""
-        if not start_date:
-            start_date = timezone.now().date()
-        if not end_date:
-            end_date = start_date + timedelta(days=30)
-        
-        # Get available slots
-        slots = AppointmentSlot.objects.filter(
-            service_id=service_id,
-            date__gte=start_date,
-            date__lte=end_date,
-            is_available=True,
-            is_booked=False
-        ).order_by('date', 'start_time')
-        
-        return slots
+        return available_slots([service_id], start_date, end_date)
     
     def get_available_slots_by_date(self, service_id, date):
         """Get available slots for a specific date"""
@@ -83,52 +93,109 @@ class AppointmentAvailabilityManager:
     
     def generate_slots_for_service(self, service, start_date, end_date):
         """Generate appointment slots for a service within date range"""
+        return self.bulk_generate_slots([service], start_date, end_date)
+    
+    def iter_slot_times(self, start_date, end_date):
+        """Yield ``(date, start_time, end_time)`` for every slot business hours allow in the range"""
         current_date = start_date
-        slots_created = 0
         
         while current_date <= end_date:
-            day_name = current_date.strftime('%A').lower()
-            
-            if day_name in self.business_hours and self.business_hours[day_name].is_open:
-                bh = self.business_hours[day_name]
-                slots_created += self._create_slots_for_date(current_date, bh, service)
+            bh = self.get_business_hours_for_date(current_date)
+            if bh and bh.is_open:
+                current_time = bh.open_time
+                while current_time < bh.close_time:
+                    slot_end_time = self._add_minutes_to_time(current_time, SLOT_DURATION_MINUTES)
+                    # Don't create slots that would go past closing time (or wrap past midnight)
+                    if slot_end_time > bh.close_time or slot_end_time <= current_time:
+                        break
+                    yield current_date, current_time, slot_end_time
+                    current_time = slot_end_time
             
             current_date += timedelta(days=1)
-        
-        return slots_created
     
-    def _create_slots_for_date(self, date, business_hours, service):
-        """Create appointment slots for a specific date and service"""
-        slots_created = 0
-        slot_duration = 60  # 60 minutes per slot
+    def bulk_generate_slots(self, services, start_date, end_date, batch_size=1000):
+        """
+        Create any missing slots for ``services`` in the range with batched INSERTs.
         
-        start_time = business_hours.open_time
-        end_time = business_hours.close_time
+        Returns how many slots the range gained, counted after the insert: rows a
+        concurrent run inserted first are skipped, not created here.
+        """
+        in_range = AppointmentSlot.objects.filter(date__gte=start_date, date__lte=end_date, service__in=services)
+        existing = set(in_range.values_list('date', 'start_time', 'service_id'))
+        new_slots = [
+            AppointmentSlot(
+                date=slot_date,
+                start_time=start_time,
+                end_time=end_time,
+                service=service,
+                is_available=True,
+                is_booked=False
+            )
+            for slot_date, start_time, end_time in self.iter_slot_times(start_date, end_date)
+            for service in services
+            if (slot_date, start_time, service.id) not in existing
+        ]
+        if not new_slots:
+            return 0
+        # ignore_conflicts covers a concurrent run inserting the same slot
+        AppointmentSlot.objects.bulk_create(new_slots, batch_size=batch_size, ignore_conflicts=True)
+        # bulk_create skips signals, so refresh the dashboard rollup here
+        schedule_stats_refresh_range(start_date, end_date)
+        return in_range.count() - len(existing)
+    
+    def slots_in_range(self, start_date, end_date, services=None, start_time=None, end_time=None):
+        """Slots between two dates (inclusive), optionally limited to services and a time window"""
+        slots = AppointmentSlot.objects.filter(date__gte=start_date, date__lte=end_date)
+        if services:
+            slots = slots.filter(service__in=services)
+        if start_time:
+            slots = slots.filter(start_time__gte=start_time)
+        if end_time:
+            slots = slots.filter(start_time__lt=end_time)
+        return slots
+    
+    def set_slots_availability(self, is_available, start_date, end_date, services=None,
+                               start_time=None, end_time=None):
+        """Block or unblock every slot in the range with one UPDATE; returns the row count"""
+        slots = self.slots_in_range(start_date, end_date, services, start_time, end_time)
+        updated = slots.update(is_available=is_available, updated_at=timezone.now())
+        schedule_stats_refresh_range(start_date, end_date)
+        return updated
+    
+    def regenerate_slots(self, start_date, end_date, services=None):
+        """
+        Bring unbooked slots in the range back in line with the current business hours.
         
-        current_time = start_time
-        while current_time < end_time:
-            slot_end_time = self._add_minutes_to_time(current_time, slot_duration)
-            
-            if slot_end_time <= end_time:
-                # Check if slot already exists
-                if not AppointmentSlot.objects.filter(
-                    date=date,
-                    start_time=current_time,
-                    service=service
-                ).exists():
-                    AppointmentSlot.objects.create(
-                        date=date,
-                        start_time=current_time,
-                        end_time=slot_end_time,
-                        service=service,
-                        is_available=True,
-                        is_booked=False
-                    )
-                    slots_created += 1
-            
-            current_time = slot_end_time
+        Slots that still fit the hours are unblocked in place, slots outside them are
+        deleted and missing ones are inserted. Booked slots, and slots linked to an
+        appointment, are left alone. Returns ``(deleted, created)``.
+        """
+        if not services:
+            services = list(Service.objects.filter(is_active=True))
+        wanted = {
+            (slot_date, start_time, service.id)
+            for slot_date, start_time, _ in self.iter_slot_times(start_date, end_date)
+            for service in services
+        }
         
-        return slots_created
+        with transaction.atomic():
+            unbooked = self.slots_in_range(start_date, end_date, services).filter(
+                is_booked=False, appointment__isnull=True, booked_appointment__isnull=True
+            )
+            stale_ids = [
+                pk for pk, slot_date, start_time, service_id
+                in unbooked.values_list('pk', 'date', 'start_time', 'service_id')
+                if (slot_date, start_time, service_id) not in wanted
+            ]
+            deleted = 0
+            for i in range(0, len(stale_ids), 500):
+                deleted += AppointmentSlot.objects.filter(pk__in=stale_ids[i:i + 500]).delete()[1].get(
+                    AppointmentSlot._meta.label, 0
+                )
+            unbooked.filter(is_available=False).update(is_available=True, updated_at=timezone.now())
+            created = self.bulk_generate_slots(services, start_date, end_date)
+            schedule_stats_refresh_range(start_date, end_date)
+        return deleted, created
     
     def _add_minutes_to_time(self, time_obj, minutes):
         """Add minutes to a time object"""
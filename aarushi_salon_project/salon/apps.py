@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class SalonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'salon'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import REGISTRY
+
+        # Workers that exited (or a previous deploy) must not be counted forever
+        REGISTRY.prune_dead_processes()
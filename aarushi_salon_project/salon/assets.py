@@ -0,0 +1,211 @@
+"""
+Bundled, minified, content-hashed static assets.
+
+``manage.py build_assets`` (run after collectstatic) concatenates each bundle in
+BUNDLES, minifies CSS, writes ``bundles/<name>.<hash>.<ext>`` into STATIC_ROOT
+with ``.gz`` (and, when the ``brotli`` package is installed, ``.br``) siblings,
+and records the hashed names in ``bundles/manifest.json``. The
+``{% asset_bundle %}`` tag links the built bundle, or the individual source
+files when no build exists, so development needs no build step. The build also
+extracts each page's above-the-fold CSS (salon.critical_css), which
+``{% critical_css %}`` inlines.
+
+CSS is minified conservatively: comments and redundant whitespace go, nothing
+else is rewritten. ``url()`` references are made relative to the bundle's
+directory and ``@import`` rules are hoisted to the top, where CSS requires
+them. The JS sources are already minified, so they are only concatenated.
+"""
+import gzip
+import hashlib
+import json
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone still works everywhere
+    brotli = None
+
+
+# Bundle name -> source files (static paths), in the order they were linked
+BUNDLES = {
+    'site.css': [
+        'lib/animate/animate.min.css',
+        'lib/lightbox/css/lightbox.min.css',
+        'lib/owlcarousel/assets/owl.carousel.min.css',
+        'css/bootstrap.min.css',
+        'css/style.css',
+        'css/salon-theme.css',
+        'css/perfectcut.css',
+    ],
+    'site.js': [
+        'lib/wow/wow.min.js',
+        'lib/easing/easing.min.js',
+        'lib/waypoints/waypoints.min.js',
+        'lib/counterup/counterup.min.js',
+        'lib/lightbox/js/lightbox.min.js',
+        'lib/owlcarousel/owl.carousel.min.js',
+        'js/main.js',
+    ],
+}
+
+BUNDLE_DIR = 'bundles'
+MANIFEST_NAME = f'{BUNDLE_DIR}/manifest.json'
+
+# Files worth precompressing, and those too small to gain from it
+COMPRESSIBLE_TYPES = ('.css', '.js', '.svg', '.json', '.txt', '.xml', '.html', '.map')
+MIN_COMPRESS_SIZE = 512
+
+# name.<12 hex>.ext, as written by build_assets (and Django's manifest storage)
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+
+# CSS
+
+_CSS_TOKENS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)''', re.S)
+_CSS_URL = re.compile(r'''url\(\s*(?:'([^']*)'|"([^"]*)"|([^)'"\s]*))\s*\)''')
+_CSS_IMPORT = re.compile(r'''@import\s+(?:url\((?:'[^']*'|"[^"]*"|[^)]*)\)|'[^']*'|"[^"]*")[^;]*;''')
+_CSS_CHARSET = re.compile(r'''@charset\s+("[^"]*"|'[^']*');''')
+_GOOGLE_FONTS_IMPORT = re.compile(r'''@import\s+(?:url\()?['"]?https?://fonts\.googleapis\.com/[^;]*;''')
+
+
+def minify_css(css):
+    """Drop comments (except /*! licences) and collapse whitespace, leaving strings untouched"""
+    out = []
+    position = 0
+    for match in _CSS_TOKENS.finditer(css):
+        out.append(css[position:match.start()])
+        position = match.end()
+        string, comment, _ = match.groups()
+        if string:
+            out.append(string)
+        elif comment:
+            if comment.startswith('/*!'):
+                out.append(comment + '\n')
+        else:
+            out.append(' ')
+    out.append(css[position:])
+    text = ''.join(out)
+    # Spaces around { } ; , > never matter; squeeze them outside strings only
+    pieces = re.split(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''', text)
+    for index in range(0, len(pieces), 2):
+        piece = re.sub(r'\s*([{};,>])\s*', r'\1', pieces[index])
+        pieces[index] = piece.replace(';}', '}')
+    return ''.join(pieces).strip()
+
+
+def rebase_css_urls(css, source, target):
+    """Rewrite relative url()s in ``source``'s CSS so they still resolve from ``target``"""
+    source_dir = posixpath.dirname(source)
+    target_dir = posixpath.dirname(target)
+
+    def rewrite(match):
+        url = next(group for group in match.groups() if group is not None)
+        if not url or url.startswith(('data:', 'http:', 'https:', '//', '/', '#', '%23')):
+            return match.group(0)
+        resolved = posixpath.normpath(posixpath.join(source_dir, url))
+        return f'url("{posixpath.relpath(resolved, target_dir)}")'
+
+    return _CSS_URL.sub(rewrite, css)
+
+
+def hoist_css_imports(css):
+    """Move @import rules to the top (they are ignored anywhere else) and drop @charset"""
+    css = _CSS_CHARSET.sub('', css)
+    imports = _CSS_IMPORT.findall(css)
+    return ''.join(imports) + _CSS_IMPORT.sub('', css)
+
+
+# Building
+
+def read_source(path):
+    found = finders.find(path)
+    if not found:
+        raise FileNotFoundError(f'Static file "{path}" not found')
+    return Path(found).read_text(encoding='utf-8')
+
+
+def build_bundle(name, sources):
+    """The text of bundle ``name`` before hashing"""
+    target = f'{BUNDLE_DIR}/{name}'
+    if name.endswith('.css'):
+        parts = [rebase_css_urls(read_source(source), source, target) for source in sources]
+        # Web fonts come self-hosted from the dynamic theme CSS (salon.fonts)
+        return hoist_css_imports(_GOOGLE_FONTS_IMPORT.sub('', minify_css('\n'.join(parts))))
+    # A missing semicolon at the end of one file must not join it to the next
+    return '\n;'.join(read_source(source).strip() for source in sources) + '\n'
+
+
+def hashed_name(name, content):
+    stem, ext = posixpath.splitext(name)
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    return f'{BUNDLE_DIR}/{stem}.{digest}{ext}'
+
+
+def precompress(path):
+    """Write ``.gz`` and ``.br`` siblings of ``path``; returns the suffixes written"""
+    data = path.read_bytes()
+    written = []
+    variants = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+    for suffix, compress in variants:
+        compressed = compress(data)
+        if len(compressed) < len(data):
+            path.with_name(path.name + suffix).write_bytes(compressed)
+            written.append(suffix)
+    return written
+
+
+def get_static_root():
+    return Path(settings.STATIC_ROOT)
+
+
+def load_manifest(root=None):
+    path = (root or get_static_root()) / MANIFEST_NAME
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+_manifest_cache = {}
+
+
+def bundle_path(name):
+    """The built, hashed static path of bundle ``name``, or None if there is no build"""
+    path = get_static_root() / MANIFEST_NAME
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    cached = _manifest_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, load_manifest())
+        _manifest_cache[path] = cached
+    return cached[1].get(name)
+
+
+def critical_key(view_name):
+    return f'critical/{view_name}'
+
+
+_critical_cache = {}
+
+
+def critical_css_for(view_name):
+    """The built critical CSS for the page at URL name ``view_name``, or '' if there is none"""
+    path = bundle_path(critical_key(view_name))
+    if not path:
+        return ''
+    # Hashed names never change content, so the text can be kept for good
+    if path not in _critical_cache:
+        try:
+            _critical_cache[path] = (get_static_root() / path).read_text(encoding='utf-8')
+        except OSError:
+            return ''
+    return _critical_cache[path]
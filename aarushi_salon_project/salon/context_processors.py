@@ -31,7 +31,7 @@ def service_icons_context(request):
     """Add service icons to all templates"""
     try:
         icons = {}
-        for icon in ServiceIcons.objects.filter(is_active=True):
+        for icon in ServiceIcons.objects.filter(is_active=True).select_related('service_category'):
             icons[icon.service_category.name] = icon
     except:
         icons = {}
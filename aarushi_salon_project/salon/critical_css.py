@@ -0,0 +1,208 @@
+"""
+Above-the-fold ("critical") CSS for the perfectcut pages.
+
+``build_assets`` renders each page in CRITICAL_PAGES (``render_page()``: the view
+is called directly as an anonymous visitor on SITEMAP_DOMAIN, and anything it
+writes is rolled back) and keeps the rules of the
+site CSS bundle whose selectors can match the page's first FOLD_SECTIONS
+``<section>`` elements (plus the spinner and header before them). The result
+is inlined into ``<head>`` and the full stylesheets load without blocking
+first paint (see ``{% critical_css %}``).
+
+Matching is by class, id and element name only, which errs on the side of
+keeping a rule: pseudo-classes, attribute selectors and combinators are
+ignored, so ``.navbar-nav .nav-link:hover`` is kept whenever both classes
+appear in the fold. @font-face and @import rules are left to the full
+stylesheet; @keyframes are kept if a kept rule names them.
+"""
+import re
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from .models import Service
+
+
+# URL names whose pages get critical CSS. blog_detail is left out because
+# rendering it counts as a view of the post.
+CRITICAL_PAGES = [
+    'salon:home', 'salon:about', 'salon:services', 'salon:service_detail', 'salon:pricing',
+    'salon:gallery', 'salon:team', 'salon:testimonials', 'salon:blog', 'salon:contact',
+    'salon:book_appointment',
+]
+
+# Hero plus the start of the next section is what a first screen shows
+FOLD_SECTIONS = 2
+
+# Always present, whatever the markup
+ROOT_ELEMENTS = {'html', 'body'}
+
+_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_PSEUDO = re.compile(r'::?[\w-]+(\((?:[^()]|\([^()]*\))*\))?')
+_ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+_CLASS = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+_ID = re.compile(r'#(-?[_a-zA-Z][\w-]*)')
+_ELEMENT = re.compile(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)')
+_KEYFRAMES = re.compile(r'^@(?:-[a-z]+-)?keyframes\s+(\S+)')
+
+
+class FoldParser(HTMLParser):
+    """Collects the element names, classes and ids in the body up to the fold"""
+
+    def __init__(self, sections=FOLD_SECTIONS):
+        super().__init__()
+        self.sections_left = sections
+        self.section_depth = 0
+        self.in_body = False
+        self.done = False
+        self.elements = set(ROOT_ELEMENTS)
+        self.classes = set()
+        self.ids = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            self.in_body = True
+        if not self.in_body or self.done:
+            return
+        if tag == 'footer':
+            self.done = True
+            return
+        if tag == 'section':
+            self.section_depth += 1
+        self.elements.add(tag)
+        for name, value in attrs:
+            if name == 'class' and value:
+                self.classes.update(value.split())
+            elif name == 'id' and value:
+                self.ids.add(value)
+
+    def handle_endtag(self, tag):
+        if tag == 'section' and self.in_body and not self.done:
+            self.section_depth -= 1
+            if self.section_depth == 0:
+                self.sections_left -= 1
+                self.done = self.sections_left <= 0
+
+
+def page_url(view_name):
+    """A URL to render for ``view_name``, or None if there's nothing to show (e.g. no active service)"""
+    if view_name == 'salon:service_detail':
+        service_id = Service.objects.filter(is_active=True).values_list('id', flat=True).first()
+        return reverse(view_name, args=[service_id]) if service_id else None
+    return reverse(view_name)
+
+
+def render_page(url):
+    """``(status, html)`` of ``url`` as an anonymous visitor sees it, without the middleware"""
+    match = resolve(url)
+    request = RequestFactory().get(
+        url, HTTP_HOST=settings.SITEMAP_DOMAIN, secure=settings.SITEMAP_PROTOCOL == 'https',
+    )
+    request.user = AnonymousUser()
+    request.resolver_match = match
+    with transaction.atomic():
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        # Building assets must not leave anything behind (view counters and the like)
+        transaction.set_rollback(True)
+    return response.status_code, response.content.decode(response.charset)
+
+
+def fold_selectors(html, sections=FOLD_SECTIONS):
+    """``(elements, classes, ids)`` used above the fold of a rendered page"""
+    parser = FoldParser(sections)
+    parser.feed(html)
+    parser.close()
+    return parser.elements, parser.classes, parser.ids
+
+
+def split_rules(css):
+    """Top-level ``(prelude, body)`` pairs; statements such as @import have a body of None"""
+    rules = []
+    start = depth = 0
+    prelude_end = None
+    index = 0
+    while index < len(css):
+        char = css[index]
+        if char in '"\'':
+            # Skip the string, honouring backslash escapes
+            index += 1
+            while index < len(css) and css[index] != char:
+                index += 2 if css[index] == '\\' else 1
+        elif css.startswith('/*', index):
+            end = css.find('*/', index + 2)
+            index = len(css) if end == -1 else end + 1
+        elif char == '{':
+            if depth == 0:
+                prelude_end = index
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((_COMMENT.sub('', css[start:prelude_end]).strip(), css[prelude_end + 1:index]))
+                start = index + 1
+        elif char == ';' and depth == 0:
+            rules.append((_COMMENT.sub('', css[start:index]).strip(), None))
+            start = index + 1
+        index += 1
+    return rules
+
+
+def split_selectors(prelude):
+    """Split a selector list on the commas that aren't inside :is()/:not() and friends"""
+    selectors, depth, start = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:index].strip())
+            start = index + 1
+    selectors.append(prelude[start:].strip())
+    return [selector for selector in selectors if selector]
+
+
+def selector_matches(selector, used):
+    elements, classes, ids = used
+    simple = _ATTRIBUTE.sub('', _PSEUDO.sub('', selector))
+    return (
+        set(_CLASS.findall(simple)) <= classes
+        and set(_ID.findall(simple)) <= ids
+        and {name.lower() for name in _ELEMENT.findall(simple)} <= elements
+    )
+
+
+def _extract(css, used, keyframes):
+    out = []
+    for prelude, body in split_rules(css):
+        if body is None:
+            continue
+        if prelude.startswith(('@media', '@supports')):
+            inner = _extract(body, used, keyframes)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            match = _KEYFRAMES.match(prelude)
+            if match:
+                keyframes.append((match.group(1), f'{prelude}{{{body}}}'))
+        else:
+            selectors = [selector for selector in split_selectors(prelude) if selector_matches(selector, used)]
+            if selectors:
+                out.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(out)
+
+
+def extract_critical_css(css, html, sections=FOLD_SECTIONS):
+    """The rules of (minified) ``css`` that can apply above the fold of ``html``"""
+    keyframes = []
+    critical = _extract(css, fold_selectors(html, sections), keyframes)
+    animations = ''.join(
+        rule for name, rule in keyframes if re.search(rf'(?<![\w-]){re.escape(name)}(?![\w-])', critical)
+    )
+    return critical + animations
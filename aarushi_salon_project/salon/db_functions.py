@@ -0,0 +1,37 @@
+from django.db.models import Aggregate, CharField, OuterRef, Subquery
+
+
+class GroupConcat(Aggregate):
+    """Join a column's values with ', ' (GROUP_CONCAT on SQLite/MySQL, STRING_AGG on PostgreSQL)"""
+    function = 'GROUP_CONCAT'
+    template = "%(function)s(%(expressions)s, ', ')"
+    output_field = CharField()
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template="%(function)s(%(expressions)s SEPARATOR ', ')",
+            **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            function='STRING_AGG',
+            template="%(function)s(%(expressions)s::text, ', ')",
+            **extra_context
+        )
+
+
+def service_names_subquery(appointment_ref='pk'):
+    """Correlated subquery returning an appointment's service names as one string"""
+    from .models import AppointmentService
+
+    names = (
+        AppointmentService.objects
+        .filter(appointment=OuterRef(appointment_ref))
+        .values('appointment')
+        .annotate(names=GroupConcat('service__name'))
+        .values('names')
+    )
+    return Subquery(names, output_field=CharField())
@@ -0,0 +1,65 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Set once the current request (or task) has written, so later reads see that write
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+_wrote_to_primary = ContextVar('wrote_to_primary', default=False)
+
+# Apps whose reads always hit the primary: a lagging replica would drop fresh logins and sessions
+PRIMARY_ONLY_APPS = {'auth', 'sessions'}
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_to_primary():
+    """Send every read in the current context to the primary"""
+    _pinned_to_primary.set(True)
+
+
+def has_written():
+    """Whether the current context has sent a write to the primary"""
+    return _wrote_to_primary.get()
+
+
+class PrimaryReplicaRouter:
+    """
+    Read from a replica in settings.DATABASE_REPLICAS and write to ``default``.
+
+    The first write in a context pins it to the primary, so a read following a
+    write in the same request never sees replication lag. Reads inside a
+    transaction on the primary stay there as well. ReplicaStickinessMiddleware
+    pins the admin and signed-in users' requests to the primary from the start.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if (
+            not replicas
+            or _pinned_to_primary.get()
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related lookups follow the object they start from
+            return instance._state.db
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if get_replicas():
+            _wrote_to_primary.set(True)
+            pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
@@ -0,0 +1,178 @@
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .db_functions import service_names_subquery
+from .models import Appointment, ContactMessage, CustomerFeedback, BlogComment
+
+
+class _Echo:
+    """File-like object whose write() hands the value back, so csv.writer can feed a generator"""
+
+    def write(self, value):
+        return value
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class DataExport:
+    """
+    Streams one model's rows as CSV or NDJSON.
+
+    ``columns`` is a list of ``(header, lookup)`` pairs passed to values_list(), so
+    related fields (``post__title``) and ``annotations`` are fetched in the same query.
+    Rows are read with .iterator(), keeping memory flat for any export size.
+    """
+
+    FORMATS = {
+        'csv': ('text/csv', 'csv'),
+        'ndjson': ('application/x-ndjson', 'ndjson'),
+    }
+
+    def __init__(self, name, model, columns, date_field='created_at', status_field=None, annotations=None):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+        self.status_field = status_field
+        self.annotations = annotations or {}
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def _day_bound(self, day):
+        """Convert a date into a filter value for ``date_field`` that keeps the lookup sargable"""
+        field = self.model._meta.get_field(self.date_field)
+        if isinstance(field, models.DateTimeField):
+            return timezone.make_aware(datetime.combine(day, time.min))
+        return day
+
+    def get_queryset(self, queryset=None, start_date=None, end_date=None, status=None):
+        """Apply the date range (inclusive) and status filters in SQL"""
+        if queryset is None:
+            queryset = self.model.objects.all()
+        if start_date:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': self._day_bound(start_date)})
+        if end_date:
+            queryset = queryset.filter(**{f'{self.date_field}__lt': self._day_bound(end_date + timedelta(days=1))})
+        if status:
+            if not self.status_field:
+                raise ValueError(f'{self.name} export has no status filter')
+            try:
+                # clean() checks the field's choices as well as converting the value
+                status = self.model._meta.get_field(self.status_field).clean(status, None)
+            except ValidationError as e:
+                raise ValueError(f'Invalid status for {self.name} export: {" ".join(e.messages)}')
+            queryset = queryset.filter(**{self.status_field: status})
+        return queryset
+
+    def rows(self, queryset):
+        """Yield value tuples in column order, fetching ``chunk_size`` rows at a time"""
+        chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+        queryset = queryset.annotate(**self.annotations).values_list(*[lookup for _, lookup in self.columns])
+        return queryset.iterator(chunk_size=chunk_size)
+
+    def stream(self, queryset, fmt='csv'):
+        """Yield the export as encoded text chunks (one header line plus one line per row)"""
+        if fmt == 'csv':
+            writer = csv.writer(_Echo())
+            yield writer.writerow(self.headers)
+            for row in self.rows(queryset):
+                yield writer.writerow(row)
+        elif fmt == 'ndjson':
+            headers = self.headers
+            for row in self.rows(queryset):
+                yield json.dumps(dict(zip(headers, row)), default=_json_default) + '\n'
+        else:
+            raise ValueError(f'Unknown export format: {fmt}')
+
+    def response(self, queryset, fmt='csv'):
+        """Return a StreamingHttpResponse that downloads the export"""
+        content_type, extension = self.FORMATS[fmt]
+        filename = f"{self.name}-{timezone.now():%Y%m%d-%H%M%S}.{extension}"
+        response = StreamingHttpResponse(self.stream(queryset, fmt), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+EXPORTS = {
+    'appointments': DataExport(
+        'appointments', Appointment,
+        columns=[
+            ('booking_reference', 'booking_reference'),
+            ('first_name', 'first_name'),
+            ('last_name', 'last_name'),
+            ('email', 'email'),
+            ('phone', 'phone'),
+            ('services', 'export_service_names'),
+            ('preferred_date', 'preferred_date'),
+            ('preferred_time', 'preferred_time'),
+            ('status', 'status'),
+            ('total_duration', 'total_duration'),
+            ('total_price', 'total_price'),
+            ('message', 'message'),
+            ('created_at', 'created_at'),
+        ],
+        date_field='preferred_date',
+        status_field='status',
+        annotations={'export_service_names': service_names_subquery()},
+    ),
+    'contact_messages': DataExport(
+        'contact_messages', ContactMessage,
+        columns=[
+            ('id', 'id'),
+            ('name', 'name'),
+            ('email', 'email'),
+            ('phone', 'phone'),
+            ('subject', 'subject'),
+            ('message', 'message'),
+            ('status', 'status'),
+            ('created_at', 'created_at'),
+        ],
+        status_field='status',
+    ),
+    'feedback': DataExport(
+        'feedback', CustomerFeedback,
+        columns=[
+            ('id', 'id'),
+            ('name', 'name'),
+            ('email', 'email'),
+            ('phone', 'phone'),
+            ('service_received', 'service_received'),
+            ('rating', 'rating'),
+            ('feedback', 'feedback'),
+            ('is_anonymous', 'is_anonymous'),
+            ('status', 'status'),
+            ('created_at', 'created_at'),
+        ],
+        status_field='status',
+    ),
+    'blog_comments': DataExport(
+        'blog_comments', BlogComment,
+        columns=[
+            ('id', 'id'),
+            ('post', 'post__title'),
+            ('post_slug', 'post__slug'),
+            ('name', 'name'),
+            ('email', 'email'),
+            ('comment', 'comment'),
+            ('is_approved', 'is_approved'),
+            ('created_at', 'created_at'),
+        ],
+        status_field='is_approved',
+    ),
+}
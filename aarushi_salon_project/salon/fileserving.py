@@ -0,0 +1,231 @@
+"""
+Production serving of STATIC_ROOT and MEDIA_ROOT (salon.middleware.FileServingMiddleware).
+
+Each root has a FileIndex: the first request for a path stats the file and its
+.br/.gz siblings and remembers that they exist, and the content type, for
+FILE_INDEX_TTL seconds, so a page's assets don't cost a stat apiece on every
+request. Misses are not remembered, so a fresh upload is served at once. The
+size, range bounds and validators come from fstat() of the file as opened, so
+a file replaced within the TTL is never sent with the old length or ETag.
+
+Responses are FileResponses, which WSGI servers with ``wsgi.file_wrapper``
+(gunicorn, uWSGI) send with sendfile(). They carry a strong ETag and
+Last-Modified, get 304 for If-None-Match/If-Modified-Since, and answer a
+single byte Range (honouring If-Range) with 206. Range requests get the
+uncompressed file; otherwise the precompressed sibling the client accepts is
+sent. Content-hashed names are cached for a year as immutable.
+"""
+import mimetypes
+import os
+import re
+import stat as stat_module
+import time
+from pathlib import Path
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .assets import COMPRESSIBLE_TYPES, HASHED_NAME
+from .metrics import cache_lookups
+
+
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class IndexedFile:
+    __slots__ = ('path', 'content_type', 'variants')
+
+    def __init__(self, path, content_type=None):
+        self.path = path
+        self.content_type = content_type
+        self.variants = {}
+
+
+def file_etag(stat, encoding=None):
+    # Each encoding is a different representation, so it needs its own strong ETag
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}' + (f'-{encoding}' if encoding else ''))
+
+
+class FileIndex:
+    """Which files exist under ``root`` (and their compressed siblings), each trusted for ``ttl`` seconds"""
+
+    max_entries = 10000
+
+    def __init__(self, root, ttl):
+        self.root = Path(root)
+        self.ttl = ttl
+        self._files = {}
+
+    def lookup(self, relative, now=None):
+        """The IndexedFile for ``relative``, or None if there's no such regular file"""
+        now = time.monotonic() if now is None else now
+        cached = self._files.get(relative)
+        if cached is not None and now - cached[0] < self.ttl:
+            cache_lookups.inc(cache='file_index', result='hit')
+            return cached[1]
+        cache_lookups.inc(cache='file_index', result='miss')
+        indexed = self._stat(relative)
+        if indexed is None:
+            self._files.pop(relative, None)
+            return None
+        if len(self._files) >= self.max_entries:
+            self._files.clear()
+        self._files[relative] = (now, indexed)
+        return indexed
+
+    def forget(self, relative):
+        self._files.pop(relative, None)
+
+    def _stat(self, relative):
+        try:
+            path = Path(safe_join(self.root, relative))
+            stat = path.stat()
+        except (SuspiciousFileOperation, OSError, ValueError):
+            return None
+        if not stat_module.S_ISREG(stat.st_mode):
+            return None
+        content_type, _ = mimetypes.guess_type(path.name)
+        indexed = IndexedFile(path, content_type or 'application/octet-stream')
+        if path.suffix in COMPRESSIBLE_TYPES:
+            for encoding, suffix in ENCODINGS:
+                sibling = path.with_name(path.name + suffix)
+                if sibling.is_file():
+                    indexed.variants[encoding] = IndexedFile(sibling)
+        return indexed
+
+
+def accepts_encoding(request, encoding):
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        token, _, params = part.strip().partition(';')
+        if token.strip().lower() == encoding:
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` for a single ``bytes=`` range of a ``size``-byte file.
+
+    None means ignore the header and send the whole file (multiple ranges, other
+    units, malformed); False means it can't be satisfied (416).
+    """
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    return start, min(int(last) + 1, size) if last else size
+
+
+def _if_range_matches(request, etag, mtime):
+    value = request.headers.get('If-Range')
+    if value is None:
+        return True
+    value = value.strip()
+    if value.startswith(('"', 'W/')):
+        # Strong comparison only
+        return value == etag
+    return parse_http_date_safe(value) == mtime
+
+
+class _FileSlice:
+    """``length`` bytes of ``handle`` from its current position, for a 206 body"""
+
+    def __init__(self, handle, length):
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
+
+
+def serve_file(request, index, relative, max_age):
+    """A response for ``relative`` under ``index``'s root, or None if there's no such file"""
+    indexed = index.lookup(relative)
+    if indexed is None:
+        return None
+
+    range_header = request.headers.get('Range')
+    chosen, encoding = indexed, None
+    if range_header is None:
+        for name, _ in ENCODINGS:
+            if name in indexed.variants and accepts_encoding(request, name):
+                chosen, encoding = indexed.variants[name], name
+                break
+
+    try:
+        handle = chosen.path.open('rb')
+    except OSError:
+        # Deleted since it was indexed
+        index.forget(relative)
+        return None
+    # The file as opened, which may have been replaced since it was indexed
+    stat = os.fstat(handle.fileno())
+    size, mtime, etag = stat.st_size, int(stat.st_mtime), file_etag(stat, encoding)
+
+    headers = HttpResponse(content_type=indexed.content_type)
+    headers['ETag'] = etag
+    headers['Last-Modified'] = http_date(mtime)
+    headers['Accept-Ranges'] = 'bytes'
+    if HASHED_NAME.search(indexed.path.name):
+        headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        headers['Cache-Control'] = f'public, max-age={max_age}'
+    if indexed.path.suffix in COMPRESSIBLE_TYPES:
+        headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        headers['Content-Encoding'] = encoding
+
+    start, end, status = 0, size, 200
+    conditional = get_conditional_response(request, etag=etag, last_modified=mtime, response=headers)
+    if conditional is not headers:
+        handle.close()
+        return conditional
+    if range_header is not None and _if_range_matches(request, etag, mtime):
+        byte_range = parse_range(range_header, size)
+        if byte_range is False:
+            handle.close()
+            headers.status_code = 416
+            headers['Content-Range'] = f'bytes */{size}'
+            return headers
+        if byte_range:
+            start, end = byte_range
+            status = 206
+
+    if request.method == 'HEAD':
+        handle.close()
+        response = headers
+        response.status_code = status
+    else:
+        if status == 206:
+            handle.seek(start)
+            handle = _FileSlice(handle, end - start)
+        response = FileResponse(handle, status=status, content_type=indexed.content_type, filename=indexed.path.name)
+        for header, value in headers.items():
+            if header != 'Content-Type':
+                response[header] = value
+    response['Content-Length'] = end - start
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+    return response
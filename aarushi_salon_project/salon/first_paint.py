@@ -0,0 +1,128 @@
+"""
+Lighthouse-style first-paint estimate for rendered pages (``manage.py measure_pages``).
+
+There is no browser here, so this follows the network model of Lighthouse's
+simulated throttling ("Slow 4G": 150 ms round trips, 1.6 Mbit/s). The HTML
+arrives over a new connection. Every render-blocking resource in ``<head>``
+must then arrive before the first paint. That means stylesheets (other than
+``media="print"`` and ``rel="preload"``) and scripts without async, defer or
+type="module". Each third-party origin costs a connection (DNS, TCP and TLS:
+three round trips), and the blocking requests run in parallel and share the
+bandwidth.
+
+Local files are counted at their transfer size: the ``.gz`` sibling when
+there is one, and the HTML gzipped. Third-party files are sized by
+downloading them only when asked; otherwise they count only for their round
+trips. The result is for comparing builds and settings, not a substitute for
+a real Lighthouse run.
+"""
+import gzip
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+
+SLOW_4G = {'rtt': 150, 'throughput_kbps': 1638.4}
+CONNECT_ROUND_TRIPS = 3
+
+
+class BlockingResourceParser(HTMLParser):
+    """Render-blocking stylesheets and scripts in <head>, and the size of inline <style>"""
+
+    def __init__(self):
+        super().__init__()
+        self.in_head = True
+        self.in_style = False
+        self.stylesheets = []
+        self.scripts = []
+        self.inline_css = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            self.in_head = False
+        if not self.in_head:
+            return
+        attrs = dict(attrs)
+        if tag == 'link' and (attrs.get('rel') or '').lower() == 'stylesheet' and attrs.get('href'):
+            if (attrs.get('media') or 'all').lower() not in ('print', 'none'):
+                self.stylesheets.append(attrs['href'])
+        elif tag == 'script' and attrs.get('src'):
+            if 'async' not in attrs and 'defer' not in attrs and attrs.get('type') != 'module':
+                self.scripts.append(attrs['src'])
+        elif tag == 'style':
+            self.in_style = True
+        elif tag == 'noscript':
+            # Its contents only apply with scripting off
+            self.in_head = False
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self.in_style = False
+        elif tag == 'noscript':
+            self.in_head = True
+        elif tag == 'head':
+            self.in_head = False
+
+    def handle_data(self, data):
+        if self.in_style:
+            self.inline_css += len(data.encode('utf-8'))
+
+
+def local_transfer_size(path, client):
+    """Bytes sent for same-origin ``path``: a static file (gzipped if precompressed) or a page"""
+    static_prefix = '/' + settings.STATIC_URL.strip('/') + '/'
+    if path.startswith(static_prefix):
+        relative = path[len(static_prefix):]
+        built = Path(settings.STATIC_ROOT) / relative
+        for candidate in (built.with_name(built.name + '.gz'), built):
+            if candidate.is_file():
+                return candidate.stat().st_size
+        found = finders.find(relative)
+        return Path(found).stat().st_size if found else 0
+    response = client.get(path)
+    content = b''.join(response.streaming_content) if response.streaming else response.content
+    return len(content)
+
+
+def external_transfer_size(url, timeout=10):
+    request = Request(url, headers={'Accept-Encoding': 'gzip', 'User-Agent': 'Mozilla/5.0 (measure_pages)'})
+    with urlopen(request, timeout=timeout) as response:
+        return len(response.read())
+
+
+def measure_page(html, client, fetch_external=False, network=SLOW_4G):
+    """Blocking resources and the estimated first paint (ms) of a rendered page"""
+    parser = BlockingResourceParser()
+    parser.feed(html)
+    parser.close()
+
+    blocking = []
+    for url in parser.stylesheets + parser.scripts:
+        parts = urlsplit(url)
+        if parts.netloc:
+            size = external_transfer_size(url) if fetch_external else 0
+            blocking.append((parts.netloc, url, size))
+        else:
+            blocking.append(('', url, local_transfer_size(parts.path, client)))
+
+    html_bytes = len(gzip.compress(html.encode('utf-8')))
+    rtt, kbps = network['rtt'], network['throughput_kbps']
+    # kbit/s is bits per ms, so bytes * 8 / kbps is ms on the wire
+    html_ms = (CONNECT_ROUND_TRIPS + 1) * rtt + html_bytes * 8 / kbps
+    latency = max(
+        ((CONNECT_ROUND_TRIPS if origin else 0) + 1) * rtt for origin, _, _ in blocking
+    ) if blocking else 0
+    blocking_bytes = sum(size for _, _, size in blocking)
+    return {
+        'blocking_requests': len(blocking),
+        'blocking_origins': len({origin for origin, _, _ in blocking if origin}),
+        'blocking_bytes': blocking_bytes,
+        'inline_css_bytes': parser.inline_css,
+        'html_bytes': html_bytes,
+        'first_paint_ms': html_ms + latency + blocking_bytes * 8 / kbps,
+        'blocking': [url for _, url, _ in blocking],
+    }
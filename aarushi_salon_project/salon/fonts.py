@@ -0,0 +1,291 @@
+"""
+Self-hosted, subsetted web fonts for the families ThemeSettings names.
+
+``vendor_fonts()`` runs from ``manage.py vendor_fonts`` and from a task queued
+whenever ThemeSettings is saved. For each family it:
+
+- asks the Google Fonts CSS API for the FONT_WEIGHTS it has, subset with
+  ``text=`` to the characters the site uses;
+- downloads the woff2 files into ``STATIC_ROOT/fonts`` under content-hashed
+  names, where they are served without another collectstatic;
+- records them in ``fonts.json``.
+
+The dynamic theme CSS reads that file and emits ``@font-face`` rules with
+``font-display: swap``, so pages make no third-party font requests. Until a
+family has been vendored (e.g. offline, or on a fresh checkout), the base
+template links it from Google Fonts instead (``{% theme_fonts_fallback %}``).
+
+The character set is Basic Latin, Latin-1 and common punctuation, plus every
+character in the page templates and in the text of the models the pages show.
+Text added later in another script falls back to the next font in the stack
+until the fonts are vendored again.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+from django.utils.text import slugify
+
+from .models import (
+    BlogPost, ContactInfo, GalleryImage, SEOPageContent, Service, ServiceCategory, SiteContent, SiteSettings,
+    TeamMember, Testimonial, ThemeSettings,
+)
+from .task_queue import task
+
+
+logger = logging.getLogger('salon.fonts')
+
+# What perfectcut.css uses when no theme is active
+DEFAULT_FONTS = {'heading': 'Playfair Display', 'body': 'Inter'}
+
+GOOGLE_FONTS_CSS = 'https://fonts.googleapis.com/css2'
+# Google only serves woff2 to browsers it knows support it
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+# Under STATIC_ROOT; face records name files relative to it, as {% static %} expects
+FONT_SUBDIR = 'fonts'
+MANIFEST = 'fonts.json'
+
+BASE_CHARACTERS = (
+    ''.join(chr(code) for code in range(0x20, 0x7f))
+    + ''.join(chr(code) for code in range(0xa0, 0x100))
+    + '–—‘’“”•…€₹™'
+)
+
+# Models whose text fields the pages show
+TEXT_MODELS = [
+    ServiceCategory, Service, TeamMember, Testimonial, GalleryImage, BlogPost, ContactInfo, SiteContent,
+    SiteSettings, SEOPageContent,
+]
+_TEMPLATE_SYNTAX = re.compile(r'\{%.*?%\}|\{\{.*?\}\}|\{#.*?#\}', re.S)
+
+# Google Fonts family names; anything else in ThemeSettings is ignored here
+FAMILY = re.compile(r'^[A-Za-z0-9][A-Za-z0-9 ]*$')
+_FACE = re.compile(r'@font-face\s*\{([^}]*)\}')
+_DESCRIPTOR = re.compile(r'([\w-]+)\s*:\s*([^;]+);')
+_WOFF2 = re.compile(r'''url\(\s*['"]?([^'")]+)['"]?\s*\)\s*format\(\s*['"]?woff2''')
+
+
+def get_font_dir():
+    return Path(settings.STATIC_ROOT) / FONT_SUBDIR
+
+
+def load_font_manifest(font_dir=None):
+    try:
+        return json.loads(((font_dir or get_font_dir()) / MANIFEST).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(font_dir, manifest):
+    path = font_dir / MANIFEST
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(temporary, path)
+
+
+_manifest_cache = {}
+
+
+def cached_font_manifest():
+    """fonts.json, re-read only when it changes (the theme CSS is served without queries)"""
+    path = get_font_dir() / MANIFEST
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return {}
+    cached = _manifest_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, load_font_manifest())
+        _manifest_cache[path] = cached
+    return cached[1]
+
+
+def theme_fonts(theme=None):
+    """``{'heading': family, 'body': family}`` from the active ThemeSettings, or the defaults"""
+    fonts = dict(DEFAULT_FONTS)
+    if theme is None:
+        theme = ThemeSettings.objects.filter(is_active=True).first()
+    if theme:
+        for role, family in (('heading', theme.heading_font), ('body', theme.body_font)):
+            family = (family or '').strip()
+            if FAMILY.match(family):
+                fonts[role] = family
+    return fonts
+
+
+def google_fonts_url(families, text=None):
+    query = '&'.join(
+        f"family={quote(family)}:wght@{';'.join(str(weight) for weight in weights)}" if weights
+        else f'family={quote(family)}'
+        for family, weights in families
+    )
+    if text:
+        query += f'&text={quote(text)}'
+    return f'{GOOGLE_FONTS_CSS}?{query}&display=swap'
+
+
+def font_faces(manifest=None):
+    """
+    ``(fonts, faces, fallback_url)`` for the dynamic theme CSS and the base template.
+
+    ``faces`` describes the vendored files of the theme's families (and
+    FONT_EXTRA_FAMILIES); ``fallback_url`` loads the rest from Google Fonts, or is ''.
+    """
+    manifest = cached_font_manifest() if manifest is None else manifest
+    fonts = manifest.get('theme') or dict(DEFAULT_FONTS)
+    vendored = manifest.get('families', {})
+    faces, missing = [], []
+    for family in dict.fromkeys([*fonts.values(), *settings.FONT_EXTRA_FAMILIES]):
+        if family in vendored:
+            faces.extend({'family': family, **face} for face in vendored[family]['faces'])
+        else:
+            missing.append((family, settings.FONT_WEIGHTS))
+    return fonts, faces, google_fonts_url(missing) if missing else ''
+
+
+# Vendoring
+
+class _TextParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.characters = set()
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self.skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self.skip:
+            self.skip -= 1
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.characters.update(data)
+
+
+def _text_fields(model):
+    return [
+        field.name for field in model._meta.concrete_fields
+        if isinstance(field, (models.CharField, models.TextField)) and not field.choices
+        and not isinstance(field, (models.EmailField, models.URLField, models.SlugField))
+    ]
+
+
+def _template_paths():
+    """The salon page templates (not the emails, which don't use the web fonts)"""
+    directories = [*settings.TEMPLATES[0]['DIRS'], Path(apps.get_app_config('salon').path) / 'templates']
+    for directory in directories:
+        yield from sorted(Path(directory, 'salon').glob('*.html'))
+
+
+def _text_characters(html):
+    parser = _TextParser()
+    parser.feed(html)
+    parser.close()
+    return parser.characters
+
+
+def site_characters():
+    """BASE_CHARACTERS plus every character in the page templates' text and the TEXT_MODELS rows"""
+    characters = set(BASE_CHARACTERS)
+    for path in _template_paths():
+        characters |= _text_characters(_TEMPLATE_SYNTAX.sub(' ', path.read_text(encoding='utf-8')))
+    for model in TEXT_MODELS:
+        for row in model.objects.values_list(*_text_fields(model)).iterator():
+            # Rich text fields hold HTML; only its text is shown
+            characters |= _text_characters(' '.join(value for value in row if value))
+    return ''.join(sorted(character for character in characters if character.isprintable()))
+
+
+def _fetch(url, timeout=30):
+    with urlopen(Request(url, headers={'User-Agent': USER_AGENT}), timeout=timeout) as response:
+        return response.read()
+
+
+def parse_font_faces(css):
+    """``[(style, weight, woff2 url)]`` from a Google Fonts stylesheet"""
+    faces = []
+    for body in _FACE.findall(css):
+        descriptors = {name.lower(): value.strip() for name, value in _DESCRIPTOR.findall(body + ';')}
+        match = _WOFF2.search(descriptors.get('src', ''))
+        if match:
+            faces.append((descriptors.get('font-style', 'normal'), descriptors.get('font-weight', '400'), match.group(1)))
+    return faces
+
+
+def vendor_family(family, text, font_dir):
+    """Download ``family`` subset to ``text`` into ``font_dir``; returns its face records"""
+    try:
+        css = _fetch(google_fonts_url([(family, settings.FONT_WEIGHTS)], text)).decode('utf-8')
+    except OSError as exc:
+        # Google answers 400 when a family lacks one of the weights; take what it has
+        logger.info('Fetching %s in weights %s failed (%s); trying its default weight', family, settings.FONT_WEIGHTS, exc)
+        css = _fetch(google_fonts_url([(family, None)], text)).decode('utf-8')
+
+    faces = []
+    for style, weight, url in parse_font_faces(css):
+        content = _fetch(url)
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        name = f"{slugify(family)}-{weight}{'-italic' if style == 'italic' else ''}.{digest}.woff2"
+        (font_dir / name).write_bytes(content)
+        faces.append({'style': style, 'weight': weight, 'file': f'{FONT_SUBDIR}/{name}'})
+    if not faces:
+        raise ValueError(f'Google Fonts returned no woff2 files for "{family}"')
+    return faces
+
+
+def vendor_fonts(fonts=None, force=False):
+    """
+    Record the theme's fonts and vendor any family not yet subset to the current text.
+
+    Returns the families downloaded. The theme is recorded first, so even when
+    the download fails the theme CSS switches to the new families (from Google).
+    """
+    font_dir = get_font_dir()
+    font_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_font_manifest(font_dir)
+    manifest['theme'] = fonts or theme_fonts()
+    manifest.setdefault('families', {})
+    _write_manifest(font_dir, manifest)
+
+    text = site_characters()
+    text_digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+    downloaded = []
+    for family in dict.fromkeys([*manifest['theme'].values(), *settings.FONT_EXTRA_FAMILIES]):
+        recorded = manifest['families'].get(family)
+        if recorded and recorded['text'] == text_digest and not force and all(
+            (font_dir / Path(face['file']).name).is_file() for face in recorded['faces']
+        ):
+            continue
+        manifest['families'][family] = {'text': text_digest, 'faces': vendor_family(family, text, font_dir)}
+        downloaded.append(family)
+        _write_manifest(font_dir, manifest)
+
+    _prune(font_dir, manifest)
+    return downloaded
+
+
+def _prune(font_dir, manifest):
+    """Delete font files no family refers to any more"""
+    keep = {Path(face['file']).name for family in manifest['families'].values() for face in family['faces']}
+    for path in font_dir.glob('*.woff2'):
+        if path.name not in keep:
+            path.unlink()
+
+
+@task(max_attempts=5, retry_delay=60)
+def vendor_theme_fonts():
+    downloaded = vendor_fonts()
+    if downloaded:
+        logger.info('Vendored fonts: %s', ', '.join(downloaded))
+
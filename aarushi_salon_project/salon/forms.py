@@ -1,8 +1,16 @@
+import json
+
 from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.core.validators import RegexValidator
+from django.db import transaction
+from django.http import JsonResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import CustomerFeedback, Appointment, Service, AppointmentSlot, AppointmentService
 from .appointment_utils import get_appointment_availability_manager
+from .metrics import cache_lookups
 
 class CustomerFeedbackForm(forms.ModelForm):
     class Meta:
@@ -211,36 +219,255 @@ class AppointmentBookingForm(forms.ModelForm):
     def save(self, commit=True):
         """Save the appointment with slot information and services"""
         appointment = super().save(commit=False)
-        
+
         if commit:
-            # Set the appointment date and time from the form fields
-            appointment.preferred_date = self.cleaned_data['appointment_date']
-            appointment.preferred_time = self.cleaned_data['appointment_time']
-            
-            # Save the appointment first
-            appointment.save()
-            
-            # Add selected services
-            services = self.cleaned_data['services']
-            for service in services:
-                AppointmentService.objects.create(
-                    appointment=appointment,
-                    service=service
-                )
-            
-            # Find and assign the appointment slot (use first service for slot)
-            if services:
-                try:
-                    slot = AppointmentSlot.objects.get(
-                        service=services[0],
-                        date=appointment.preferred_date,
-                        start_time=appointment.preferred_time
+            # One write transaction for the whole booking (BEGIN IMMEDIATE on SQLite)
+            with transaction.atomic():
+                # Set the appointment date and time from the form fields
+                appointment.preferred_date = self.cleaned_data['appointment_date']
+                appointment.preferred_time = self.cleaned_data['appointment_time']
+
+                # Save the appointment first
+                appointment.save()
+
+                # Add selected services
+                services = self.cleaned_data['services']
+                for service in services:
+                    AppointmentService.objects.create(
+                        appointment=appointment,
+                        service=service
                     )
-                    appointment.appointment_slot = slot
-                    appointment.save()
-                except AppointmentSlot.DoesNotExist:
-                    pass  # Handle gracefully if slot not found
-        
+
+                # Find and assign the appointment slot (use first service for slot)
+                if services:
+                    try:
+                        slot = AppointmentSlot.objects.get(
+                            service=services[0],
+                            date=appointment.preferred_date,
+                            start_time=appointment.preferred_time
+                        )
+                        appointment.appointment_slot = slot
+                        appointment.save()
+                    except AppointmentSlot.DoesNotExist:
+                        pass  # Handle gracefully if slot not found
+
         return appointment
 
 
+class SlotBulkActionForm(forms.Form):
+    """Admin form for blocking, unblocking or regenerating a range of appointment slots"""
+    OPERATION_CHOICES = [
+        ('block', 'Block slots in range'),
+        ('unblock', 'Unblock slots in range'),
+        ('holiday', 'Mark as holiday (block whole days)'),
+        ('regenerate', 'Regenerate unbooked slots from business hours'),
+    ]
+    MAX_RANGE_DAYS = 366
+
+    operation = forms.ChoiceField(choices=OPERATION_CHOICES)
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    start_time = forms.TimeField(
+        required=False, widget=forms.TimeInput(attrs={'type': 'time'}),
+        help_text='Optional - first slot start time to include (block/unblock only)'
+    )
+    end_time = forms.TimeField(
+        required=False, widget=forms.TimeInput(attrs={'type': 'time'}),
+        help_text='Optional - slots starting at or after this time are left alone (block/unblock only)'
+    )
+    services = forms.ModelMultipleChoiceField(
+        queryset=Service.objects.none(),
+        required=False,
+        widget=forms.CheckboxSelectMultiple,
+        help_text='Leave empty to apply to all services'
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['services'].queryset = Service.objects.filter(is_active=True).select_related('category')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+
+        if start_date and end_date:
+            if end_date < start_date:
+                raise forms.ValidationError("End date must be on or after the start date.")
+            if (end_date - start_date).days >= self.MAX_RANGE_DAYS:
+                raise forms.ValidationError(f"Ranges are limited to {self.MAX_RANGE_DAYS} days.")
+        if start_time and end_time and end_time <= start_time:
+            raise forms.ValidationError("End time must be after the start time.")
+        return cleaned_data
+
+
+# JSON intake for the booking and contact pages
+
+ACTIVE_SERVICES_CACHE_KEY = 'salon:active_service_ids'
+
+
+def active_service_ids():
+    """IDs of the active services, cached until a Service changes (see salon.signals)"""
+    ids = cache.get(ACTIVE_SERVICES_CACHE_KEY)
+    cache_lookups.inc(cache='active_service_ids', result='miss' if ids is None else 'hit')
+    if ids is None:
+        ids = frozenset(Service.objects.filter(is_active=True).values_list('id', flat=True))
+        cache.set(ACTIVE_SERVICES_CACHE_KEY, ids, 300)
+    return ids
+
+
+def forget_active_service_ids():
+    cache.delete(ACTIVE_SERVICES_CACHE_KEY)
+
+
+class JSONTextMixin:
+    """For fields fed from JSON: a value that isn't a string is an error, not str()'d"""
+    default_error_messages = {'invalid_type': 'Enter a text value.'}
+
+    def to_python(self, value):
+        # CharField would turn ["m"] into "['m']", and the date fields would crash on 20300101
+        if value is not None and not isinstance(value, str):
+            raise forms.ValidationError(self.error_messages['invalid_type'], code='invalid_type')
+        return super().to_python(value)
+
+
+class JSONCharField(JSONTextMixin, forms.CharField):
+    pass
+
+
+class JSONEmailField(JSONTextMixin, forms.EmailField):
+    pass
+
+
+class JSONDateField(JSONTextMixin, forms.DateField):
+    pass
+
+
+class JSONTimeField(JSONTextMixin, forms.TimeField):
+    pass
+
+
+class ServiceIdsField(forms.Field):
+    """A JSON list of active service IDs, checked against the cached set without a query"""
+    default_error_messages = {
+        'invalid': 'Enter a list of service IDs.',
+        'too_many': 'Choose at most %(limit)s services.',
+        'inactive': 'These services are not available: %(ids)s.',
+    }
+    max_services = 10
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return []
+        if not isinstance(value, list):
+            value = [value]
+        ids = []
+        for item in value:
+            # bool is an int subclass, but true is not service 1
+            if isinstance(item, bool) or not isinstance(item, (int, str)):
+                raise forms.ValidationError(self.error_messages['invalid'], code='invalid')
+            try:
+                ids.append(int(item))
+            except ValueError:
+                raise forms.ValidationError(self.error_messages['invalid'], code='invalid')
+        return list(dict.fromkeys(ids))
+
+    def validate(self, value):
+        super().validate(value)
+        if len(value) > self.max_services:
+            raise forms.ValidationError(self.error_messages['too_many'], code='too_many', params={'limit': self.max_services})
+        active_ids = active_service_ids()
+        unknown = [service_id for service_id in value if service_id not in active_ids]
+        if unknown:
+            raise forms.ValidationError(
+                self.error_messages['inactive'], code='inactive', params={'ids': ', '.join(map(str, unknown))}
+            )
+
+
+class JSONRequestForm(forms.Form):
+    """
+    A form bound to a JSON request body instead of POST data.
+
+    Build it with ``from_request()``: bodies over JSON_INTAKE_MAX_BYTES are turned
+    away from the Content-Length header before anything is read, and bodies that
+    aren't a JSON object fail validation without reaching the fields. Declare
+    the fields with the JSON* classes below, which reject values that aren't
+    strings. Nothing here touches the database, so malformed requests never
+    cost a write.
+    """
+    error_message = 'Please correct the highlighted fields.'
+
+    def __init__(self, *args, body_error=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.body_error = body_error
+
+    @classmethod
+    def from_request(cls, request):
+        limit = getattr(settings, 'JSON_INTAKE_MAX_BYTES', 16 * 1024)
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > limit or len(request.body) > limit:
+            return cls(data={}, body_error=(413, f'Request body is larger than {limit} bytes.'))
+        try:
+            data = json.loads(request.body)
+        except (UnicodeDecodeError, ValueError):
+            return cls(data={}, body_error=(400, 'Request body is not valid JSON.'))
+        if not isinstance(data, dict):
+            return cls(data={}, body_error=(400, 'Request body must be a JSON object.'))
+        return cls(data=data)
+
+    def is_valid(self):
+        return self.body_error is None and super().is_valid()
+
+    def error_response(self):
+        """A JSON 4xx describing what was wrong, field by field"""
+        if self.body_error:
+            status, message = self.body_error
+            return JsonResponse({'success': False, 'error': message, 'errors': {}}, status=status)
+        return JsonResponse({
+            'success': False,
+            'error': self.error_message,
+            'errors': self.errors.get_json_data(),
+        }, status=400)
+
+
+phone_validator = RegexValidator(r'^\+?[\d\s().-]{7,20}$', 'Enter a valid phone number.')
+
+
+class BookingRequestForm(JSONRequestForm):
+    """The booking page's JSON payload"""
+    full_name = JSONCharField(max_length=200)
+    email = JSONEmailField()
+    phone = JSONCharField(max_length=20, validators=[phone_validator])
+    date = JSONDateField(input_formats=['%Y-%m-%d'])
+    time = JSONTimeField(input_formats=['%H:%M', '%H:%M:%S'])
+    service_ids = ServiceIdsField()
+    service_category = JSONCharField(max_length=100, required=False)
+    message = JSONCharField(max_length=2000, required=False)
+
+    def clean_date(self):
+        date = self.cleaned_data['date']
+        if date < timezone.localdate():
+            raise forms.ValidationError('Choose a date that is not in the past.', code='past')
+        return date
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if 'full_name' in cleaned_data:
+            first_name, _, last_name = cleaned_data['full_name'].partition(' ')
+            cleaned_data['first_name'] = first_name[:100]
+            cleaned_data['last_name'] = last_name.strip()[:100]
+        return cleaned_data
+
+
+class ContactRequestForm(JSONRequestForm):
+    """The contact page's JSON payload"""
+    name = JSONCharField(max_length=100)
+    email = JSONEmailField()
+    phone = JSONCharField(max_length=20, required=False, validators=[phone_validator])
+    subject = JSONCharField(max_length=200)
+    message = JSONCharField(max_length=5000)
@@ -0,0 +1,101 @@
+"""
+Idempotency-Key support for the booking and contact POSTs.
+
+A client that may send the same submission twice (a double click, a mobile
+network retrying) puts a random key in the ``Idempotency-Key`` header. The
+first request with a key runs the view and stores its response in
+IdempotencyKey, in the same transaction as whatever the view wrote; later
+requests with that key get the stored response back, marked with
+``Idempotent-Replayed: true``, without running the view again. Reusing a key
+with a different body is answered 422.
+
+The key row is inserted before the view runs, so a duplicate that arrives
+while the first is still in progress waits on the unique index (or, on SQLite,
+for the write lock) and then replays. Keys expire after IDEMPOTENCY_KEY_TTL
+seconds; the task worker deletes them (``purge_expired_keys``). Requests
+without the header behave exactly as before.
+"""
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _expired_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600))
+
+
+def _error(message, status):
+    return JsonResponse({'success': False, 'error': message, 'errors': {}}, status=status)
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return _error(f'This {HEADER} was already used for a different request.', 422)
+    response = HttpResponse(record.body, status=record.status_code, content_type=record.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Make POSTs to ``view`` that carry an Idempotency-Key safe to repeat"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != 'POST' or key is None:
+            return view(request, *args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+            return _error(f'{HEADER} must be 1 to {MAX_KEY_LENGTH} printable characters.', 400)
+        try:
+            too_large = int(request.META.get('CONTENT_LENGTH') or 0) > getattr(settings, 'JSON_INTAKE_MAX_BYTES', 16 * 1024)
+        except ValueError:
+            too_large = False
+        if too_large:
+            # Rejected by the view without a write, so there is nothing to remember
+            return view(request, *args, **kwargs)
+
+        scope = request.resolver_match.view_name
+        request_hash = hashlib.sha256(request.body).hexdigest()
+        stored = IdempotencyKey.objects.filter(scope=scope, key=key, created_at__gte=_expired_before()).first()
+        if stored:
+            return _replay(stored, request_hash)
+
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.filter(scope=scope, key=key, created_at__lt=_expired_before()).delete()
+                record = IdempotencyKey.objects.create(
+                    scope=scope, key=key, request_hash=request_hash, status_code=0, content_type='', body='',
+                )
+                response = view(request, *args, **kwargs)
+                if response.status_code >= 500 or response.streaming:
+                    # Let the client retry
+                    record.delete()
+                else:
+                    record.status_code = response.status_code
+                    record.content_type = response['Content-Type']
+                    record.body = response.content.decode(response.charset)
+                    record.save(update_fields=['status_code', 'content_type', 'body'])
+                return response
+        except IntegrityError:
+            # Another request with this key committed first
+            stored = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+            if stored is None:
+                raise
+            return _replay(stored, request_hash)
+    return wrapper
+
+
+def purge_expired_keys():
+    """Delete keys older than IDEMPOTENCY_KEY_TTL; returns how many"""
+    return IdempotencyKey.objects.filter(created_at__lt=_expired_before()).delete()[0]
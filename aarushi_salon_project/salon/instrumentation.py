@@ -0,0 +1,96 @@
+"""
+Per-request cost accounting for RequestMetricsMiddleware.
+
+A ``RequestMetrics`` collector is bound to the current context while a sampled
+request runs. Queries are counted by an execute wrapper on every database
+connection, and template rendering is timed by the ``TimedDjangoTemplates``
+backend; both only do work when a collector is bound.
+"""
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Query count, SQL time and template time (seconds) for one request"""
+
+    __slots__ = ('queries', 'db_time', 'template_time', '_render_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._render_depth = 0
+
+
+def start_request_metrics():
+    """Bind a new collector to the current context; returns ``(metrics, token)``"""
+    metrics = RequestMetrics()
+    return metrics, _current_metrics.set(metrics)
+
+
+def stop_request_metrics(token):
+    _current_metrics.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper that adds each query's duration to the bound collector"""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def _install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_recorder():
+    """
+    Add record_query to every database connection.
+
+    It is installed on connect rather than per request so that queries from
+    async views, which run on a separate thread, are counted too.
+    """
+    connection_created.connect(_install_query_recorder, dispatch_uid='request_metrics_query_recorder')
+    for connection in connections.all(initialized_only=True):
+        _install_query_recorder(None, connection)
+
+
+class TimedTemplate(Template):
+    """Template that adds its render time to the bound collector (outermost render only)"""
+
+    def render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+        metrics._render_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics._render_depth -= 1
+            if not metrics._render_depth:
+                metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report their render time"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
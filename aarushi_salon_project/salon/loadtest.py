@@ -0,0 +1,249 @@
+"""
+Small HTTP load generator used by ``manage.py loadtest``.
+
+Each virtual user is a thread with its own keep-alive connection that runs a flow
+(a list of requests) in a loop until the time is up. Latencies are recorded per
+step so chatty pages can be compared endpoint by endpoint, and per flow
+iteration so runs can be compared end to end. Every user draws from its own
+seeded random generator, so the same seed replays the same choices.
+
+The ``booking`` flow creates real appointments: point it at a scratch database.
+Every virtual user shares one client IP, so start the server with
+SALON_RATE_LIMIT=0 or most requests will be answered 429 (see salon.ratelimit).
+"""
+import http.client
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+
+CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class Session:
+    """One virtual user: a keep-alive connection plus the latencies it measured"""
+
+    def __init__(self, base_url, results, flow='', seed=None):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=30)
+        self.host = parts.netloc
+        self.results = results
+        self.flow = flow
+        self.random = random.Random(seed)
+        self.cookies = {}
+
+    def request(self, step, method, path, params=None, payload=None, headers=None):
+        """Send one request and record it under ``step``; returns ``(status, body)``"""
+        if params:
+            path = f'{path}?{urlencode(params, doseq=True)}'
+        headers = {'Host': self.host, **(headers or {})}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers['Content-Type'] = 'application/json'
+
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            status = response.status
+            for header in response.headers.get_all('Set-Cookie') or ():
+                for name, morsel in SimpleCookie(header).items():
+                    self.cookies[name] = morsel.value
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            status, content = 0, b''
+        self.results.record(step, time.perf_counter() - started, status)
+        return status, content
+
+    def get_json(self, step, path, params=None):
+        status, content = self.request(step, 'GET', path, params)
+        return json.loads(content) if status == 200 else {}
+
+    def close(self):
+        self.connection.close()
+
+
+def api_flow(session):
+    """The booking page's API calls: services, then dates, slots and a slot check"""
+    services = session.get_json('api/services', '/api/services/').get('services', [])
+    if not services:
+        return
+    service_ids = [service['id'] for service in session.random.sample(services, min(2, len(services)))]
+    dates = session.get_json('api/available-dates', '/api/available-dates/', {'service_id': service_ids})
+    dates = dates.get('dates', [])
+    if not dates:
+        return
+    date = session.random.choice(dates)['date']
+    slots = session.get_json(
+        'api/available-slots', '/api/available-slots/', {'service_id': service_ids, 'date': date}
+    ).get('slots', [])
+    if slots:
+        session.request('api/check-slot-availability', 'POST', '/api/check-slot-availability/', payload={
+            'service_ids': service_ids, 'date': date, 'time': session.random.choice(slots)['start_time'],
+        })
+
+
+def booking_flow(session):
+    """A visitor booking online: home, services, the booking page and its API calls, then the booking"""
+    session.request('home', 'GET', '/')
+    session.request('services', 'GET', '/services/')
+    status, page = session.request('book-appointment', 'GET', '/book-appointment/')
+    token = CSRF_INPUT.search(page)
+    services = session.get_json('api/services', '/api/services/').get('services', [])
+    if not services or token is None:
+        session.results.record_booking(session.flow, False)
+        return
+    chosen = session.random.sample(services, min(3, len(services)))
+    service_ids = [service['id'] for service in chosen]
+    dates = session.get_json(
+        'api/available-dates', '/api/available-dates/', {'service_id': service_ids}
+    ).get('dates', [])
+    if not dates:
+        # Nothing bookable is a failed booking, the kind a load test is meant to expose
+        session.results.record_booking(session.flow, False)
+        return
+    date = session.random.choice(dates)['date']
+    slots = session.get_json(
+        'api/available-slots', '/api/available-slots/', {'service_id': service_ids, 'date': date}
+    ).get('slots', [])
+    if not slots:
+        session.results.record_booking(session.flow, False)
+        return
+    number = session.random.randrange(10 ** 6)
+    status, content = session.request('POST book-appointment', 'POST', '/book-appointment/', payload={
+        'full_name': f'Load Test {number}',
+        'email': f'loadtest+{number}@example.com',
+        'phone': f'555{number:07d}',
+        'service_category': chosen[0]['category'],
+        'service_ids': service_ids,
+        'date': date,
+        'time': session.random.choice(slots)['start_time'],
+        'message': 'Synthetic booking from manage.py loadtest',
+    }, headers={'X-CSRFToken': token.group(1).decode(), 'Referer': f'http://{session.host}/book-appointment/'})
+    try:
+        booked = status == 200 and json.loads(content).get('success') is True
+    except ValueError:
+        booked = False
+    session.results.record_booking(session.flow, booked)
+
+
+FLOWS = {
+    'api': api_flow,
+    'booking': booking_flow,
+}
+
+
+class Results:
+    """Thread-safe latency and status collection, grouped by step"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.flow_latencies = defaultdict(list)
+        self.bookings = defaultdict(lambda: [0, 0])
+
+    def record(self, step, seconds, status):
+        with self.lock:
+            self.latencies[step].append(seconds)
+            if not 200 <= status < 400:
+                self.errors[step] += 1
+
+    def record_flow(self, flow, seconds):
+        with self.lock:
+            self.flow_latencies[flow].append(seconds)
+
+    def record_booking(self, flow, succeeded):
+        with self.lock:
+            self.bookings[flow][0] += 1
+            if not succeeded:
+                self.bookings[flow][1] += 1
+
+    def summary(self, duration):
+        """Return one row per step: requests, req/s, p50/p95/p99 (ms) and error count"""
+        rows = []
+        steps = list(self.latencies) + (['total'] if len(self.latencies) > 1 else [])
+        for step in steps:
+            if step == 'total':
+                latencies = sorted(value for values in self.latencies.values() for value in values)
+                errors = sum(self.errors.values())
+            else:
+                latencies = sorted(self.latencies[step])
+                errors = self.errors[step]
+            rows.append({
+                'step': step,
+                'requests': len(latencies),
+                'rps': len(latencies) / duration,
+                'p50': percentile(latencies, 50) * 1000,
+                'p95': percentile(latencies, 95) * 1000,
+                'p99': percentile(latencies, 99) * 1000,
+                'errors': errors,
+            })
+        return rows
+
+    def flow_summary(self, duration):
+        """Return one row per flow: iterations, iterations/s, p50/p95/p99 (ms), bookings and booking error rate"""
+        rows = []
+        for flow, values in self.flow_latencies.items():
+            latencies = sorted(values)
+            attempts, failures = self.bookings.get(flow, (0, 0))
+            rows.append({
+                'flow': flow,
+                'iterations': len(latencies),
+                'rps': len(latencies) / duration,
+                'p50': percentile(latencies, 50) * 1000,
+                'p95': percentile(latencies, 95) * 1000,
+                'p99': percentile(latencies, 99) * 1000,
+                'bookings': attempts,
+                'booking_errors': failures,
+                'booking_error_rate': failures / attempts if attempts else 0.0,
+            })
+        return rows
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def run(base_url, flows, concurrency, duration, seed=None):
+    """
+    Run ``flows`` (``{name: flow}``) from ``concurrency`` virtual users for ``duration`` seconds.
+
+    Users are shared out between the flows round-robin; user ``n`` is seeded with
+    ``seed + n`` when a seed is given.
+    """
+    results = Results()
+    names = list(flows)
+    deadline = time.perf_counter() + duration
+
+    def user(number):
+        name = names[number % len(names)]
+        session = Session(base_url, results, name, None if seed is None else seed + number)
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                flows[name](session)
+                results.record_flow(name, time.perf_counter() - started)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=user, args=(number,)) for number in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
@@ -0,0 +1,128 @@
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from aarushi_salon.database import SQLITE_OPTIONS
+from salon.sqlite_profile import apply_sqlite_pragmas, get_sqlite_pragmas
+
+
+# Same shape as the available-slots lookup behind the booking page
+READ_SQL = (
+    'SELECT id, start_time, end_time FROM salon_appointmentslot '
+    'WHERE date = ? AND is_available = 1 AND is_booked = 0 ORDER BY start_time'
+)
+
+PROFILES = {
+    # What Django gives you out of the box: rollback journal and deferred transactions
+    'default': {'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, 'begin': 'BEGIN', 'timeout': 5},
+    'production': {'pragmas': None, 'begin': 'BEGIN IMMEDIATE', 'timeout': SQLITE_OPTIONS['timeout']},
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure read throughput while bookings are written, with and without the SQLite production profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Reader threads (default: 8)')
+        parser.add_argument('--writers', type=int, default=2, help='Booking writer threads (default: 2)')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per phase (default: 5)')
+        parser.add_argument('--profile', choices=['default', 'production', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        settings_dict = connections['default'].settings_dict
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # Work on a copy so the benchmark never writes to the real database
+            source = sqlite3.connect(f"file:{settings_dict['NAME']}?mode=ro", uri=True)
+            db_path = Path(tmp) / 'benchmark.sqlite3'
+            target = sqlite3.connect(db_path)
+            source.backup(target)
+            source.close()
+            target.close()
+
+            slots = self.connect(db_path, PROFILES['default']).execute(
+                'SELECT id, date FROM salon_appointmentslot'
+            ).fetchall()
+            if not slots:
+                raise CommandError('No appointment slots to benchmark against; generate slots first')
+
+            names = ['default', 'production'] if options['profile'] == 'both' else [options['profile']]
+            for name in names:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'Profile: {name}'))
+                idle = self.run_phase(db_path, PROFILES[name], slots, options['readers'], 0, options['duration'])
+                busy = self.run_phase(
+                    db_path, PROFILES[name], slots, options['readers'], options['writers'], options['duration']
+                )
+                duration = options['duration']
+                self.stdout.write(f"  reads/s, no writers:   {idle['reads'] / duration:10.0f}")
+                self.stdout.write(f"  reads/s, with writers: {busy['reads'] / duration:10.0f}")
+                self.stdout.write(f"  bookings/s:            {busy['writes'] / duration:10.0f}")
+                errors = busy['read_errors'] + busy['write_errors']
+                style = self.style.ERROR if errors else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"  'database is locked':  {errors:10d} "
+                    f"({busy['read_errors']} reads, {busy['write_errors']} bookings)"
+                ))
+
+    def connect(self, db_path, profile):
+        conn = sqlite3.connect(db_path, timeout=profile['timeout'], isolation_level=None, check_same_thread=False)
+        apply_sqlite_pragmas(conn, profile['pragmas'] or get_sqlite_pragmas(profile['timeout']))
+        return conn
+
+    def run_phase(self, db_path, profile, slots, readers, writers, duration):
+        counts = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+        dates = sorted({slot_date for _, slot_date in slots})
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            conn = self.connect(db_path, profile)
+            while not stop.is_set():
+                try:
+                    conn.execute(READ_SQL, (random.choice(dates),)).fetchall()
+                    count('reads')
+                except sqlite3.OperationalError:
+                    count('read_errors')
+            conn.close()
+
+        def writer():
+            conn = self.connect(db_path, profile)
+            while not stop.is_set():
+                slot_id = random.choice(slots)[0]
+                try:
+                    # Check the slot, then book it: the read-then-write pattern of the booking flow
+                    conn.execute(profile['begin'])
+                    conn.execute('SELECT is_booked FROM salon_appointmentslot WHERE id = ?', (slot_id,)).fetchone()
+                    conn.execute(
+                        'UPDATE salon_appointmentslot SET is_booked = NOT is_booked WHERE id = ?', (slot_id,)
+                    )
+                    conn.execute('COMMIT')
+                    count('writes')
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    count('write_errors')
+            conn.close()
+
+        # Switch the copy's journal mode before the threads start
+        self.connect(db_path, profile).close()
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return counts
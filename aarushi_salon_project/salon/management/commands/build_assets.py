@@ -0,0 +1,100 @@
+import json
+import os
+
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from salon.assets import (
+    BUNDLE_DIR, BUNDLES, COMPRESSIBLE_TYPES, MANIFEST_NAME, MIN_COMPRESS_SIZE, brotli, build_bundle,
+    critical_key, get_static_root, hashed_name, load_manifest, precompress,
+)
+from salon.critical_css import CRITICAL_PAGES, extract_critical_css, page_url, render_page
+
+
+class Command(BaseCommand):
+    help = (
+        'Bundle and minify the site CSS/JS into content-hashed files in STATIC_ROOT and precompress '
+        'static text files (.gz, plus .br with the brotli package), then extract each page\'s '
+        'above-the-fold CSS. Run after collectstatic and migrate.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-precompress', action='store_false', dest='precompress',
+                            help='Only build the bundles; skip .gz/.br files')
+        parser.add_argument('--no-critical', action='store_false', dest='critical',
+                            help="Skip rendering the pages to extract their critical CSS (needs the database)")
+
+    def handle(self, *args, **options):
+        root = get_static_root()
+        (root / BUNDLE_DIR).mkdir(parents=True, exist_ok=True)
+        previous = load_manifest(root)
+
+        manifest = {}
+        for name, sources in BUNDLES.items():
+            try:
+                content = build_bundle(name, sources).encode('utf-8')
+            except FileNotFoundError as exc:
+                raise CommandError(str(exc))
+            manifest[name] = hashed_name(name, content)
+            (root / manifest[name]).write_bytes(content)
+            source_size = sum(os.path.getsize(finders.find(source)) for source in sources)
+            self.stdout.write(
+                f'{manifest[name]}: {len(sources)} files, {source_size:,} -> {len(content):,} bytes'
+            )
+
+        if options['precompress']:
+            compressed = self.precompress_all(root)
+            formats = '.gz and .br' if brotli else '.gz (install brotli for .br)'
+            self.stdout.write(f'Precompressed {compressed} file(s) as {formats}')
+
+        if options['critical']:
+            site_css = (root / manifest['site.css']).read_text(encoding='utf-8')
+            manifest.update(self.build_critical(root, site_css))
+
+        # Write the manifest last, so pages never link a bundle that isn't there yet
+        manifest_path = root / MANIFEST_NAME
+        temporary = manifest_path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(temporary, manifest_path)
+        self.prune(root, set(manifest.values()) | set(previous.values()))
+        self.stdout.write(self.style.SUCCESS(f'Wrote {MANIFEST_NAME}'))
+
+    def build_critical(self, root, site_css):
+        """Render each page in CRITICAL_PAGES and write the part of the site CSS its fold uses"""
+        built = {}
+        for view_name in CRITICAL_PAGES:
+            url = page_url(view_name)
+            if url is None:
+                self.stdout.write(f'{view_name}: skipped, nothing to render')
+                continue
+            status, html = render_page(url)
+            if status != 200:
+                self.stderr.write(f'{view_name}: {url} returned {status}; left without critical CSS')
+                continue
+            critical = extract_critical_css(site_css, html).encode('utf-8')
+            path = hashed_name(f'critical-{view_name.split(":")[-1]}.css', critical)
+            (root / path).write_bytes(critical)
+            built[critical_key(view_name)] = path
+            self.stdout.write(f'{path}: {len(critical):,} bytes inlined on {url}')
+        return built
+
+    def precompress_all(self, root):
+        count = 0
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = root.joinpath(directory, filename)
+                if path.suffix not in COMPRESSIBLE_TYPES or path.stat().st_size < MIN_COMPRESS_SIZE:
+                    continue
+                sibling = path.with_name(path.name + '.gz')
+                if sibling.exists() and sibling.stat().st_mtime >= path.stat().st_mtime:
+                    continue
+                if precompress(path):
+                    count += 1
+        return count
+
+    def prune(self, root, keep):
+        """Delete bundles from older builds; the previous build's stay for pages still cached"""
+        for path in (root / BUNDLE_DIR).iterdir():
+            name = f'{BUNDLE_DIR}/{path.name}'
+            base = name.removesuffix('.gz').removesuffix('.br')
+            if name != MANIFEST_NAME and base not in keep:
+                path.unlink()
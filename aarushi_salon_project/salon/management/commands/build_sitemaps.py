@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from salon.sitemap_utils import build_sitemaps, get_sitemap_root
+
+
+class Command(BaseCommand):
+    help = 'Prebuild sitemap.xml, the per-section sitemaps and their gzip variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Directory to write to (defaults to SITEMAP_ROOT)')
+
+    def handle(self, *args, **options):
+        root = options['output'] or get_sitemap_root()
+        written = build_sitemaps(root)
+        for filename in written:
+            self.stdout.write(f'Wrote {filename} (+ {filename}.gz)')
+        self.stdout.write(self.style.SUCCESS(f'Built {len(written)} sitemap files in {root}'))
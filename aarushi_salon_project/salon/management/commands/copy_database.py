@@ -0,0 +1,116 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.migrations.recorder import MigrationRecorder
+
+from aarushi_salon.database import parse_database_url, sqlite_config
+
+
+SOURCE_ALIAS = 'copy_source'
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy every table from a SQLite database (or any DATABASE_URL) into the configured database, '
+        'streaming rows in batches. Existing rows in the target are replaced.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', default=str(settings.BASE_DIR / 'db.sqlite3'),
+            help='SQLite file or database URL to read from (default: db.sqlite3)'
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Target database alias (default: default)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per read and insert (default: 1000)')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not prompt before replacing the target data')
+
+    def handle(self, *args, **options):
+        source_config = parse_database_url(options['source']) if '://' in options['source'] else (
+            sqlite_config(options['source'])
+        )
+        # Register the source as a regular alias so the ORM can read from it
+        connections.settings[SOURCE_ALIAS] = connections.configure_settings(
+            {DEFAULT_DB_ALIAS: source_config}
+        )[DEFAULT_DB_ALIAS]
+        source, target = connections[SOURCE_ALIAS], connections[options['database']]
+
+        self.check_migrations(source, target)
+        models = [
+            model for model in apps.get_models(include_auto_created=True)
+            if model._meta.managed and not model._meta.proxy
+            and router.allow_migrate_model(target.alias, model)
+        ]
+
+        if options['interactive']:
+            answer = input(
+                f"This replaces all data in the '{target.alias}' database ({target.settings_dict['NAME']}) "
+                f"with {options['source']}. Type 'yes' to continue: "
+            )
+            if answer != 'yes':
+                raise CommandError('Copy cancelled.')
+
+        # Foreign keys are created DEFERRABLE INITIALLY DEFERRED, so tables can be
+        # loaded in any order as long as everything happens in one transaction
+        with transaction.atomic(using=target.alias):
+            with target.cursor() as cursor:
+                tables = [model._meta.db_table for model in models]
+                for sql in target.ops.sql_flush(no_style(), tables, allow_cascade=True):
+                    cursor.execute(sql)
+
+                for model in models:
+                    copied = self.copy_model(model, source, target, cursor, options['batch_size'])
+                    self.stdout.write(f'{model._meta.db_table}: {copied} row(s)')
+
+                for sql in target.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+
+        source.close()
+        self.stdout.write(self.style.SUCCESS(f'Copied {len(models)} tables into the {target.alias} database'))
+
+    def check_migrations(self, source, target):
+        """Refuse to copy between databases whose schemas are at different migrations"""
+        applied = {}
+        for connection in (source, target):
+            recorder = MigrationRecorder(connection)
+            if not recorder.has_table():
+                raise CommandError(f"The {connection.alias} database has not been migrated")
+            applied[connection.alias] = set(recorder.applied_migrations())
+        missing_in_target = applied[source.alias] - applied[target.alias]
+        missing_in_source = applied[target.alias] - applied[source.alias]
+        if missing_in_target or missing_in_source:
+            details = [f'{app}.{name} not applied to {target.alias}' for app, name in sorted(missing_in_target)]
+            details += [f'{app}.{name} not applied to the source' for app, name in sorted(missing_in_source)]
+            raise CommandError(
+                'Source and target are at different migrations; run migrate on both first:\n  '
+                + '\n  '.join(details)
+            )
+
+    def copy_model(self, model, source, target, cursor, batch_size):
+        """Stream one table from source to target, returning the number of rows"""
+        fields = [field for field in model._meta.local_concrete_fields if not getattr(field, 'generated', False)]
+        columns = ', '.join(target.ops.quote_name(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = f'INSERT INTO {target.ops.quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+
+        # Raw inserts keep stored values as they are (the ORM would reset auto_now fields)
+        rows = (
+            model._base_manager.using(source.alias)
+            .order_by('pk')
+            .values_list(*[field.attname for field in fields])
+            .iterator(chunk_size=batch_size)
+        )
+        copied = 0
+        batch = []
+        for row in rows:
+            batch.append([field.get_db_prep_save(value, target) for field, value in zip(fields, row)])
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                copied += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            copied += len(batch)
+        return copied
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from salon.exports import EXPORTS
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Stream appointments, contact messages, feedback or blog comments to CSV/NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('export', choices=sorted(EXPORTS), help='What to export')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--start-date', type=parse_date, help='First day to include (YYYY-MM-DD)')
+        parser.add_argument('--end-date', type=parse_date, help='Last day to include (YYYY-MM-DD)')
+        parser.add_argument('--status', help='Only export rows with this status (True/False for blog comments)')
+        parser.add_argument('--output', help='File to write to (defaults to stdout)')
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options['export']]
+        try:
+            queryset = export.get_queryset(
+                start_date=options['start_date'],
+                end_date=options['end_date'],
+                status=options['status'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not options['output']:
+            for chunk in export.stream(queryset, options['format']):
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            for chunk in export.stream(queryset, options['format']):
+                output.write(chunk)
+
+        self.stderr.write(self.style.SUCCESS(f'Exported {export.name} to {options["output"]}'))
@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand
+from salon.loadtest import FLOWS, run
+
+
+class Command(BaseCommand):
+    help = 'Replay traffic flows against a running server and report throughput, latency percentiles and booking errors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server to test (default: http://127.0.0.1:8000)')
+        parser.add_argument(
+            '--flow', action='append', choices=sorted(FLOWS), dest='flows',
+            help='Traffic to replay; repeat to mix flows, users are shared out between them (default: api)',
+        )
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent virtual users (default: 50)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run (default: 10)')
+        parser.add_argument('--seed', type=int, default=None, help='Seed the virtual users for a repeatable run')
+        parser.add_argument('--json', metavar='PATH', help='Also write the report to PATH, for comparing runs')
+
+    def handle(self, *args, **options):
+        names = list(dict.fromkeys(options['flows'] or ['api']))
+        self.stdout.write(
+            f"Running the {', '.join(names)} flow(s) against {options['url']} "
+            f"with {options['concurrency']} users for {options['duration']:g}s"
+        )
+        results, elapsed = run(
+            options['url'], {name: FLOWS[name] for name in names},
+            options['concurrency'], options['duration'], options['seed'],
+        )
+        steps = results.summary(elapsed)
+        flows = results.flow_summary(elapsed)
+
+        self.stdout.write(f"{'step':<32}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for row in steps:
+            line = (
+                f"{row['step']:<32}{row['requests']:>10}{row['rps']:>10.1f}"
+                f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}{row['errors']:>8}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'flow':<32}{'runs':>10}{'runs/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'bookings':>10}{'failed':>8}"
+        )
+        for row in flows:
+            line = (
+                f"{row['flow']:<32}{row['iterations']:>10}{row['rps']:>10.1f}"
+                f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}"
+                f"{row['bookings']:>10}{row['booking_error_rate']:>8.1%}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['booking_errors'] else line)
+
+        if options['json']:
+            with open(options['json'], 'w') as report:
+                json.dump({
+                    'url': options['url'],
+                    'concurrency': options['concurrency'],
+                    'duration': elapsed,
+                    'seed': options['seed'],
+                    'steps': steps,
+                    'flows': flows,
+                }, report, indent=2)
+            self.stdout.write(f"Report written to {options['json']}")
@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from salon.critical_css import CRITICAL_PAGES, page_url
+from salon.first_paint import SLOW_4G, measure_page
+
+
+MODES = [('before', False), ('after', True)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Estimate first paint for each page on a throttled connection, with CRITICAL_CSS off (before) and on '
+        '(after). Run build_assets first so there is critical CSS to inline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', action='append', dest='pages', metavar='URL_NAME',
+                            help='Page to measure, e.g. salon:home; repeat for more (default: every critical page)')
+        parser.add_argument('--rtt', type=float, default=SLOW_4G['rtt'], help='Round trip in ms (default: 150)')
+        parser.add_argument('--throughput', type=float, default=SLOW_4G['throughput_kbps'],
+                            help='Bandwidth in kbit/s (default: 1638.4)')
+        parser.add_argument('--fetch-external', action='store_true',
+                            help='Download third-party stylesheets/scripts to count their size (needs network)')
+        parser.add_argument('--json', metavar='PATH', help='Also write the measurements to PATH')
+
+    def handle(self, *args, **options):
+        network = {'rtt': options['rtt'], 'throughput_kbps': options['throughput']}
+        client = Client()
+        rows = []
+        for view_name in options['pages'] or CRITICAL_PAGES:
+            url = page_url(view_name)
+            if url is None:
+                continue
+            for mode, critical in MODES:
+                with override_settings(CRITICAL_CSS=critical):
+                    response = client.get(url)
+                    html = response.content.decode(response.charset)
+                    measured = measure_page(html, client, options['fetch_external'], network)
+                rows.append({'page': view_name, 'url': url, 'mode': mode, **measured})
+
+        self.stdout.write(
+            f"{'page':<28}{'mode':<8}{'blocking':>10}{'origins':>9}{'block KB':>10}"
+            f"{'inline KB':>11}{'HTML KB':>9}{'paint ms':>10}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['page']:<28}{row['mode']:<8}{row['blocking_requests']:>10}{row['blocking_origins']:>9}"
+                f"{row['blocking_bytes'] / 1024:>10.1f}{row['inline_css_bytes'] / 1024:>11.1f}"
+                f"{row['html_bytes'] / 1024:>9.1f}{row['first_paint_ms']:>10.0f}"
+            )
+
+        before = [row['first_paint_ms'] for row in rows if row['mode'] == 'before']
+        after = [row['first_paint_ms'] for row in rows if row['mode'] == 'after']
+        if before:
+            mean_before, mean_after = sum(before) / len(before), sum(after) / len(after)
+            self.stdout.write('')
+            self.stdout.write(
+                f'Mean estimated first paint: {mean_before:.0f} ms before, {mean_after:.0f} ms after '
+                f'({mean_after - mean_before:+.0f} ms)'
+            )
+        if not options['fetch_external']:
+            self.stdout.write('Third-party files counted for round trips only; add --fetch-external to size them')
+
+        if options['json']:
+            with open(options['json'], 'w') as report:
+                json.dump({'network': network, 'pages': rows}, report, indent=2)
+            self.stdout.write(f"Wrote {options['json']}")
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+from salon.models import Appointment, AppointmentSlot, CustomerFeedback, Testimonial
+from salon.stats import refresh_stats_range
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Backfill or repair the daily booking rollups shown on the admin dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', type=parse_date, help='First day to rebuild (defaults to the earliest data)')
+        parser.add_argument('--end-date', type=parse_date, help='Last day to rebuild (defaults to the latest data)')
+
+    def handle(self, *args, **options):
+        start_date, end_date = options['start_date'], options['end_date']
+        if not start_date or not end_date:
+            bounds = [
+                Appointment.objects.aggregate(first=Min('preferred_date'), last=Max('preferred_date')),
+                AppointmentSlot.objects.aggregate(first=Min('date'), last=Max('date')),
+            ]
+            for model in (CustomerFeedback, Testimonial):
+                created = model.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+                bounds.append({key: timezone.localdate(value) if value else None for key, value in created.items()})
+            firsts = [b['first'] for b in bounds if b['first']]
+            lasts = [b['last'] for b in bounds if b['last']]
+            if not firsts:
+                self.stdout.write(self.style.WARNING('No booking data found.'))
+                return
+            start_date = start_date or min(firsts)
+            end_date = end_date or max(lasts)
+
+        days = refresh_stats_range(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt booking stats for {days} day(s) ({start_date} to {end_date})'))
@@ -0,0 +1,47 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from salon.reminders import next_due, queue_due_reminders
+
+
+class Command(BaseCommand):
+    help = 'Queue 24-hour and 2-hour appointment reminders as they fall due; the task worker sends them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Appointments per outbox INSERT (default: 500)')
+        parser.add_argument(
+            '--max-sleep', type=float, default=300,
+            help='Longest wait between scans, which bounds how late a reminder for a new booking can be (default: 300)',
+        )
+        parser.add_argument('--once', action='store_true', help='Queue the reminders that are due, then exit')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while not self.stopping:
+            close_old_connections()
+            queued = queue_due_reminders(batch_size=options['batch_size'])
+            if any(queued.values()):
+                self.stdout.write(', '.join(f'{count} {kind}' for kind, count in queued.items() if count) + ' queued')
+            if options['once']:
+                break
+
+            wake_at = next_due()
+            delay = options['max_sleep']
+            if wake_at is not None:
+                delay = min(delay, max((wake_at - timezone.now()).total_seconds(), 1))
+            self.sleep(delay)
+
+    def sleep(self, seconds):
+        # A second at a time, so SIGTERM is honoured promptly
+        deadline = time.monotonic() + seconds
+        while not self.stopping and time.monotonic() < deadline:
+            time.sleep(min(1, deadline - time.monotonic()))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,68 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from salon.idempotency import purge_expired_keys
+from salon.task_queue import claim_tasks, purge_finished_tasks, release_tasks, requeue_stale_tasks, run_task
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (booking stats rollups, ...); start as many workers as needed'
+
+    # Seconds between checks for tasks abandoned by dead workers, old finished tasks and expired idempotency keys
+    housekeeping_interval = 60
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Tasks claimed per round trip (default: 10)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty (default: 1)')
+        parser.add_argument('--once', action='store_true', help='Run the tasks that are due, then exit')
+        parser.add_argument('--worker-id', default=f'{socket.gethostname()}:{os.getpid()}',
+                            help='Name recorded on claimed tasks (default: host:pid)')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        worker_id = options['worker_id']
+        self.stdout.write(f'Worker {worker_id} started')
+        succeeded = failed = 0
+        next_housekeeping = 0.0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() >= next_housekeeping:
+                self.housekeeping()
+                next_housekeeping = time.monotonic() + self.housekeeping_interval
+
+            tasks = claim_tasks(worker_id, options['batch_size'])
+            for index, task in enumerate(tasks):
+                if self.stopping:
+                    # Hand the rest back rather than holding them until the lock times out
+                    release_tasks(tasks[index:])
+                    break
+                if run_task(task):
+                    succeeded += 1
+                else:
+                    failed += 1
+
+            if not tasks:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(f'Worker {worker_id} stopped: {succeeded} task(s) done, {failed} failed')
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def housekeeping(self):
+        requeued, dead = requeue_stale_tasks()
+        purged = purge_finished_tasks()
+        if requeued or dead or purged:
+            self.stdout.write(f'Requeued {requeued} stale task(s), marked {dead} dead, purged {purged} finished')
+        expired = purge_expired_keys()
+        if expired:
+            self.stdout.write(f'Deleted {expired} expired idempotency key(s)')
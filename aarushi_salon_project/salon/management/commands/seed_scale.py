@@ -0,0 +1,98 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from salon.models import Appointment, BlogPost, DailyBookingStats, DailyServiceStats
+from salon.seeding import REFERENCE_PREFIX, SLUG_PREFIX, ScaleSeeder, seeded_models
+from salon.sitemap_utils import build_sitemaps
+from salon.stats import refresh_stats_range
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a large, deterministic synthetic dataset for benchmarking: services, slots, appointments, '
+        'blog, gallery, team, testimonials and inbox. Defaults approximate a year of trading.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data (default: 0)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT and transaction (default: 5000)')
+        parser.add_argument('--flush', action='store_true', help='Empty the seeded tables first (deletes real data too)')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not prompt before flushing')
+
+        volumes = parser.add_argument_group('volumes')
+        volumes.add_argument('--categories', type=int, default=8, help='Service categories (default: 8)')
+        volumes.add_argument('--services', type=int, default=40, help='Services (default: 40)')
+        volumes.add_argument('--days-back', type=int, default=365, help='Days of past slots and appointments (default: 365)')
+        volumes.add_argument('--days-ahead', type=int, default=90, help='Days of future slots (default: 90)')
+        volumes.add_argument('--slot-minutes', type=int, default=60, help='Slot length (default: 60)')
+        volumes.add_argument(
+            '--booking-density', type=float, default=0.6,
+            help='Share of past slots booked on an average day; future days fill less (default: 0.6)',
+        )
+        volumes.add_argument('--blog-posts', type=int, default=300, help='Blog posts (default: 300)')
+        volumes.add_argument('--comments-per-post', type=int, default=8, help='Average comments per post (default: 8)')
+        volumes.add_argument('--gallery-images', type=int, default=500, help='Gallery images (default: 500)')
+        volumes.add_argument('--team-members', type=int, default=15, help='Team members (default: 15)')
+        volumes.add_argument('--testimonials', type=int, default=200, help='Testimonials (default: 200)')
+        volumes.add_argument('--contact-messages', type=int, default=5000, help='Contact messages (default: 5000)')
+        volumes.add_argument('--feedback', type=int, default=3000, help='Customer feedback entries (default: 3000)')
+
+    def handle(self, *args, **options):
+        if options['services'] and not options['categories']:
+            raise CommandError('Services need at least one category.')
+
+        if options['flush']:
+            self.flush(options['interactive'])
+        elif (
+            Appointment.objects.filter(booking_reference__regex=rf'^{REFERENCE_PREFIX}[0-9]{{10}}$').exists()
+            or BlogPost.objects.filter(slug__startswith=SLUG_PREFIX).exists()
+        ):
+            raise CommandError('This database already holds seeded data; rerun with --flush to replace it.')
+
+        started = time.perf_counter()
+        seeder = ScaleSeeder(options['seed'], options['batch_size'], log=self.stdout.write)
+        services = seeder.seed_services(options['categories'], options['services'])
+
+        today = timezone.localdate()
+        start_date = today - timedelta(days=options['days_back'])
+        end_date = today + timedelta(days=options['days_ahead'])
+        if services:
+            seeder.seed_slots_and_appointments(
+                services, start_date, end_date, options['slot_minutes'], options['booking_density']
+            )
+        seeder.seed_content(
+            options['blog_posts'], options['comments_per_post'], options['gallery_images'],
+            options['team_members'], options['testimonials'],
+        )
+        seeder.seed_inbox(options['contact_messages'], options['feedback'])
+
+        # bulk_create skips the signals that keep these up to date
+        days = refresh_stats_range(start_date, end_date)
+        self.stdout.write(f'Daily booking stats: {days:,} day(s)')
+        self.stdout.write(f'Sitemaps: {len(build_sitemaps()):,} file(s)')
+
+        total = sum(seeder.counts.values())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s) with seed {options["seed"]}'
+        ))
+
+    def flush(self, interactive):
+        models = seeded_models() + [DailyBookingStats, DailyServiceStats]
+        if interactive:
+            answer = input(
+                f"This deletes every row in {', '.join(model._meta.db_table for model in models)} "
+                f"(and tables that reference them). Type 'yes' to continue: "
+            )
+            if answer != 'yes':
+                raise CommandError('Seeding cancelled.')
+        # Truncate rather than QuerySet.delete(), which would load every row to send signals
+        with transaction.atomic(), connection.cursor() as cursor:
+            tables = [model._meta.db_table for model in models]
+            for sql in connection.ops.sql_flush(no_style(), tables, reset_sequences=True, allow_cascade=True):
+                cursor.execute(sql)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from salon.fonts import get_font_dir, load_font_manifest, vendor_fonts
+
+
+class Command(BaseCommand):
+    help = (
+        "Download the active theme's web fonts from Google Fonts into STATIC_ROOT/fonts, subset to the characters "
+        'the site uses, for the dynamic theme CSS to serve. Run after content changes in new scripts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download every family again, even if up to date')
+
+    def handle(self, *args, **options):
+        try:
+            downloaded = vendor_fonts(force=options['force'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Vendoring fonts failed: {exc}')
+        manifest = load_font_manifest()
+        for family, record in sorted(manifest['families'].items()):
+            state = 'downloaded' if family in downloaded else 'up to date'
+            files = ', '.join(face['file'] for face in record['faces'])
+            self.stdout.write(f'{family} ({state}): {files}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Theme fonts: {manifest['theme']['heading']} / {manifest['theme']['body']} in {get_font_dir()}"
+        ))
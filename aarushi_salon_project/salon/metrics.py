@@ -0,0 +1,283 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms live in memory. With settings.METRICS_MULTIPROC_DIR set
+(one directory shared by all workers of a deployment) each process also writes its
+values to ``<dir>/metrics-<pid>.json`` at most every METRICS_FLUSH_INTERVAL
+seconds, and ``/metrics`` adds up the files of every process, so any worker can
+answer a scrape. Files left by processes that have exited are deleted when a
+process starts (the directory must not be shared between hosts, as PIDs are
+checked locally). Gauges are computed when scraped.
+
+``salon_cache_lookups_total`` counts hits and misses of the cached lookups: the
+active service IDs, the file-serving index and the built sitemap files.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AppointmentSlot, Task
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = [
+        (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in pairs
+    ]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+
+
+class Counter(Metric):
+    """Monotonic count, summed across processes"""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            values = self.registry.values.setdefault(self.name, {})
+            values[key] = values.get(key, 0) + amount
+        self.registry.changed()
+
+    def samples(self, values):
+        if not values and not self.labelnames:
+            yield f'{self.name} 0'
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    """Bucketed observations; stored per label set as ``[bucket counts..., sum, count]``"""
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            values = self.registry.values.setdefault(self.name, {})
+            state = values.get(key)
+            if state is None:
+                state = values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+        self.registry.changed()
+
+    def samples(self, values):
+        for key, state in sorted(values.items()):
+            for bound, count in zip(self.buckets + (float('inf'),), state[:len(self.buckets)] + [state[-1]]):
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                yield f'{self.name}_bucket{labels} {count}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(state[-2])}'
+            yield f'{self.name}_count{labels} {state[-1]}'
+
+
+class Gauge(Metric):
+    """Current value computed by ``function`` at scrape time"""
+    type = 'gauge'
+
+    def __init__(self, registry, name, documentation, function):
+        super().__init__(registry, name, documentation)
+        self.function = function
+
+    def samples(self, values):
+        yield f'{self.name} {_format_value(self.function())}'
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, as another user
+        return True
+    return True
+
+
+class Registry:
+    """Holds the metrics and their values for this process"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.values = {}
+        self.lock = threading.Lock()
+        self._last_flush = 0.0
+        self._timer = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    # Shared-directory mode
+
+    def _multiproc_dir(self):
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+        return Path(directory) if directory else None
+
+    def changed(self):
+        """Write this process's values to the shared directory now, or schedule it if flushed recently"""
+        if self._multiproc_dir() is None:
+            return
+        wait = self._last_flush + getattr(settings, 'METRICS_FLUSH_INTERVAL', 5) - time.monotonic()
+        if wait <= 0:
+            self.flush()
+        elif self._timer is None:
+            # An idle worker still publishes its last updates
+            self._timer = threading.Timer(wait, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def prune_dead_processes(self):
+        """Delete the files of processes that are no longer running; returns how many"""
+        directory = self._multiproc_dir()
+        if directory is None:
+            return 0
+        pruned = 0
+        for path in directory.glob('metrics-*.json'):
+            try:
+                pid = int(path.stem.removeprefix('metrics-'))
+            except ValueError:
+                continue
+            if pid == os.getpid() or _process_alive(pid):
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            pruned += 1
+        return pruned
+
+    def flush(self):
+        directory = self._multiproc_dir()
+        if directory is None:
+            return
+        with self.lock:
+            self._last_flush = time.monotonic()
+            self._timer = None
+            data = {
+                name: [[list(key), value] for key, value in values.items()]
+                for name, values in self.values.items()
+            }
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'metrics-{os.getpid()}.json'
+        tmp_path = directory / f'.metrics-{os.getpid()}.{threading.get_ident()}.tmp'
+        tmp_path.write_text(json.dumps(data))
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Return ``{metric name: {label key: value}}`` for this process or, in shared mode, all of them"""
+        directory = self._multiproc_dir()
+        if directory is None:
+            with self.lock:
+                return {
+                    name: {key: list(value) if isinstance(value, list) else value for key, value in values.items()}
+                    for name, values in self.values.items()
+                }
+        self.flush()
+        merged = {}
+        for path in directory.glob('metrics-*.json'):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for name, items in data.items():
+                values = merged.setdefault(name, {})
+                for key, value in items:
+                    key = tuple(key)
+                    if key not in values:
+                        values[key] = value
+                    elif isinstance(value, list):
+                        values[key] = [a + b for a, b in zip(values[key], value)]
+                    else:
+                        values[key] += value
+        return merged
+
+    def render(self):
+        """Prometheus text exposition of every registered metric"""
+        collected = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.extend(metric.header())
+            lines.extend(metric.samples(collected.get(name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+
+view_latency = Histogram(
+    REGISTRY, 'salon_view_latency_seconds', 'Time to build a response, by URL name', ['view']
+)
+bookings = Counter(REGISTRY, 'salon_bookings_total', 'Appointments booked')
+cancellations = Counter(REGISTRY, 'salon_cancellations_total', 'Appointments moved to cancelled')
+contact_messages = Counter(REGISTRY, 'salon_contact_messages_total', 'Contact form messages received')
+feedback_submissions = Counter(REGISTRY, 'salon_feedback_submissions_total', 'Customer feedback submitted')
+# A falling hit rate (e.g. the cache backend restarting or being flushed) shows up here before latency does
+cache_lookups = Counter(
+    REGISTRY, 'salon_cache_lookups_total', 'Lookups in the application caches, by cache and hit or miss',
+    ['cache', 'result'],
+)
+
+
+def free_slots_next_7_days():
+    today = timezone.localdate()
+    return AppointmentSlot.objects.filter(
+        date__gte=today, date__lt=today + timedelta(days=7), is_available=True, is_booked=False
+    ).count()
+
+
+free_slots = Gauge(
+    REGISTRY, 'salon_free_slots_next_7_days', 'Bookable appointment slots from today through the next 6 days',
+    free_slots_next_7_days,
+)
+
+
+def tasks_overdue():
+    # Queued work this far past due means no worker is running (see DEPLOYMENT.md)
+    return Task.objects.filter(status='queued', run_at__lt=timezone.now() - timedelta(minutes=1)).count()
+
+
+overdue_tasks = Gauge(
+    REGISTRY, 'salon_tasks_overdue', 'Queued background tasks more than a minute past due', tasks_overdue,
+)
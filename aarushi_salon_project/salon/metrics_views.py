@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_http_methods
+
+from .metrics import REGISTRY
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """
+    Prometheus scrape endpoint; requires ``Authorization: Bearer <METRICS_TOKEN>``.
+
+    Without a token it is only open with DEBUG on; in production it refuses to
+    serve until METRICS_TOKEN is set.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse('Set METRICS_TOKEN to enable /metrics', status=403, content_type='text/plain')
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
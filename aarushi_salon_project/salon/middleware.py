@@ -0,0 +1,355 @@
+import json
+import logging
+import math
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.functional import cached_property
+
+from .db_router import _pinned_to_primary, _wrote_to_primary, get_replicas, has_written
+from .fileserving import FileIndex, serve_file
+from .instrumentation import install_query_recorder, start_request_metrics, stop_request_metrics
+from .metrics import view_latency
+from .profiling import requested_token, save_profile, start_profile, stop_profile, token_is_valid
+from .ratelimit import client_ip, get_buckets
+
+
+logger = logging.getLogger('salon.requests')
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class FileServingMiddleware:
+    """
+    Serve STATIC_ROOT under STATIC_URL and MEDIA_ROOT under MEDIA_URL (salon.fileserving).
+
+    Ranges, conditional requests and precompressed .br/.gz siblings are
+    handled there; stat results are indexed per process for FILE_INDEX_TTL
+    seconds. Unknown paths fall through to the URLconf. SERVE_STATIC and
+    SERVE_MEDIA turn each root off. Place it straight after SecurityMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        ttl = getattr(settings, 'FILE_INDEX_TTL', 60)
+        self.mounts = []
+        if getattr(settings, 'SERVE_STATIC', True):
+            self.mounts.append((
+                '/' + settings.STATIC_URL.strip('/') + '/', FileIndex(settings.STATIC_ROOT, ttl),
+                getattr(settings, 'STATIC_MAX_AGE', 3600),
+            ))
+        if getattr(settings, 'SERVE_MEDIA', True):
+            self.mounts.append((
+                '/' + settings.MEDIA_URL.strip('/') + '/', FileIndex(settings.MEDIA_ROOT, ttl),
+                getattr(settings, 'MEDIA_MAX_AGE', 3600),
+            ))
+        if not self.mounts:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _serve(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        path = request.path_info
+        for prefix, index, max_age in self.mounts:
+            if path.startswith(prefix):
+                return serve_file(request, index, path[len(prefix):], max_age)
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self._serve(request) or await self.get_response(request)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Scope the read-replica pin to one request.
+
+    Unsafe requests (POST and friends) read from the primary from the start, and a
+    request that wrote sets a short-lived cookie so the redirect that usually
+    follows also reads from the primary.
+
+    The admin and signed-in users always read from the primary: staff expect to
+    see their own edits at once. Only logins create sessions on this site, so a
+    session cookie stands for a signed-in user (this runs before the session and
+    auth middleware, and costs no query).
+    """
+
+    cookie_name = 'use_primary'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @cached_property
+    def admin_prefix(self):
+        # The URLconf isn't loaded yet when the middleware is built
+        return reverse('custom_admin:index')
+
+    def _start(self, request):
+        pinned = (
+            request.method not in SAFE_METHODS
+            or self.cookie_name in request.COOKIES
+            or settings.SESSION_COOKIE_NAME in request.COOKIES
+            or request.path.startswith(self.admin_prefix)
+        )
+        return _pinned_to_primary.set(pinned), _wrote_to_primary.set(False)
+
+    def _finish(self, request, response):
+        if has_written() and request.method not in SAFE_METHODS:
+            response.set_cookie(self.cookie_name, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def _reset(self, tokens):
+        _pinned_to_primary.reset(tokens[0])
+        _wrote_to_primary.reset(tokens[1])
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self._start(request)
+        try:
+            return self._finish(request, self.get_response(request))
+        finally:
+            self._reset(tokens)
+
+    async def __acall__(self, request):
+        tokens = self._start(request)
+        try:
+            return self._finish(request, await self.get_response(request))
+        finally:
+            self._reset(tokens)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure query count, SQL time, template time and total latency per request.
+
+    A REQUEST_METRICS_SAMPLE_RATE share of requests (0 to 1) is measured; the numbers
+    are sent back in a Server-Timing header and logged as one JSON line on the
+    ``salon.requests`` logger. With a rate of 0 the middleware removes itself.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        install_query_recorder()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def _finish(self, request, response, metrics, started):
+        total = time.perf_counter() - started
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'template_ms': round(metrics.template_time * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+        }))
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        started = time.perf_counter()
+        metrics, token = start_request_metrics()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_request_metrics(token)
+        return self._finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        started = time.perf_counter()
+        metrics, token = start_request_metrics()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_request_metrics(token)
+        return self._finish(request, response, metrics, started)
+
+
+class ViewLatencyMetricsMiddleware:
+    """Record every response time in the salon_view_latency_seconds histogram, by URL name"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _observe(self, request, started):
+        match = request.resolver_match
+        view_latency.observe(time.perf_counter() - started, view=match.view_name if match else 'unmatched')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, started)
+        return response
+
+
+class RateLimitMiddleware:
+    """
+    Answer 429 Too Many Requests once a client exceeds an endpoint's RATE_LIMITS quota.
+
+    Works in process_view, where the URL name is known: unlisted views cost one
+    dict lookup, limited ones one cache read and write (see salon.ratelimit).
+    Place it before CsrfViewMiddleware so rejected requests are cheap.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.buckets = get_buckets()
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', True) or not self.buckets:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        limit = self.buckets.get(request.resolver_match.view_name)
+        if limit is None or request.method not in limit[1]:
+            return None
+        retry_after = limit[0].take(client_ip(request))
+        if not retry_after:
+            return None
+        logger.warning('Rate limited %s %s from %s', request.method, request.path, client_ip(request))
+        return self.too_many_requests(request, math.ceil(retry_after))
+
+    def too_many_requests(self, request, retry_after):
+        message = f'Too many requests. Please try again in {retry_after} seconds.'
+        if request.content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+            response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+        else:
+            response = JsonResponse({'success': False, 'error': message}, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile a request with cProfile when a staff member asks for it.
+
+    The request must carry a profiling token issued to the logged-in staff user
+    (see salon.profiling); anything else passes straight through after a dict
+    lookup. The response gets an X-Profile-Id header naming the stored profile.
+
+    Place it after AuthenticationMiddleware. Under ASGI the profiler only sees the
+    event loop thread: async views are captured (along with anything else the loop
+    runs meanwhile), but sync views run in a worker thread, so profile those under
+    WSGI instead.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _requested(self, request):
+        token = requested_token(request)
+        return token is not None and token_is_valid(token, request.user)
+
+    def _finish(self, request, response, profile):
+        profile_id = save_profile(profile, request)
+        response['X-Profile-Id'] = profile_id
+        # Never serve a profiled response from a shared cache
+        response['Cache-Control'] = 'private, no-store'
+        logger.info('Profiled %s %s as %s', request.method, request.path, profile_id)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._requested(request):
+            return self.get_response(request)
+        profile = start_profile()
+        if profile is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_profile(profile)
+        return self._finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if requested_token(request) is None:
+            return await self.get_response(request)
+        if not await sync_to_async(self._requested)(request):
+            return await self.get_response(request)
+        profile = start_profile()
+        if profile is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_profile(profile)
+        return await sync_to_async(self._finish)(request, response, profile)
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0014_galleryimage_updated_at_teammember_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBookingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('bookings', models.PositiveIntegerField(default=0, help_text='Appointments scheduled for this day (excluding cancelled)')),
+                ('cancellations', models.PositiveIntegerField(default=0, help_text='Cancelled appointments for this day')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Total price of non-cancelled appointments', max_digits=12)),
+                ('slots_total', models.PositiveIntegerField(default=0)),
+                ('slots_booked', models.PositiveIntegerField(default=0)),
+                ('slots_open', models.PositiveIntegerField(default=0, help_text='Slots still available for booking')),
+                ('feedback_count', models.PositiveIntegerField(default=0, help_text='Feedback and reviews submitted on this day')),
+                ('feedback_rating_total', models.PositiveIntegerField(default=0, help_text='Sum of ratings submitted on this day')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Booking Stats',
+                'verbose_name_plural': 'Daily Booking Stats',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyServiceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='salon.service')),
+            ],
+            options={
+                'verbose_name': 'Daily Service Stats',
+                'verbose_name_plural': 'Daily Service Stats',
+                'unique_together': {('date', 'service')},
+            },
+        ),
+    ]
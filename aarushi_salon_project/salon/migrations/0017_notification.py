@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0016_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('booking_confirmation', 'Booking confirmation'), ('reminder_24h', 'Reminder (24 hours)'), ('reminder_2h', 'Reminder (2 hours)'), ('staff_booking_alert', 'Staff alert: new booking'), ('staff_contact_alert', 'Staff alert: contact message')], max_length=30)),
+                ('dedupe_key', models.CharField(help_text='Booking reference (or message id); one email per kind and key', max_length=100)),
+                ('recipients', models.TextField(help_text='Comma-separated addresses')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempted_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='salon.appointment')),
+                ('contact_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='salon.contactmessage')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='salon_notification_status')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'dedupe_key'), name='salon_notification_once')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0017_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderMarker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=30, unique=True)),
+                ('reminded_until', models.DateTimeField(help_text='Appointments starting up to this moment have had this reminder')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['preferred_date', 'preferred_time', 'status'], name='salon_appt_start_status'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salon', '0018_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(help_text='URL name the key was used on', max_length=100)),
+                ('key', models.CharField(max_length=255)),
+                ('request_hash', models.CharField(help_text='SHA-256 of the request body', max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('content_type', models.CharField(max_length=100)),
+                ('body', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='salon_idempotency_created')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='salon_idempotency_key_once')],
+            },
+        ),
+    ]
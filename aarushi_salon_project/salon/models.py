@@ -1,4 +1,7 @@
-from django.db import models
+import secrets
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 
 
@@ -48,6 +51,7 @@ class TeamMember(models.Model):
     linkedin_url = models.URLField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -66,6 +70,7 @@ class Testimonial(models.Model):
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -113,6 +118,7 @@ class GalleryImage(models.Model):
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -200,6 +206,16 @@ class ContactInfo(models.Model):
         return "Contact Information"
 
 
+# Crockford base32: no I, L, O or U, so references survive being read out over the phone
+BOOKING_REFERENCE_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+BOOKING_REFERENCE_LENGTH = 10
+BOOKING_REFERENCE_ATTEMPTS = 5
+
+
+def new_booking_reference():
+    return ''.join(secrets.choice(BOOKING_REFERENCE_ALPHABET) for _ in range(BOOKING_REFERENCE_LENGTH))
+
+
 class Appointment(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -227,26 +243,50 @@ class Appointment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The reminder scheduler's due-window scan (salon.reminders)
+            models.Index(fields=['preferred_date', 'preferred_time', 'status'], name='salon_appt_start_status'),
+        ]
 
     def __str__(self):
-        services = self.services.all()
-        if services.exists():
-            service_names = ", ".join([s.service.name for s in services])
+        service_names = self.get_service_names()
+        if service_names:
             return f"{self.first_name} {self.last_name} - {service_names} on {self.preferred_date}"
         return f"{self.first_name} {self.last_name} - Appointment on {self.preferred_date}"
 
+    def get_service_names(self):
+        """Comma-separated service names, reusing a ``service_names`` annotation or prefetch if present"""
+        if hasattr(self, 'service_names'):
+            return self.service_names or ''
+        if 'services' in getattr(self, '_prefetched_objects_cache', {}):
+            services = self.services.all()
+        else:
+            services = self.services.select_related('service')
+        return ", ".join(s.service.name for s in services)
+
     def save(self, *args, **kwargs):
         """Override save to generate booking reference and handle slot booking"""
-        if not self.booking_reference:
-            import uuid
-            self.booking_reference = str(uuid.uuid4())[:8].upper()
-        
         # If appointment is confirmed and has a slot, mark slot as booked
         if self.status == 'confirmed' and self.appointment_slot:
             self.appointment_slot.is_booked = True
             self.appointment_slot.save()
         
-        super().save(*args, **kwargs)
+        if self.booking_reference:
+            super().save(*args, **kwargs)
+            return
+        # 50 random bits make a clash unlikely, and the unique index catches the
+        # one that does happen before it reaches a customer
+        for attempt in range(BOOKING_REFERENCE_ATTEMPTS):
+            self.booking_reference = new_booking_reference()
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                clashed = Appointment.objects.filter(booking_reference=self.booking_reference).exists()
+                self.booking_reference = ''
+                if not clashed or attempt == BOOKING_REFERENCE_ATTEMPTS - 1:
+                    raise
 
     def cancel_appointment(self):
         """Cancel appointment and free up the slot"""
@@ -624,4 +664,148 @@ class ContactMessage(models.Model):
         verbose_name_plural = "Contact Messages"
     
     def __str__(self):
-        return f"{self.name} - {self.subject} ({self.created_at.strftime('%Y-%m-%d')})"
\ No newline at end of file
+        return f"{self.name} - {self.subject} ({self.created_at.strftime('%Y-%m-%d')})"
+
+
+class DailyBookingStats(models.Model):
+    """Per-day booking rollup behind the admin dashboard, kept current by salon.stats"""
+    date = models.DateField(unique=True)
+    bookings = models.PositiveIntegerField(default=0, help_text="Appointments scheduled for this day (excluding cancelled)")
+    cancellations = models.PositiveIntegerField(default=0, help_text="Cancelled appointments for this day")
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Total price of non-cancelled appointments")
+    slots_total = models.PositiveIntegerField(default=0)
+    slots_booked = models.PositiveIntegerField(default=0)
+    slots_open = models.PositiveIntegerField(default=0, help_text="Slots still available for booking")
+    feedback_count = models.PositiveIntegerField(default=0, help_text="Feedback and reviews submitted on this day")
+    feedback_rating_total = models.PositiveIntegerField(default=0, help_text="Sum of ratings submitted on this day")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        verbose_name = "Daily Booking Stats"
+        verbose_name_plural = "Daily Booking Stats"
+
+    def __str__(self):
+        return f"{self.date} - {self.bookings} bookings"
+
+
+class DailyServiceStats(models.Model):
+    """Per-day, per-service booking rollup (top services on the admin dashboard)"""
+    date = models.DateField()
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='daily_stats')
+    bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['date', 'service']
+        verbose_name = "Daily Service Stats"
+        verbose_name_plural = "Daily Service Stats"
+
+    def __str__(self):
+        return f"{self.date} - {self.service.name}: {self.bookings}"
+
+
+class Task(models.Model):
+    """Background work queued by request handlers and run by ``manage.py run_worker`` (salon.task_queue)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('dead', 'Dead'),
+    ]
+
+    name = models.CharField(max_length=200, help_text="Registered task name")
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder, help_text="Keyword arguments for the task")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now, help_text="Not run before this time (retries back off)")
+    dedupe_key = models.CharField(max_length=200, blank=True, help_text="Queued tasks with the same key are enqueued once")
+    locked_by = models.CharField(max_length=100, blank=True, help_text="Worker running the task")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            # The worker's claim query: queued tasks that are due, oldest first
+            models.Index(fields=['status', 'run_at'], name='salon_task_status_run_at'),
+            models.Index(fields=['dedupe_key', 'status'], name='salon_task_dedupe'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+class Notification(models.Model):
+    """An email waiting in, or sent from, the salon.notifications outbox"""
+    KIND_CHOICES = [
+        ('booking_confirmation', 'Booking confirmation'),
+        ('reminder_24h', 'Reminder (24 hours)'),
+        ('reminder_2h', 'Reminder (2 hours)'),
+        ('staff_booking_alert', 'Staff alert: new booking'),
+        ('staff_contact_alert', 'Staff alert: contact message'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    dedupe_key = models.CharField(max_length=100, help_text="Booking reference (or message id); one email per kind and key")
+    recipients = models.TextField(help_text="Comma-separated addresses")
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    contact_message = models.ForeignKey(ContactMessage, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempted_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'dedupe_key'], name='salon_notification_once'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='salon_notification_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.dedupe_key}"
+
+
+class ReminderMarker(models.Model):
+    """How far ahead reminders of one kind have been queued (salon.reminders)"""
+    kind = models.CharField(max_length=30, unique=True)
+    reminded_until = models.DateTimeField(help_text="Appointments starting up to this moment have had this reminder")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} up to {self.reminded_until}"
+
+
+class IdempotencyKey(models.Model):
+    """The stored response to a POST sent with an Idempotency-Key header (salon.idempotency)"""
+    scope = models.CharField(max_length=100, help_text="URL name the key was used on")
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64, help_text="SHA-256 of the request body")
+    status_code = models.PositiveSmallIntegerField()
+    content_type = models.CharField(max_length=100)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='salon_idempotency_key_once'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='salon_idempotency_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.status_code})"
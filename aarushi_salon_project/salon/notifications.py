@@ -0,0 +1,153 @@
+"""
+Templated email for bookings and contact messages.
+
+``notify()`` adds a row to the Notification outbox, in the caller's transaction,
+and queues one ``send_pending_notifications`` task. The task is deduplicated, so
+a burst of bookings is delivered by a single task run that opens one connection
+(``get_connection()``) and hands the messages over with ``send_messages()``,
+EMAIL_BATCH_SIZE at a time, instead of one SMTP handshake per email.
+
+Each kind of email is sent at most once per booking reference (or contact
+message): the outbox has a unique ``(kind, dedupe_key)`` constraint.
+
+Templates live in ``templates/salon/emails/``: ``<name>_subject.txt``,
+``<name>.txt`` and optionally ``<name>.html``.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.template import TemplateDoesNotExist
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import ContactInfo, Notification
+from .task_queue import enqueue, task
+
+
+logger = logging.getLogger('salon.notifications')
+
+# kind -> (template name, sent to staff rather than the customer)
+EMAILS = {
+    'booking_confirmation': ('booking_confirmation', False),
+    'reminder_24h': ('reminder', False),
+    'reminder_2h': ('reminder', False),
+    'staff_booking_alert': ('staff_booking_alert', True),
+    'staff_contact_alert': ('staff_contact_alert', True),
+}
+
+
+def staff_emails():
+    """SALON_STAFF_EMAILS, or the public contact address when none are configured"""
+    configured = getattr(settings, 'SALON_STAFF_EMAILS', [])
+    if configured:
+        return list(configured)
+    contact_info = ContactInfo.objects.filter(is_active=True).exclude(email='').first()
+    return [contact_info.email] if contact_info else []
+
+
+def _notification(kind, appointment=None, contact_message=None, staff=None):
+    _, to_staff = EMAILS[kind]
+    recipients = staff if to_staff else [appointment.email if appointment else contact_message.email]
+    recipients = [address for address in recipients if address]
+    if not recipients:
+        return None
+    return Notification(
+        kind=kind,
+        dedupe_key=appointment.booking_reference if appointment else f'contact-{contact_message.pk}',
+        recipients=','.join(recipients),
+        appointment=appointment,
+        contact_message=contact_message,
+    )
+
+
+def notify(kind, appointment=None, contact_message=None):
+    """Queue one email of ``kind`` about an appointment or a contact message"""
+    notify_many(kind, appointments=[appointment] if appointment else (), contact_messages=[contact_message] if contact_message else ())
+
+
+def notify_many(kind, appointments=(), contact_messages=()):
+    """Queue ``kind`` emails for many records with one INSERT; already-queued ones are skipped"""
+    staff = staff_emails() if EMAILS[kind][1] else None
+    rows = [_notification(kind, appointment=appointment, staff=staff) for appointment in appointments]
+    rows += [_notification(kind, contact_message=message, staff=staff) for message in contact_messages]
+    rows = [row for row in rows if row]
+    if not rows:
+        return 0
+    Notification.objects.bulk_create(rows, ignore_conflicts=True)
+    enqueue(send_pending_notifications, dedupe_key='send_pending_notifications')
+    return len(rows)
+
+
+def render_email(notification):
+    """Build the EmailMultiAlternatives for an outbox row"""
+    template, _ = EMAILS[notification.kind]
+    appointment = notification.appointment
+    context = {
+        'notification': notification,
+        'appointment': appointment,
+        'services': [link.service for link in appointment.services.all()] if appointment else [],
+        'contact_message': notification.contact_message,
+        'contact_info': ContactInfo.objects.filter(is_active=True).first(),
+        'site_url': f'{settings.SITEMAP_PROTOCOL}://{settings.SITEMAP_DOMAIN}',
+        'hours_before': {'reminder_24h': 24, 'reminder_2h': 2}.get(notification.kind),
+    }
+    subject = ' '.join(render_to_string(f'salon/emails/{template}_subject.txt', context).split())
+    message = EmailMultiAlternatives(
+        subject, render_to_string(f'salon/emails/{template}.txt', context),
+        to=notification.recipients.split(','),
+        reply_to=[notification.contact_message.email] if notification.contact_message else None,
+    )
+    try:
+        message.attach_alternative(render_to_string(f'salon/emails/{template}.html', context), 'text/html')
+    except TemplateDoesNotExist:
+        pass
+    return message
+
+
+def _claim_batch(size):
+    """Mark up to ``size`` outbox rows as sending; rows stuck in sending (a crashed worker) are retried"""
+    now = timezone.now()
+    stuck = now - timedelta(seconds=getattr(settings, 'TASK_LOCK_TIMEOUT', 600))
+    claimable = Q(status='pending') | Q(status='sending', attempted_at__lt=stuck)
+    ids = list(Notification.objects.filter(claimable).order_by('pk').values_list('pk', flat=True)[:size])
+    Notification.objects.filter(claimable, pk__in=ids).update(status='sending', attempted_at=now)
+    return list(
+        Notification.objects.filter(pk__in=ids, status='sending', attempted_at=now)
+        .select_related('appointment', 'contact_message')
+        .prefetch_related('appointment__services__service')
+    )
+
+
+@task(max_attempts=5, retry_delay=60)
+def send_pending_notifications():
+    """Send everything in the outbox over one connection, a batch at a time"""
+    batch_size = getattr(settings, 'EMAIL_BATCH_SIZE', 50)
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return 0
+    sent = 0
+    with get_connection() as connection:
+        while batch:
+            messages, ready = [], []
+            for notification in batch:
+                try:
+                    messages.append(render_email(notification))
+                    ready.append(notification.pk)
+                except Exception as exc:
+                    logger.exception('Could not render %s', notification)
+                    Notification.objects.filter(pk=notification.pk).update(status='failed', error=repr(exc))
+            try:
+                connection.send_messages(messages)
+            except Exception:
+                # Put the batch back; the task is retried with backoff
+                Notification.objects.filter(pk__in=ready).update(status='pending')
+                raise
+            Notification.objects.filter(pk__in=ready).update(status='sent', sent_at=timezone.now(), error='')
+            sent += len(ready)
+            batch = _claim_batch(batch_size)
+    if sent:
+        logger.info('Sent %s notification email(s)', sent)
+    return sent
@@ -0,0 +1,191 @@
+"""
+On-demand cProfile capture of a single request, for staff.
+
+A staff member gets a signed token from the admin's Profiling page and adds it
+to any URL as ``?_profile=<token>`` (or sends it in an ``X-Profile-Token``
+header). ProfilingMiddleware then profiles that one request (view, context
+processors and template rendering) and stores two files in PROFILE_DIR:
+
+* ``<id>.prof``: pstats data, for ``python -m pstats`` or snakeviz
+* ``<id>.collapsed``: one ``frame;frame;frame microseconds`` line per stack, the
+  input format of flamegraph.pl, speedscope and similar viewers
+
+cProfile records caller/callee pairs rather than whole stacks, so the collapsed
+stacks are rebuilt by splitting each function's time between its callers in
+proportion to the time each caller spent in it. That is exact for functions with
+a single caller and a good approximation otherwise.
+"""
+import cProfile
+import os
+import pstats
+import re
+import sysconfig
+import threading
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.text import slugify
+
+
+TOKEN_PARAM = '_profile'
+TOKEN_HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'salon.profiling'
+
+PROFILE_NAME = re.compile(r'^[\w-]+\.(prof|collapsed)$')
+
+# Stacks are not expanded past this depth, or below this many microseconds
+MAX_STACK_DEPTH = 200
+MIN_FRAME_MICROSECONDS = 50
+
+
+def get_profile_dir():
+    return Path(getattr(settings, 'PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def make_token(user):
+    """A profiling token for ``user``, valid for PROFILE_TOKEN_MAX_AGE seconds"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def requested_token(request):
+    return request.GET.get(TOKEN_PARAM) or request.headers.get(TOKEN_HEADER)
+
+
+def token_is_valid(token, user):
+    """True if ``token`` was issued to ``user``, has not expired, and the user is (still) staff"""
+    if not (user.is_authenticated and user.is_active and user.is_staff):
+        return False
+    try:
+        user_pk = signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=getattr(settings, 'PROFILE_TOKEN_MAX_AGE', 3600)
+        )
+    except signing.BadSignature:
+        return False
+    return user_pk == str(user.pk)
+
+
+# Collapsed stacks
+
+_PATH_PREFIXES = sorted(
+    {str(Path(path)) + os.sep for path in (sysconfig.get_paths()['purelib'], sysconfig.get_paths()['stdlib'])}
+    | {str(settings.BASE_DIR) + os.sep},
+    key=len, reverse=True,
+)
+
+
+def _frame_label(func):
+    filename, lineno, name = func
+    if filename == '~':
+        # Built-ins are reported as ('~', 0, '<built-in method ...>')
+        label = name
+    else:
+        for prefix in _PATH_PREFIXES:
+            if filename.startswith(prefix):
+                filename = filename[len(prefix):]
+                break
+        label = f'{name} ({filename}:{lineno})'
+    # Semicolons separate frames; the sample count follows the last space, so spaces are fine
+    return label.replace(';', ':')
+
+
+def collapsed_stacks(profile):
+    """Return ``{'frame;frame;...': microseconds}`` for a finished cProfile.Profile"""
+    stats = pstats.Stats(profile).stats
+    callees = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+
+    stacks = Counter()
+
+    def walk(func, path, labels, share):
+        own_time = stats[func][2]
+        labels = labels + (_frame_label(func),)
+        own = own_time * share * 1e6
+        if own >= 1:
+            stacks[';'.join(labels)] += own
+        if len(labels) >= MAX_STACK_DEPTH:
+            return
+        for callee, time_from_here in callees[func].items():
+            callee_total = stats[callee][3]
+            # Recursion is folded into the outermost call
+            if callee in path or callee_total <= 0:
+                continue
+            callee_share = share * time_from_here / callee_total
+            if callee_total * callee_share * 1e6 >= MIN_FRAME_MICROSECONDS:
+                walk(callee, path | {callee}, labels, callee_share)
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            walk(func, frozenset([func]), (), 1.0)
+    return stacks
+
+
+# Storage
+
+def save_profile(profile, request):
+    """Write the .prof and .collapsed files for ``request``; returns the profile id"""
+    directory = get_profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = '-'.join([
+        timezone.now().strftime('%Y%m%d-%H%M%S'),
+        slugify(request.path.replace('/', ' ')) or 'root',
+        uuid.uuid4().hex[:8],
+    ])
+    profile.dump_stats(directory / f'{profile_id}.prof')
+    stacks = collapsed_stacks(profile)
+    (directory / f'{profile_id}.collapsed').write_text(
+        ''.join(f'{stack} {round(value)}\n' for stack, value in sorted(stacks.items()))
+    )
+    prune_profiles(directory)
+    return profile_id
+
+
+def list_profiles():
+    """Stored profiles, newest first, as ``[{'id', 'files', 'created'}]``"""
+    directory = get_profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = {}
+    for path in directory.iterdir():
+        if PROFILE_NAME.match(path.name):
+            entry = profiles.setdefault(path.stem, {'id': path.stem, 'files': [], 'created': path.stat().st_mtime})
+            entry['files'].append(path.name)
+    for entry in profiles.values():
+        entry['files'].sort(reverse=True)
+        entry['created'] = datetime.fromtimestamp(entry['created'], tz=timezone.get_current_timezone())
+    return sorted(profiles.values(), key=lambda entry: entry['created'], reverse=True)
+
+
+def prune_profiles(directory):
+    """Keep the newest PROFILE_KEEP profiles"""
+    keep = getattr(settings, 'PROFILE_KEEP', 50)
+    stale = sorted(directory.glob('*.prof'), key=lambda path: path.stat().st_mtime, reverse=True)[keep:]
+    for path in stale:
+        for suffix in ('.prof', '.collapsed'):
+            path.with_suffix(suffix).unlink(missing_ok=True)
+
+
+# The interpreter has one profiler hook per thread and cProfile can't nest, so
+# requests are profiled one at a time; a second request while one is running
+# is served without profiling.
+_profiling = threading.Lock()
+
+
+def start_profile():
+    """Start a cProfile.Profile, or return None if another request is being profiled"""
+    if not _profiling.acquire(blocking=False):
+        return None
+    profile = cProfile.Profile()
+    profile.enable()
+    return profile
+
+
+def stop_profile(profile):
+    profile.disable()
+    _profiling.release()
@@ -0,0 +1,85 @@
+"""
+Token-bucket rate limiting for the public write endpoints and booking APIs.
+
+RATE_LIMITS maps a URL name to ``(rate, methods)``, e.g.
+``'salon:contact': ('5/h', ['POST'])``: each client IP gets a bucket of 5 tokens
+for that endpoint, refilled continuously at 5 per hour, and a request using one
+of ``methods`` with the bucket empty gets a 429 with Retry-After.
+
+A bucket is one cache entry, ``(tokens, updated_at)``, read and written once
+per limited request; it expires when it would have refilled, so idle clients
+cost nothing. The read-modify-write isn't atomic, so simultaneous requests from
+one client can overshoot by the number that race; that's fine for throttling
+abuse. Use a cache every process shares (RATE_LIMIT_CACHE): locmem only counts
+per process, the file-based cache covers a single machine.
+"""
+import ipaddress
+import math
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+RATE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+
+def parse_rate(rate):
+    """``'5/h'`` or ``'30/10m'`` -> (capacity, seconds to refill it)"""
+    match = RATE.match(rate)
+    if not match:
+        raise ValueError(f'Invalid rate "{rate}"; expected e.g. "5/h" or "30/10m"')
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+def client_ip(request):
+    """
+    The client address, trusting RATE_LIMIT_PROXY_COUNT reverse proxies' X-Forwarded-For.
+
+    IPv6 clients are grouped by /64, since one host usually holds the whole prefix.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    proxies = getattr(settings, 'RATE_LIMIT_PROXY_COUNT', 0)
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+        if len(forwarded) >= proxies:
+            address = forwarded[-proxies]
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return address
+    if ip.version == 6:
+        return str(ipaddress.ip_network(f'{ip}/64', strict=False).network_address)
+    return str(ip)
+
+
+class TokenBucket:
+    def __init__(self, scope, rate):
+        self.scope = scope
+        self.capacity, self.period = parse_rate(rate)
+        self.refill_rate = self.capacity / self.period
+
+    def take(self, key, now=None):
+        """Spend a token for ``key``; returns 0 if allowed, else the seconds until one is available"""
+        cache = caches[getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+        cache_key = f'ratelimit:{self.scope}:{key}'
+        now = time.time() if now is None else now
+        tokens, updated_at = cache.get(cache_key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+        if tokens < 1:
+            return (1 - tokens) / self.refill_rate
+        tokens -= 1
+        # Once it has refilled the entry is no different from a missing one
+        cache.set(cache_key, (tokens, now), math.ceil((self.capacity - tokens) / self.refill_rate))
+        return 0
+
+
+def get_buckets():
+    """``{url name: (TokenBucket, methods)}`` from RATE_LIMITS"""
+    return {
+        view_name: (TokenBucket(view_name, rate), frozenset(method.upper() for method in methods))
+        for view_name, (rate, methods) in getattr(settings, 'RATE_LIMITS', {}).items()
+    }
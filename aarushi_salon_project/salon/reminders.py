@@ -0,0 +1,107 @@
+"""
+Appointment reminders, 24 hours and 2 hours before the start.
+
+Each kind of reminder keeps a ReminderMarker: the start time up to which its
+reminders have been queued. A run only looks at appointments starting between
+the marker and ``now + lead`` (an index range scan on
+``(preferred_date, preferred_time, status)``), queues their emails with
+``notify_many()`` a batch at a time and moves the marker forward in the same
+transaction, so past appointments are never scanned again and nothing is
+queued twice.
+
+Appointments booked inside a reminder's lead time are skipped for that kind;
+one booked 5 hours ahead gets the 2-hour reminder but not the 24-hour one, and
+the confirmation covers anything booked later still. ``manage.py run_reminders``
+runs this in a loop, sleeping until the next reminder is due.
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment, ReminderMarker
+from .notifications import notify_many
+
+
+# (notification kind, lead time), longest lead first
+REMINDERS = [
+    ('reminder_24h', timedelta(hours=24)),
+    ('reminder_2h', timedelta(hours=2)),
+]
+
+REMINDED_STATUSES = ['pending', 'confirmed']
+
+
+def _local(moment):
+    moment = timezone.localtime(moment)
+    return moment.date(), moment.time().replace(microsecond=0)
+
+
+def starting_between(after, until=None):
+    """Active appointments starting in ``(after, until]``, or after ``after`` when ``until`` is None"""
+    after_date, after_time = _local(after)
+    # The plain date range keeps this an index range scan; the Q()s trim its ends
+    appointments = Appointment.objects.filter(
+        Q(preferred_date__gt=after_date) | Q(preferred_time__gt=after_time),
+        preferred_date__gte=after_date, status__in=REMINDED_STATUSES,
+    )
+    if until is not None:
+        until_date, until_time = _local(until)
+        appointments = appointments.filter(
+            Q(preferred_date__lt=until_date) | Q(preferred_time__lte=until_time),
+            preferred_date__lte=until_date,
+        )
+    return appointments
+
+
+def _windows(now):
+    """``(kind, lead, after, until)`` for each reminder; ``after`` is never earlier than a shorter lead"""
+    markers = dict(ReminderMarker.objects.values_list('kind', 'reminded_until'))
+    for index, (kind, lead) in enumerate(REMINDERS):
+        shorter = REMINDERS[index + 1][1] if index + 1 < len(REMINDERS) else timedelta(0)
+        after = max(markers.get(kind, now), now + shorter)
+        yield kind, lead, after, now + lead
+
+
+def queue_due_reminders(now=None, batch_size=500):
+    """Queue the reminders that are due; returns ``{kind: emails queued}``"""
+    now = now or timezone.now()
+    queued = {}
+    for kind, lead, after, until in _windows(now):
+        queued[kind] = 0
+        if until <= after:
+            continue
+        due = (
+            # Unordered, so the index scan feeds the batches without a sort
+            starting_between(after, until)
+            .order_by()
+            .only('pk', 'email', 'booking_reference')
+        )
+        with transaction.atomic():
+            batch = []
+            for appointment in due.iterator(chunk_size=batch_size):
+                batch.append(appointment)
+                if len(batch) == batch_size:
+                    queued[kind] += notify_many(kind, appointments=batch)
+                    batch = []
+            if batch:
+                queued[kind] += notify_many(kind, appointments=batch)
+            ReminderMarker.objects.update_or_create(kind=kind, defaults={'reminded_until': until})
+    return queued
+
+
+def next_due(now=None):
+    """When the next reminder falls due, or None if no upcoming appointment needs one"""
+    now = now or timezone.now()
+    upcoming = []
+    for kind, lead, after, until in _windows(now):
+        start = (
+            starting_between(max(after, until))
+            .order_by('preferred_date', 'preferred_time')
+            .values_list('preferred_date', 'preferred_time')
+            .first()
+        )
+        if start:
+            upcoming.append(timezone.make_aware(datetime.combine(*start)) - lead)
+    return min(upcoming, default=None)
@@ -0,0 +1,280 @@
+"""
+Synthetic data at benchmark scale for ``manage.py seed_scale``.
+
+Everything is written with ``bulk_create`` in batches and drawn from one seeded
+``random.Random``, so the same seed and volumes always produce the same rows.
+Slots and their appointments are generated a batch at a time, which keeps
+memory flat whether the run creates ten thousand slots or ten million.
+
+Booking density follows what the salon actually sees: past days are mostly
+full, bookings thin out the further ahead a day is, Fridays and Saturdays fill
+first, late morning and after-work slots go before the rest, and a few popular
+services take most of the bookings.
+"""
+import math
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.db import reset_queries, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import (
+    Appointment, AppointmentService, AppointmentSlot, BlogComment, BlogPost, BusinessHours, ContactMessage,
+    CustomerFeedback, GalleryImage, Service, ServiceCategory, TeamMember, Testimonial,
+)
+
+
+# Prefixes that mark seeded rows (and keep them clear of real booking references and slugs)
+REFERENCE_PREFIX = 'SC'
+SLUG_PREFIX = 'scale-'
+
+CATEGORY_NAMES = ['Hair', 'Colour', 'Nails', 'Skin', 'Makeup', 'Spa', 'Bridal', 'Grooming']
+FIRST_NAMES = ['Aarav', 'Priya', 'Emma', 'Liam', 'Sofia', 'Noah', 'Ananya', 'Olivia', 'Mia', 'Ethan', 'Isha', 'Lucas']
+LAST_NAMES = ['Sharma', 'Smith', 'Patel', 'Garcia', 'Brown', 'Khan', 'Nguyen', 'Wilson', 'Singh', 'Lopez']
+DEFAULT_BUSINESS_HOURS = {
+    'monday': (False, time(10, 0), time(19, 0)),
+    'tuesday': (True, time(10, 0), time(19, 0)),
+    'wednesday': (True, time(10, 0), time(19, 0)),
+    'thursday': (True, time(10, 0), time(19, 0)),
+    'friday': (True, time(10, 0), time(19, 0)),
+    'saturday': (True, time(10, 0), time(19, 0)),
+    'sunday': (True, time(11, 0), time(17, 0)),
+}
+
+# Share of slots booked, relative to the requested density
+WEEKDAY_DEMAND = [0.7, 0.8, 0.85, 0.95, 1.15, 1.35, 1.0]  # Monday first
+PEAK_HOURS = {11: 1.2, 12: 1.2, 17: 1.25, 18: 1.25}
+# Days ahead at which demand for future days has dropped to 1/e
+BOOKING_LEAD_DAYS = 21
+BLOCKED_SLOT_RATE = 0.015
+
+PAST_STATUSES = (['completed', 'cancelled', 'confirmed'], [0.82, 0.12, 0.06])
+FUTURE_STATUSES = (['confirmed', 'pending', 'cancelled'], [0.55, 0.35, 0.10])
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+        # With DEBUG on, the connection keeps the last 9,000 statements; multi-megabyte
+        # INSERTs would otherwise hold gigabytes by the millionth row
+        reset_queries()
+
+
+def bulk_insert(model, objects, batch_size):
+    """bulk_create ``objects`` (any iterable) one batch per transaction; returns the row count"""
+    count = 0
+    for batch in batched(objects, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+class ScaleSeeder:
+    """Generates one dataset; ``log`` receives a line per finished model"""
+
+    def __init__(self, seed=0, batch_size=5000, log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+    def _record(self, model, count):
+        self.counts[model._meta.verbose_name_plural] = self.counts.get(model._meta.verbose_name_plural, 0) + count
+        self.log(f'{model._meta.verbose_name_plural}: {count:,}')
+
+    def person(self, number):
+        first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+        return first, last, f'{first}.{last}{number}@example.com'.lower()
+
+    # Catalogue
+
+    def seed_services(self, categories, services):
+        created = ServiceCategory.objects.bulk_create([
+            ServiceCategory(
+                name=CATEGORY_NAMES[i % len(CATEGORY_NAMES)] + (f' {i // len(CATEGORY_NAMES) + 1}' if i >= len(CATEGORY_NAMES) else ''),
+                icon='fas fa-spa',
+            )
+            for i in range(categories)
+        ])
+        self._record(ServiceCategory, len(created))
+        services = Service.objects.bulk_create([
+            Service(
+                category=created[i % categories], name=f'{created[i % categories].name} Service {i + 1}',
+                description='Seeded treatment', price=Decimal(self.rng.randrange(15, 250)),
+                duration_minutes=self.rng.choice([30, 45, 60, 90]), is_featured=i < 6,
+            )
+            for i in range(services)
+        ], batch_size=self.batch_size)
+        self._record(Service, len(services))
+        return services
+
+    def business_hours(self):
+        """The salon's opening hours by weekday, creating the defaults for days that have none"""
+        existing = {hours.day_of_week for hours in BusinessHours.objects.all()}
+        BusinessHours.objects.bulk_create([
+            BusinessHours(day_of_week=day, is_open=is_open, open_time=open_time, close_time=close_time)
+            for day, (is_open, open_time, close_time) in DEFAULT_BUSINESS_HOURS.items() if day not in existing
+        ])
+        return {
+            hours.day_of_week: hours
+            for hours in BusinessHours.objects.filter(is_active=True, is_open=True)
+        }
+
+    # Slots and appointments
+
+    def booking_probability(self, day_offset, weekday, hour, popularity, density):
+        demand = density * WEEKDAY_DEMAND[weekday] * PEAK_HOURS.get(hour, 1.0) * popularity
+        if day_offset >= 0:
+            demand *= math.exp(-day_offset / BOOKING_LEAD_DAYS)
+        return min(demand, 0.95)
+
+    def generate_slots(self, services, start_date, end_date, slot_minutes, density):
+        """Yield ``(slot, booked)`` for every bookable slot between the dates, in date order"""
+        today = timezone.localdate()
+        hours = self.business_hours()
+        # A few services take most of the bookings; the mean popularity is about 1
+        weights = [1 / (1 + 0.15 * rank) for rank in range(len(services))]
+        scale = len(weights) / sum(weights)
+        popularity = {service.pk: weight * scale for service, weight in zip(services, weights)}
+
+        day = start_date
+        while day <= end_date:
+            opening = hours.get(day.strftime('%A').lower())
+            if opening:
+                start = datetime.combine(day, opening.open_time)
+                close = datetime.combine(day, opening.close_time)
+                while start + timedelta(minutes=slot_minutes) <= close:
+                    end = start + timedelta(minutes=slot_minutes)
+                    for service in services:
+                        blocked = self.rng.random() < BLOCKED_SLOT_RATE
+                        booked = not blocked and self.rng.random() < self.booking_probability(
+                            (day - today).days, day.weekday(), start.hour, popularity[service.pk], density
+                        )
+                        slot = AppointmentSlot(
+                            service=service, date=day, start_time=start.time(), end_time=end.time(),
+                            is_available=not blocked,
+                        )
+                        yield slot, booked
+                    start = end
+            day += timedelta(days=1)
+
+    def seed_slots_and_appointments(self, services, start_date, end_date, slot_minutes=60, density=0.6):
+        """Create the slots between the dates and an appointment for each booked one"""
+        today = timezone.localdate()
+        slots_total = appointments_total = links_total = 0
+        for batch in batched(self.generate_slots(services, start_date, end_date, slot_minutes, density), self.batch_size):
+            with transaction.atomic():
+                # SQLite and PostgreSQL return the new primary keys
+                slots = AppointmentSlot.objects.bulk_create([slot for slot, _ in batch])
+
+                appointments, extra_services = [], []
+                for slot, booked in zip(slots, (booked for _, booked in batch)):
+                    if not booked:
+                        continue
+                    statuses, weights = PAST_STATUSES if slot.date < today else FUTURE_STATUSES
+                    status = self.rng.choices(statuses, weights)[0]
+                    chosen = [slot.service] + self.rng.sample(services, self.rng.choices([0, 1, 2], [0.6, 0.3, 0.1])[0])
+                    chosen = list({service.pk: service for service in chosen}.values())
+                    first, last, email = self.person(appointments_total + len(appointments))
+                    appointments.append(Appointment(
+                        first_name=first, last_name=last, email=email, phone=f'555{self.rng.randrange(10 ** 7):07d}',
+                        preferred_date=slot.date, preferred_time=slot.start_time, status=status,
+                        appointment_slot=slot,
+                        booking_reference=f'{REFERENCE_PREFIX}{appointments_total + len(appointments):010d}',
+                        total_duration=sum(service.duration_minutes for service in chosen),
+                        total_price=sum(service.price for service in chosen),
+                    ))
+                    extra_services.append(chosen)
+                    # Cancelling frees the slot, as Appointment.cancel_appointment does
+                    slot.is_booked = status != 'cancelled'
+
+                Appointment.objects.bulk_create(appointments)
+                links = AppointmentService.objects.bulk_create([
+                    AppointmentService(appointment=appointment, service=service)
+                    for appointment, chosen in zip(appointments, extra_services) for service in chosen
+                ])
+                booked_ids = [slot.pk for slot in slots if slot.is_booked]
+                AppointmentSlot.objects.filter(pk__in=booked_ids).update(
+                    is_booked=True,
+                    appointment=Subquery(
+                        Appointment.objects.filter(appointment_slot=OuterRef('pk')).exclude(status='cancelled').values('pk')[:1]
+                    ),
+                )
+            slots_total += len(slots)
+            appointments_total += len(appointments)
+            links_total += len(links)
+
+        self._record(AppointmentSlot, slots_total)
+        self._record(Appointment, appointments_total)
+        self._record(AppointmentService, links_total)
+        return slots_total, appointments_total
+
+    # Content and inbox
+
+    def seed_content(self, blog_posts, comments_per_post, gallery_images, team_members, testimonials):
+        rng = self.rng
+        self._record(BlogPost, bulk_insert(BlogPost, (
+            BlogPost(
+                title=f'Salon journal {i + 1}', slug=f'{SLUG_PREFIX}{i + 1}', content='Seeded article text. ' * 150,
+                excerpt='Seeded article', category=rng.choice(CATEGORY_NAMES), tags='hair, care, style',
+                status=rng.choices(['published', 'draft', 'archived'], [0.85, 0.1, 0.05])[0],
+                is_featured=i < 3, view_count=int(rng.paretovariate(1.2) * 20),
+            )
+            for i in range(blog_posts)
+        ), self.batch_size))
+
+        post_ids = list(BlogPost.objects.filter(slug__startswith=SLUG_PREFIX).values_list('pk', flat=True))
+        self._record(BlogComment, bulk_insert(BlogComment, (
+            BlogComment(
+                post_id=post_id, name=' '.join(self.person(0)[:2]), email=f'reader{n}@example.com',
+                comment='Seeded comment', is_approved=rng.random() < 0.9,
+            )
+            for post_id in post_ids for n in range(rng.randint(0, 2 * comments_per_post))
+        ), self.batch_size))
+
+        self._record(GalleryImage, bulk_insert(GalleryImage, (
+            GalleryImage(title=f'Look {i + 1}', image=f'gallery/seed-{i % 50}.jpg', is_featured=i < 8)
+            for i in range(gallery_images)
+        ), self.batch_size))
+        self._record(TeamMember, bulk_insert(TeamMember, (
+            TeamMember(name=' '.join(self.person(i)[:2]), position=rng.choice(['Stylist', 'Colourist', 'Therapist']))
+            for i in range(team_members)
+        ), self.batch_size))
+        self._record(Testimonial, bulk_insert(Testimonial, (
+            Testimonial(
+                client_name=' '.join(self.person(i)[:2]), content='Seeded testimonial',
+                rating=rng.choices([5, 4, 3], [0.7, 0.25, 0.05])[0], is_featured=i < 5,
+            )
+            for i in range(testimonials)
+        ), self.batch_size))
+
+    def seed_inbox(self, contact_messages, feedback):
+        rng = self.rng
+        self._record(ContactMessage, bulk_insert(ContactMessage, (
+            ContactMessage(
+                name=' '.join(person[:2]), email=person[2], subject='Seeded enquiry', message='Hello',
+                status=rng.choices(['new', 'read', 'replied', 'closed'], [0.1, 0.2, 0.4, 0.3])[0],
+            )
+            for person in (self.person(i) for i in range(contact_messages))
+        ), self.batch_size))
+        self._record(CustomerFeedback, bulk_insert(CustomerFeedback, (
+            CustomerFeedback(
+                name=' '.join(person[:2]), email=person[2], service_received='Seeded service',
+                rating=rng.choices([5, 4, 3, 2, 1], [0.55, 0.25, 0.1, 0.05, 0.05])[0], feedback='Seeded feedback',
+                status=rng.choices(['approved', 'pending', 'rejected'], [0.7, 0.25, 0.05])[0],
+            )
+            for person in (self.person(i) for i in range(feedback))
+        ), self.batch_size))
+
+
+def seeded_models():
+    """Models whose tables ``seed_scale --flush`` empties, children first"""
+    return [
+        AppointmentService, Appointment, AppointmentSlot, BlogComment, BlogPost, GalleryImage, TeamMember,
+        Testimonial, ContactMessage, CustomerFeedback, Service, ServiceCategory,
+    ]
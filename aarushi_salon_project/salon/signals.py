@@ -0,0 +1,122 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.utils import timezone
+
+from .models import (
+    BlogPost, Service, GalleryImage, TeamMember, Testimonial, ContactInfo, SiteContent,
+    Appointment, AppointmentSlot, CustomerFeedback, ContactMessage, ThemeSettings
+)
+from . import metrics
+from .fonts import vendor_theme_fonts
+from .forms import forget_active_service_ids
+from .notifications import notify
+from .sitemap_utils import schedule_sitemap_rebuild
+from .sqlite_profile import configure_sqlite_connection
+from .stats import schedule_stats_refresh
+from .task_queue import enqueue
+
+
+SITEMAP_MODELS = (BlogPost, Service, GalleryImage, TeamMember, Testimonial, ContactInfo, SiteContent)
+
+# Saves that only touch these fields don't change anything a crawler sees
+SITEMAP_IGNORED_FIELDS = {'view_count'}
+
+
+def rebuild_sitemaps_on_change(sender, update_fields=None, **kwargs):
+    """Regenerate the prebuilt sitemaps whenever content listed in them changes"""
+    if update_fields and set(update_fields) <= SITEMAP_IGNORED_FIELDS:
+        return
+    schedule_sitemap_rebuild()
+
+
+# Connected per model: a sender-less receiver would disable fast bulk deletes everywhere
+for model in SITEMAP_MODELS:
+    post_save.connect(rebuild_sitemaps_on_change, sender=model, dispatch_uid=f'sitemap_save_{model.__name__}')
+    post_delete.connect(rebuild_sitemaps_on_change, sender=model, dispatch_uid=f'sitemap_delete_{model.__name__}')
+
+
+def remember_appointment_state(sender, instance, update_fields=None, **kwargs):
+    """Keep the stored preferred_date and status: moves refresh both days and cancellations are counted"""
+    if instance.pk and (update_fields is None or {'preferred_date', 'status'} & set(update_fields)):
+        previous = Appointment.objects.filter(pk=instance.pk).values('preferred_date', 'status').first()
+        if previous:
+            instance._previous_preferred_date = previous['preferred_date']
+            instance._previous_status = previous['status']
+
+
+def refresh_stats_for_appointment(sender, instance, **kwargs):
+    schedule_stats_refresh(instance.preferred_date, getattr(instance, '_previous_preferred_date', None))
+
+
+def refresh_stats_for_slot(sender, instance, **kwargs):
+    schedule_stats_refresh(instance.date)
+
+
+def refresh_stats_for_feedback(sender, instance, **kwargs):
+    if instance.created_at:
+        schedule_stats_refresh(timezone.localdate(instance.created_at))
+
+
+pre_save.connect(remember_appointment_state, sender=Appointment, dispatch_uid='stats_appointment_pre_save')
+for signal in (post_save, post_delete):
+    signal.connect(refresh_stats_for_appointment, sender=Appointment, dispatch_uid=f'stats_appointment_{signal is post_save}')
+    signal.connect(refresh_stats_for_slot, sender=AppointmentSlot, dispatch_uid=f'stats_slot_{signal is post_save}')
+    for model in (CustomerFeedback, Testimonial):
+        signal.connect(
+            refresh_stats_for_feedback, sender=model,
+            dispatch_uid=f'stats_feedback_{model.__name__}_{signal is post_save}'
+        )
+
+
+def count_appointment(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(metrics.bookings.inc)
+    elif instance.status == 'cancelled' and getattr(instance, '_previous_status', 'cancelled') != 'cancelled':
+        transaction.on_commit(metrics.cancellations.inc)
+
+
+def count_submission(sender, instance, created, **kwargs):
+    if created:
+        counter = metrics.contact_messages if sender is ContactMessage else metrics.feedback_submissions
+        transaction.on_commit(counter.inc)
+
+
+post_save.connect(count_appointment, sender=Appointment, dispatch_uid='metrics_appointment')
+for model in (ContactMessage, CustomerFeedback):
+    post_save.connect(count_submission, sender=model, dispatch_uid=f'metrics_{model.__name__}')
+
+
+def forget_active_services(sender, **kwargs):
+    transaction.on_commit(forget_active_service_ids)
+
+
+post_save.connect(forget_active_services, sender=Service, dispatch_uid='active_services_save')
+post_delete.connect(forget_active_services, sender=Service, dispatch_uid='active_services_delete')
+
+
+def notify_booking(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        notify('booking_confirmation', appointment=instance)
+        notify('staff_booking_alert', appointment=instance)
+
+
+def notify_contact_message(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        notify('staff_contact_alert', contact_message=instance)
+
+
+post_save.connect(notify_booking, sender=Appointment, dispatch_uid='notify_appointment')
+post_save.connect(notify_contact_message, sender=ContactMessage, dispatch_uid='notify_contact_message')
+
+
+def vendor_fonts_on_theme_change(sender, instance, raw=False, **kwargs):
+    """Self-host (and subset) the theme's fonts in the background whenever it is saved"""
+    if not raw:
+        enqueue(vendor_theme_fonts, dedupe_key='vendor_theme_fonts')
+
+
+post_save.connect(vendor_fonts_on_theme_change, sender=ThemeSettings, dispatch_uid='vendor_theme_fonts')
+
+
+connection_created.connect(configure_sqlite_connection, dispatch_uid='sqlite_production_profile')
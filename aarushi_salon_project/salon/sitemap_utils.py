@@ -0,0 +1,138 @@
+import gzip
+import os
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .metrics import cache_lookups
+from .sitemaps import SITEMAPS
+from .task_queue import enqueue, task
+
+
+INDEX_FILENAME = 'sitemap.xml'
+
+# filename -> (mtime_ns, bytes) for files already read from SITEMAP_ROOT
+_file_cache = {}
+
+
+class SitemapSite:
+    """Minimal stand-in for a Site object so sitemaps can render outside a request"""
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.name = domain
+
+
+def get_sitemap_root():
+    """Directory the prebuilt sitemap files are written to"""
+    return Path(getattr(settings, 'SITEMAP_ROOT', settings.BASE_DIR / 'sitemaps'))
+
+
+def section_filename(section, page=1):
+    """Return the file name used for one page of a sitemap section"""
+    if page == 1:
+        return f'sitemap-{section}.xml'
+    return f'sitemap-{section}-{page}.xml'
+
+
+def _write_file(root, filename, data):
+    """Atomically write ``data`` and its gzip sibling into ``root``"""
+    for name, payload in ((filename, data), (f'{filename}.gz', gzip.compress(data, mtime=0))):
+        tmp_path = root / f'.{name}.{os.getpid()}.{threading.get_ident()}.tmp'
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, root / name)
+
+
+def build_sitemaps(root=None):
+    """Render the sitemap index and every section to disk, returning the written file names"""
+    root = Path(root) if root else get_sitemap_root()
+    root.mkdir(parents=True, exist_ok=True)
+
+    protocol = getattr(settings, 'SITEMAP_PROTOCOL', 'https')
+    domain = getattr(settings, 'SITEMAP_DOMAIN', 'localhost')
+    site = SitemapSite(domain)
+    base_url = f'{protocol}://{domain}'
+
+    written = []
+    index_entries = []
+    for section, sitemap_class in SITEMAPS.items():
+        sitemap = sitemap_class()
+        last_mod = sitemap.get_latest_lastmod()
+        for page in sitemap.paginator.page_range:
+            urlset = sitemap.get_urls(page=page, site=site, protocol=protocol)
+            if hasattr(sitemap, 'images'):
+                for url_info in urlset:
+                    url_info['images'] = [
+                        {'loc': f'{base_url}{url}', 'title': title, 'caption': caption}
+                        for url, title, caption in sitemap.images(url_info['item'])
+                    ]
+            filename = section_filename(section, page)
+            data = render_to_string('salon/sitemap.xml', {'urlset': urlset}).encode('utf-8')
+            _write_file(root, filename, data)
+            written.append(filename)
+            index_entries.append({'location': f'{base_url}/{filename}', 'last_mod': last_mod})
+
+    data = render_to_string('salon/sitemap_index.xml', {'sitemaps': index_entries}).encode('utf-8')
+    _write_file(root, INDEX_FILENAME, data)
+    written.append(INDEX_FILENAME)
+    return written
+
+
+def get_sitemap_file(filename):
+    """
+    Return ``(bytes, mtime)`` for a prebuilt sitemap file, or None if it does not exist.
+
+    Files are read from disk once and kept in memory until their mtime changes, so
+    every worker picks up a rebuild done by any other process.
+    """
+    root = get_sitemap_root()
+    path = root / filename
+    if not path.exists() and not (root / INDEX_FILENAME).exists():
+        # Nothing has been built yet (fresh deploy)
+        build_sitemaps(root)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    cached = _file_cache.get(filename)
+    hit = cached is not None and cached[0] == stat.st_mtime_ns
+    cache_lookups.inc(cache='sitemap_files', result='hit' if hit else 'miss')
+    if not hit:
+        cached = (stat.st_mtime_ns, path.read_bytes())
+        _file_cache[filename] = cached
+    return cached[1], stat.st_mtime
+
+
+@task(max_attempts=3, retry_delay=60)
+def rebuild_sitemaps():
+    build_sitemaps()
+
+
+def _enqueue_rebuild():
+    # Edits within SITEMAP_REBUILD_DELAY of the first are picked up by the same rebuild
+    delay = timedelta(seconds=getattr(settings, 'SITEMAP_REBUILD_DELAY', 60))
+    enqueue(rebuild_sitemaps, run_at=timezone.now() + delay, dedupe_key='rebuild_sitemaps')
+
+
+def schedule_sitemap_rebuild():
+    """
+    Queue a sitemap rebuild once the current transaction commits.
+
+    Repeated calls in one transaction queue it once, and a rebuild already
+    waiting for a worker absorbs later calls, so a burst of admin edits costs
+    one rebuild, run by ``manage.py run_worker`` rather than in the request.
+    """
+    if not getattr(settings, 'SITEMAP_AUTO_REBUILD', True):
+        return
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(
+        func is _enqueue_rebuild for _, func, _ in connection.run_on_commit
+    ):
+        return
+    transaction.on_commit(_enqueue_rebuild)
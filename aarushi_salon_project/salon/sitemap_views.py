@@ -0,0 +1,32 @@
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.decorators.http import require_http_methods
+from django.views.static import was_modified_since
+
+from .fileserving import accepts_encoding
+from .sitemap_utils import get_sitemap_file
+
+
+@require_http_methods(["GET", "HEAD"])
+def sitemap_file(request, filename, compressed=False):
+    """Serve a prebuilt sitemap (or its .gz sibling) from SITEMAP_ROOT"""
+    serve_gzip = compressed or accepts_encoding(request, 'gzip')
+
+    result = get_sitemap_file(f'{filename}.gz' if serve_gzip else filename)
+    if result is None:
+        raise Http404("Sitemap not found")
+    content, mtime = result
+
+    if not was_modified_since(request.headers.get('If-Modified-Since'), mtime):
+        return HttpResponseNotModified()
+
+    if compressed:
+        response = HttpResponse(content, content_type='application/gzip')
+    else:
+        response = HttpResponse(content, content_type='application/xml')
+        if serve_gzip:
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+    response['Last-Modified'] = http_date(mtime)
+    response['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
+    return response
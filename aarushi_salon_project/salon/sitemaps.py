@@ -1,31 +1,58 @@
 from django.contrib.sitemaps import Sitemap
+from django.db.models import Max
 from django.urls import reverse
-from .models import BlogPost, Service, GalleryImage, TeamMember, Testimonial
+from .models import (
+    BlogPost, Service, GalleryImage, TeamMember, Testimonial, ContactInfo, SiteContent
+)
+
+
+def latest_update(queryset, field='updated_at'):
+    """Return the newest value of ``field`` in ``queryset`` (or None if empty)"""
+    return queryset.aggregate(latest=Max(field))['latest']
+
 
 class StaticViewSitemap(Sitemap):
     """Sitemap for static pages"""
     priority = 0.8
     changefreq = 'weekly'
 
+    # Content that backs each page; a page's lastmod is the newest change in it
+    page_sources = {
+        'salon:home': [
+            lambda: Service.objects.filter(is_active=True),
+            lambda: Testimonial.objects.filter(is_active=True),
+            lambda: GalleryImage.objects.filter(is_active=True),
+            lambda: BlogPost.objects.filter(status='published'),
+            lambda: SiteContent.objects.filter(is_active=True),
+        ],
+        'salon:about': [
+            lambda: TeamMember.objects.filter(is_active=True),
+            lambda: SiteContent.objects.filter(is_active=True),
+        ],
+        'salon:services': [lambda: Service.objects.filter(is_active=True)],
+        'salon:gallery': [lambda: GalleryImage.objects.filter(is_active=True)],
+        'salon:team': [lambda: TeamMember.objects.filter(is_active=True)],
+        'salon:testimonials': [lambda: Testimonial.objects.filter(is_active=True)],
+        'salon:blog': [lambda: BlogPost.objects.filter(status='published')],
+        'salon:contact': [lambda: ContactInfo.objects.filter(is_active=True)],
+        'salon:pricing': [lambda: Service.objects.filter(is_active=True)],
+    }
+
+    def __init__(self):
+        self._lastmods = {}
+
     def items(self):
-        return [
-            'salon:home',
-            'salon:about',
-            'salon:services',
-            'salon:gallery',
-            'salon:team',
-            'salon:testimonials',
-            'salon:blog',
-            'salon:contact',
-            'salon:pricing',
-        ]
+        return list(self.page_sources)
 
     def location(self, item):
         return reverse(item)
 
     def lastmod(self, item):
-        from django.utils import timezone
-        return timezone.now()
+        if item not in self._lastmods:
+            dates = [latest_update(source()) for source in self.page_sources[item]]
+            dates = [d for d in dates if d is not None]
+            self._lastmods[item] = max(dates) if dates else None
+        return self._lastmods[item]
 
 
 class BlogPostSitemap(Sitemap):
@@ -34,7 +61,7 @@ class BlogPostSitemap(Sitemap):
     priority = 0.6
 
     def items(self):
-        return BlogPost.objects.filter(status='published', is_active=True)
+        return BlogPost.objects.filter(status='published').only('slug', 'updated_at')
 
     def lastmod(self, obj):
         return obj.updated_at
@@ -42,6 +69,9 @@ class BlogPostSitemap(Sitemap):
     def location(self, obj):
         return reverse('salon:blog_detail', kwargs={'slug': obj.slug})
 
+    def get_latest_lastmod(self):
+        return latest_update(BlogPost.objects.filter(status='published'))
+
 
 class ServiceSitemap(Sitemap):
     """Sitemap for services"""
@@ -49,55 +79,48 @@ class ServiceSitemap(Sitemap):
     priority = 0.7
 
     def items(self):
-        return Service.objects.filter(is_active=True)
+        return Service.objects.filter(is_active=True).only('id', 'updated_at')
 
     def lastmod(self, obj):
         return obj.updated_at
 
     def location(self, obj):
-        return reverse('salon:service_detail', kwargs={'pk': obj.pk})
+        return reverse('salon:service_detail', kwargs={'service_id': obj.pk})
+
+    def get_latest_lastmod(self):
+        return latest_update(Service.objects.filter(is_active=True))
 
 
 class GallerySitemap(Sitemap):
-    """Sitemap for gallery images"""
+    """Image sitemap for the gallery page"""
     changefreq = "monthly"
     priority = 0.5
 
     def items(self):
-        return GalleryImage.objects.filter(is_active=True)
-
-    def lastmod(self, obj):
-        return obj.created_at
-
-    def location(self, obj):
-        return reverse('salon:gallery')
-
-
-class TeamSitemap(Sitemap):
-    """Sitemap for team members"""
-    changefreq = "monthly"
-    priority = 0.6
+        return ['salon:gallery']
 
-    def items(self):
-        return TeamMember.objects.filter(is_active=True)
-
-    def lastmod(self, obj):
-        return obj.created_at
+    def location(self, item):
+        return reverse(item)
 
-    def location(self, obj):
-        return reverse('salon:team')
+    def lastmod(self, item):
+        return self.get_latest_lastmod()
 
+    def get_latest_lastmod(self):
+        return latest_update(GalleryImage.objects.filter(is_active=True))
 
-class TestimonialSitemap(Sitemap):
-    """Sitemap for testimonials"""
-    changefreq = "monthly"
-    priority = 0.5
-
-    def items(self):
-        return Testimonial.objects.filter(is_active=True)
+    def images(self, item):
+        """Return ``(url, title, caption)`` for every image shown on the gallery page"""
+        images = GalleryImage.objects.filter(is_active=True).exclude(image='')
+        return [
+            (img.image.url, img.title, img.description)
+            for img in images.only('image', 'title', 'description')
+        ]
 
-    def lastmod(self, obj):
-        return obj.created_at
 
-    def location(self, obj):
-        return reverse('salon:testimonials')
+# Sections published in the sitemap index, in order
+SITEMAPS = {
+    'static': StaticViewSitemap,
+    'blog': BlogPostSitemap,
+    'services': ServiceSitemap,
+    'gallery': GallerySitemap,
+}
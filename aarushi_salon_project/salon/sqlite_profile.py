@@ -0,0 +1,50 @@
+from django.conf import settings
+
+from aarushi_salon.database import SQLITE_OPTIONS
+
+
+# Per-connection PRAGMAs for serving the site from SQLite; settings.SQLITE_PRAGMAS
+# overrides individual entries (set one to None to leave SQLite's default).
+# busy_timeout isn't one of them: it always follows the connection's
+# OPTIONS['timeout'], so there is one setting for how long to wait for the write lock.
+DEFAULT_SQLITE_PRAGMAS = {
+    # Readers keep reading while a booking is being written
+    'journal_mode': 'WAL',
+    # Safe with WAL: a power loss can drop the last commits but never corrupts the file
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    # Negative values are KiB, i.e. a 32 MB page cache per connection
+    'cache_size': -32000,
+    'temp_store': 'MEMORY',
+}
+
+# PRAGMAs that only make sense for a database file
+FILE_ONLY_PRAGMAS = {'journal_mode', 'mmap_size'}
+
+
+def get_sqlite_pragmas(timeout=SQLITE_OPTIONS['timeout']):
+    """
+    Return the PRAGMAs to apply, with settings.SQLITE_PRAGMAS merged over the defaults
+    and busy_timeout set from ``timeout`` (seconds, as sqlite3.connect() takes it).
+    """
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+    pragmas['busy_timeout'] = int(timeout * 1000)
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def apply_sqlite_pragmas(conn, pragmas):
+    """Run ``PRAGMA name = value`` for each entry on a DB-API sqlite3 connection"""
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """connection_created receiver that applies the SQLite production profile"""
+    if connection.vendor != 'sqlite':
+        return
+    # sqlite3.connect() defaults to 5 seconds when OPTIONS has no timeout
+    pragmas = get_sqlite_pragmas(connection.settings_dict['OPTIONS'].get('timeout', 5))
+    if connection.is_in_memory_db():
+        pragmas = {name: value for name, value in pragmas.items() if name not in FILE_ONLY_PRAGMAS}
+    # Use the raw connection so the PRAGMAs don't show up in query logs and counts
+    apply_sqlite_pragmas(connection.connection, pragmas)
@@ -0,0 +1,171 @@
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    Appointment, AppointmentService, AppointmentSlot, CustomerFeedback, Testimonial,
+    DailyBookingStats, DailyServiceStats
+)
+from .task_queue import enqueue, task
+
+
+# Dates touched in the current thread that still need their rollup refreshed
+_pending = threading.local()
+
+
+def _day_range(day):
+    """Aware datetimes bounding ``day`` in the current time zone"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def refresh_daily_stats(day):
+    """
+    Recompute the rollup rows for one day.
+
+    Every query is restricted to that day, so the cost of a refresh does not grow
+    with the amount of booking history.
+    """
+    active = Q(status__in=['pending', 'confirmed', 'completed'])
+    start, end = _day_range(day)
+
+    with transaction.atomic():
+        # Read and write in one transaction, behind the day's row lock (BEGIN IMMEDIATE on
+        # SQLite), so a concurrent refresh can't store totals read before this one's
+        list(DailyBookingStats.objects.select_for_update().filter(date=day))
+        appointments = Appointment.objects.filter(preferred_date=day).aggregate(
+            bookings=Count('id', filter=active),
+            cancellations=Count('id', filter=Q(status='cancelled')),
+            revenue=Sum('total_price', filter=active),
+        )
+        slots = AppointmentSlot.objects.filter(date=day).aggregate(
+            total=Count('id'),
+            booked=Count('id', filter=Q(is_booked=True)),
+            open=Count('id', filter=Q(is_available=True, is_booked=False)),
+        )
+        feedback_count = 0
+        rating_total = 0
+        for model in (CustomerFeedback, Testimonial):
+            feedback = model.objects.filter(created_at__gte=start, created_at__lt=end).aggregate(
+                count=Count('id'), ratings=Sum('rating')
+            )
+            feedback_count += feedback['count']
+            rating_total += feedback['ratings'] or 0
+
+        service_rows = (
+            AppointmentService.objects
+            .filter(appointment__preferred_date=day)
+            .exclude(appointment__status='cancelled')
+            .values('service')
+            .annotate(bookings=Count('id'), revenue=Sum('service__price'))
+        )
+
+        DailyBookingStats.objects.update_or_create(date=day, defaults={
+            'bookings': appointments['bookings'],
+            'cancellations': appointments['cancellations'],
+            'revenue': appointments['revenue'] or Decimal('0'),
+            'slots_total': slots['total'],
+            'slots_booked': slots['booked'],
+            'slots_open': slots['open'],
+            'feedback_count': feedback_count,
+            'feedback_rating_total': rating_total,
+        })
+        DailyServiceStats.objects.filter(date=day).delete()
+        DailyServiceStats.objects.bulk_create([
+            DailyServiceStats(date=day, service_id=row['service'], bookings=row['bookings'], revenue=row['revenue'])
+            for row in service_rows
+        ])
+
+
+def refresh_stats_range(start_date, end_date):
+    """Refresh every day between two dates (inclusive); returns the number of days"""
+    day = start_date
+    days = 0
+    while day <= end_date:
+        refresh_daily_stats(day)
+        day += timedelta(days=1)
+        days += 1
+    return days
+
+
+@task(max_attempts=3, retry_delay=30)
+def refresh_stats_for_day(day):
+    refresh_daily_stats(date.fromisoformat(day))
+
+
+def _flush_pending_stats():
+    days = getattr(_pending, 'days', set())
+    _pending.days = set()
+    for day in sorted(days):
+        # A day that is already waiting for a worker will pick up these changes too
+        enqueue(refresh_stats_for_day, day=day, dedupe_key=f'stats:{day.isoformat()}')
+
+
+def schedule_stats_refresh(*days):
+    """
+    Queue a rollup refresh for ``days`` once the current transaction commits.
+
+    Dates from several events in one transaction are queued once each, and the
+    work itself runs in a worker (``manage.py run_worker``), off the request.
+    """
+    days = {day for day in days if day}
+    if not days:
+        return
+    if not hasattr(_pending, 'days'):
+        _pending.days = set()
+    _pending.days.update(days)
+
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(
+        func is _flush_pending_stats for _, func, _ in connection.run_on_commit
+    ):
+        return
+    transaction.on_commit(_flush_pending_stats)
+
+
+def schedule_stats_refresh_range(start_date, end_date):
+    """Schedule a refresh for every day between two dates (inclusive)"""
+    schedule_stats_refresh(*[start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)])
+
+
+def get_dashboard_data(start_date, end_date):
+    """Read dashboard figures for a date range from the rollup tables only"""
+    days = list(DailyBookingStats.objects.filter(date__gte=start_date, date__lte=end_date))
+    totals = DailyBookingStats.objects.filter(date__gte=start_date, date__lte=end_date).aggregate(
+        bookings=Sum('bookings'),
+        cancellations=Sum('cancellations'),
+        revenue=Sum('revenue'),
+        slots_total=Sum('slots_total'),
+        slots_booked=Sum('slots_booked'),
+        feedback_count=Sum('feedback_count'),
+        feedback_rating_total=Sum('feedback_rating_total'),
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    top_services = (
+        DailyServiceStats.objects
+        .filter(date__gte=start_date, date__lte=end_date)
+        .values('service__name')
+        .annotate(bookings=Sum('bookings'), revenue=Sum('revenue'))
+        .order_by('-bookings', '-revenue')[:5]
+    )
+
+    max_bookings = max((day.bookings for day in days), default=0)
+    for day in days:
+        day.utilization = round(100 * day.slots_booked / day.slots_total) if day.slots_total else 0
+        day.bar_width = round(100 * day.bookings / max_bookings) if max_bookings else 0
+
+    return {
+        'days': days,
+        'totals': totals,
+        'utilization': round(100 * totals['slots_booked'] / totals['slots_total']) if totals['slots_total'] else 0,
+        'average_rating': (
+            round(totals['feedback_rating_total'] / totals['feedback_count'], 1) if totals['feedback_count'] else None
+        ),
+        'top_services': list(top_services),
+        'start_date': start_date,
+        'end_date': end_date,
+    }
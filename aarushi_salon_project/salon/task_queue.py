@@ -0,0 +1,158 @@
+"""
+A small durable task queue stored in the salon_task table.
+
+Register a function with ``@task()`` and queue it with ``enqueue(func, **kwargs)``;
+``manage.py run_worker`` claims due tasks and runs them. Keyword arguments are
+stored as JSON, so dates arrive as ISO strings. Tasks run in autocommit mode and
+open their own transactions where they need them, so slow work (an SMTP
+conversation, say) never holds a write lock.
+
+Claiming is safe with any number of workers: PostgreSQL locks the rows with
+``SELECT ... FOR UPDATE SKIP LOCKED`` so workers never wait on each other, and
+other backends (SQLite) claim with a guarded ``UPDATE ... WHERE status = 'queued'``,
+which only one worker can win. A failed task is retried with exponential
+backoff and marked dead after its last attempt. A task left running by a
+worker that died is requeued after TASK_LOCK_TIMEOUT seconds.
+
+With TASKS_EAGER set, tasks run in-process when the enqueuing transaction
+commits, which is handy in development without a worker.
+"""
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+
+logger = logging.getLogger('salon.tasks')
+
+_registry = {}
+
+
+class TaskSpec:
+    def __init__(self, func, name, max_attempts, retry_delay, max_retry_delay):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+    def backoff(self, attempts):
+        """Seconds before retry number ``attempts``: doubling from retry_delay, with jitter"""
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+
+def task(name=None, max_attempts=5, retry_delay=10, max_retry_delay=3600):
+    """Register a function as a task; it is still called directly as usual"""
+    def register(func):
+        spec = TaskSpec(func, name or f'{func.__module__}.{func.__qualname__}', max_attempts, retry_delay, max_retry_delay)
+        _registry[spec.name] = spec
+        func.task_name = spec.name
+        return func
+    return register
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def enqueue(func, run_at=None, dedupe_key='', **kwargs):
+    """
+    Queue ``func(**kwargs)`` to run in a worker; returns the Task (None when eager).
+
+    The row is written in the caller's transaction, so the task only becomes
+    visible to workers if that transaction commits. With ``dedupe_key``, nothing
+    is added while a queued task with the same key is still waiting.
+    """
+    spec = _registry[getattr(func, 'task_name', func)]
+    payload = json.loads(json.dumps(kwargs, cls=DjangoJSONEncoder))
+    if getattr(settings, 'TASKS_EAGER', False):
+        transaction.on_commit(lambda: spec.func(**payload))
+        return None
+    if dedupe_key:
+        existing = Task.objects.filter(dedupe_key=dedupe_key, status='queued').first()
+        if existing:
+            return existing
+    return Task.objects.create(
+        name=spec.name, payload=payload, max_attempts=spec.max_attempts,
+        run_at=run_at or timezone.now(), dedupe_key=dedupe_key,
+    )
+
+
+# Worker side
+
+def claim_tasks(worker_id, limit=10):
+    """Mark up to ``limit`` due tasks as running by ``worker_id`` and return them"""
+    now = timezone.now()
+    due = Task.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'pk')
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+        else:
+            ids = list(due.values_list('pk', flat=True)[:limit])
+        # The status guard makes the claim atomic where rows can't be locked
+        Task.objects.filter(pk__in=ids, status='queued').update(
+            status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+    return list(Task.objects.filter(pk__in=ids, status='running', locked_by=worker_id, locked_at=now).order_by('run_at', 'pk'))
+
+
+def run_task(task_row):
+    """Run a claimed task and record the outcome; returns True on success"""
+    spec = get_task(task_row.name)
+    try:
+        if spec is None:
+            raise LookupError(f'No task registered as "{task_row.name}"')
+        spec.func(**task_row.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if spec is None or task_row.attempts >= task_row.max_attempts:
+            Task.objects.filter(pk=task_row.pk).update(
+                status='dead', last_error=error, finished_at=timezone.now(), locked_by='', locked_at=None,
+            )
+            logger.error('Task %s #%s failed for good after %s attempt(s)', task_row.name, task_row.pk, task_row.attempts)
+        else:
+            retry_at = timezone.now() + timedelta(seconds=spec.backoff(task_row.attempts))
+            Task.objects.filter(pk=task_row.pk).update(
+                status='queued', run_at=retry_at, last_error=error, locked_by='', locked_at=None,
+            )
+            logger.warning('Task %s #%s failed (attempt %s), retrying at %s', task_row.name, task_row.pk, task_row.attempts, retry_at)
+        return False
+    Task.objects.filter(pk=task_row.pk).update(
+        status='done', finished_at=timezone.now(), locked_by='', locked_at=None,
+    )
+    return True
+
+
+def release_tasks(tasks):
+    """Return claimed tasks that were never started to the queue, without using up an attempt"""
+    Task.objects.filter(pk__in=[task_row.pk for task_row in tasks], status='running').update(
+        status='queued', locked_by='', locked_at=None, attempts=F('attempts') - 1,
+    )
+
+
+def requeue_stale_tasks():
+    """Give tasks whose worker disappeared mid-run back to the queue (or mark them dead)"""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'TASK_LOCK_TIMEOUT', 600))
+    stale = Task.objects.filter(status='running', locked_at__lt=cutoff)
+    error = 'Worker stopped before the task finished'
+    dead = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='dead', last_error=error, finished_at=timezone.now(), locked_by='', locked_at=None,
+    )
+    requeued = stale.update(status='queued', run_at=timezone.now(), last_error=error, locked_by='', locked_at=None)
+    return requeued, dead
+
+
+def purge_finished_tasks():
+    """Delete done tasks older than TASK_RETENTION_DAYS; dead ones stay for inspection"""
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'TASK_RETENTION_DAYS', 7))
+    return Task.objects.filter(status='done', finished_at__lt=cutoff).delete()[0]
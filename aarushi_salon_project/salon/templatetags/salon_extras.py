@@ -1,4 +1,11 @@
 from django import template
+from django.templatetags.static import static
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from ..assets import BUNDLES, bundle_path, critical_css_for
+from ..fonts import font_faces
 
 register = template.Library()
 
@@ -10,3 +17,49 @@ def lookup(dictionary, key):
     return None
 
 
+DEFERRED_STYLESHEET = (
+    '<link rel="preload" href="{0}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+    '<noscript><link href="{0}" rel="stylesheet"></noscript>'
+)
+
+
+@register.simple_tag
+def asset_bundle(name, defer=False):
+    """
+    Link a built asset bundle (see salon.assets), or its source files if it hasn't been built.
+
+    Scripts are always ``defer``; stylesheets are loaded without blocking
+    rendering when ``defer`` is true (i.e. the page has inlined critical CSS).
+    """
+    built = bundle_path(name)
+    files = [built] if built else BUNDLES[name]
+    if not name.endswith('.css'):
+        html = '<script src="{}" defer></script>'
+    elif defer:
+        html = DEFERRED_STYLESHEET
+    else:
+        html = '<link href="{}" rel="stylesheet">'
+    return format_html_join('\n    ', html, ((static(path),) for path in files))
+
+
+@register.simple_tag
+def stylesheet(href, defer=False):
+    """A stylesheet link, non-blocking when ``defer`` is true"""
+    return format_html(DEFERRED_STYLESHEET if defer else '<link href="{}" rel="stylesheet">', href)
+
+
+@register.simple_tag(takes_context=True)
+def critical_css(context):
+    """This page's built above-the-fold CSS (salon.critical_css), or '' without a build or with CRITICAL_CSS off"""
+    request = context.get('request')
+    if not getattr(settings, 'CRITICAL_CSS', True) or request is None or request.resolver_match is None:
+        return ''
+    css = critical_css_for(request.resolver_match.view_name)
+    # Built from our own stylesheets, but never let it end the <style> element
+    return mark_safe(css.replace('</', '<\\/'))
+
+
+@register.simple_tag
+def theme_fonts_fallback():
+    """The Google Fonts stylesheet for the theme families that haven't been vendored (salon.fonts), or ''"""
+    return font_faces()[2]
@@ -1,12 +1,24 @@
-from django.urls import path
-from django.contrib.sitemaps.views import sitemap
-from . import views
-from .sitemaps import StaticViewSitemap, BlogPostSitemap, ServiceSitemap, GallerySitemap, TeamSitemap, TestimonialSitemap
+from django.conf import settings
+from django.urls import path, re_path
+from . import api_views, views
+from .metrics_views import metrics
+from .sitemap_views import sitemap_file
 from .robots_views import robots_txt
-from .api_views import GetAvailableSlotsView, GetAvailableDatesView, CheckSlotAvailabilityView, get_services_api
 
 app_name = 'salon'
 
+# Under ASGI the booking APIs use the async ORM; WSGI keeps the sync views
+if settings.ASYNC_API_VIEWS:
+    available_slots_view = api_views.AsyncGetAvailableSlotsView.as_view()
+    available_dates_view = api_views.AsyncGetAvailableDatesView.as_view()
+    check_slot_availability_view = api_views.AsyncCheckSlotAvailabilityView.as_view()
+    services_api_view = api_views.async_get_services_api
+else:
+    available_slots_view = api_views.GetAvailableSlotsView.as_view()
+    available_dates_view = api_views.GetAvailableDatesView.as_view()
+    check_slot_availability_view = api_views.CheckSlotAvailabilityView.as_view()
+    services_api_view = api_views.get_services_api
+
 urlpatterns = [
     path('', views.home, name='home'),
     path('about/', views.about, name='about'),
@@ -23,21 +35,16 @@ urlpatterns = [
     path('dynamic-theme.css', views.dynamic_theme_css, name='dynamic_theme_css'),
     
     # API URLs for appointment booking
-    path('api/available-slots/', GetAvailableSlotsView.as_view(), name='available_slots_api'),
-    path('api/available-dates/', GetAvailableDatesView.as_view(), name='available_dates_api'),
-    path('api/check-slot-availability/', CheckSlotAvailabilityView.as_view(), name='check_slot_availability_api'),
-    path('api/services/', get_services_api, name='services_api'),
+    path('api/available-slots/', available_slots_view, name='available_slots_api'),
+    path('api/available-dates/', available_dates_view, name='available_dates_api'),
+    path('api/check-slot-availability/', check_slot_availability_view, name='check_slot_availability_api'),
+    path('api/services/', services_api_view, name='services_api'),
     
     # SEO URLs
-    path('sitemap.xml', sitemap, {
-        'sitemaps': {
-            'static': StaticViewSitemap,
-            'blog': BlogPostSitemap,
-            'services': ServiceSitemap,
-            'gallery': GallerySitemap,
-            'team': TeamSitemap,
-            'testimonials': TestimonialSitemap,
-        }
-    }, name='django.contrib.sitemaps.views.sitemap'),
+    re_path(r'^(?P<filename>sitemap(?:-[\w-]+)?\.xml)$', sitemap_file, name='sitemap'),
+    re_path(r'^(?P<filename>sitemap(?:-[\w-]+)?\.xml)\.gz$', sitemap_file, {'compressed': True}, name='sitemap_gz'),
     path('robots.txt', robots_txt, name='robots_txt'),
+
+    # Monitoring
+    path('metrics', metrics, name='metrics'),
 ]
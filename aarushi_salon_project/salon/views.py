@@ -1,28 +1,35 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count
 from django.template.loader import render_to_string
-from datetime import datetime, timedelta
 import json
+import logging
 
 from .models import (
     ServiceCategory, Service, TeamMember, Testimonial, 
-    GalleryImage, BlogPost, ContactInfo, Appointment, SiteContent, ContactMessage
+    GalleryImage, BlogPost, ContactInfo, Appointment, AppointmentService, SiteContent, ContactMessage
 )
-from .forms import AppointmentBookingForm
+from .fonts import font_faces
+from .forms import AppointmentBookingForm, BookingRequestForm, ContactRequestForm
+from .idempotency import idempotent
 from django.contrib import messages
 
 
+logger = logging.getLogger(__name__)
+
+
 def home(request):
     """Home page view"""
     # Get featured services
     featured_services = Service.objects.filter(is_featured=True, is_active=True)[:6]
     
     # Get all service categories for navigation
-    service_categories = ServiceCategory.objects.filter(is_active=True)
+    service_categories = ServiceCategory.objects.filter(is_active=True).prefetch_related('services')
     
     # Get testimonials (admin-created) - filter out empty content
     testimonials = Testimonial.objects.filter(
@@ -262,7 +269,11 @@ def testimonials(request):
 
 def blog(request):
     """Blog page view"""
-    blog_posts = BlogPost.objects.filter(status='published')
+    blog_posts = (
+        BlogPost.objects.filter(status='published')
+        .annotate(comment_count=Count('comments'))
+        .order_by('-created_at')
+    )
     
     # Pagination
     paginator = Paginator(blog_posts, 6)  # 6 posts per page
@@ -305,8 +316,8 @@ def blog_detail(request, slug):
             messages.success(request, 'Your comment has been submitted and will be reviewed.')
             return redirect('salon:blog_detail', slug=slug)
     
-    # Get approved comments
-    comments = post.comments.filter(is_approved=True)
+    # Get approved comments (evaluated once; the template shows the count twice)
+    comments = list(post.comments.filter(is_approved=True))
     
     recent_posts = BlogPost.objects.filter(
         status='published'
@@ -323,33 +334,29 @@ def blog_detail(request, slug):
     return render(request, 'salon/blog_detail_perfectcut.html', context)
 
 
+@idempotent
 def contact_simple(request):
     """Simple contact page matching the real website"""
     if request.method == 'POST':
-        try:
-            data = json.loads(request.body)
-            
-            # Create contact message
-            contact_message = ContactMessage.objects.create(
-                name=data.get('name', ''),
-                email=data.get('email', ''),
-                phone=data.get('phone', ''),
-                subject=data.get('subject', ''),
-                message=data.get('message', ''),
-                status='new'
-            )
-            
-            return JsonResponse({
-                'success': True,
-                'message': 'Message sent successfully! We will get back to you soon.',
-                'message_id': contact_message.id
-            })
-            
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            })
+        form = ContactRequestForm.from_request(request)
+        if not form.is_valid():
+            return form.error_response()
+        data = form.cleaned_data
+
+        contact_message = ContactMessage.objects.create(
+            name=data['name'],
+            email=data['email'],
+            phone=data['phone'],
+            subject=data['subject'],
+            message=data['message'],
+            status='new'
+        )
+
+        return JsonResponse({
+            'success': True,
+            'message': 'Message sent successfully! We will get back to you soon.',
+            'message_id': contact_message.id
+        })
     
     # Get contact info and service categories
     contact_info = ContactInfo.objects.filter(is_active=True).first()
@@ -375,35 +382,37 @@ def contact(request):
     return render(request, 'salon/contact_perfectcut.html', context)
 
 
+@idempotent
 def book_appointment_simple(request):
     """Simple appointment booking page matching the real website"""
     if request.method == 'POST':
-        try:
-            data = json.loads(request.body)
-            
-            # Create appointment
+        form = BookingRequestForm.from_request(request)
+        if not form.is_valid():
+            return form.error_response()
+        data = form.cleaned_data
+
+        with transaction.atomic():
             appointment = Appointment.objects.create(
-                first_name=data.get('full_name', '').split(' ')[0] if data.get('full_name') else '',
-                last_name=' '.join(data.get('full_name', '').split(' ')[1:]) if data.get('full_name') and len(data.get('full_name', '').split(' ')) > 1 else '',
-                email=data.get('email', ''),
-                phone=data.get('phone', ''),
-                preferred_date=datetime.strptime(data.get('date'), '%Y-%m-%d').date() if data.get('date') else None,
-                preferred_time=datetime.strptime(data.get('time'), '%H:%M').time() if data.get('time') else None,
-                message=data.get('message', ''),
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                email=data['email'],
+                phone=data['phone'],
+                preferred_date=data['date'],
+                preferred_time=data['time'],
+                message=data['message'],
                 status='pending'
             )
-            
-            return JsonResponse({
-                'success': True,
-                'message': 'Appointment request submitted successfully!',
-                'booking_reference': appointment.booking_reference
-            })
-            
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            })
+            AppointmentService.objects.bulk_create([
+                AppointmentService(appointment=appointment, service_id=service_id)
+                for service_id in data['service_ids']
+            ])
+            appointment.calculate_totals()
+
+        return JsonResponse({
+            'success': True,
+            'message': 'Appointment request submitted successfully!',
+            'booking_reference': appointment.booking_reference
+        })
     
     return render(request, 'salon/book_appointment_perfectcut_new.html')
 
@@ -460,9 +469,9 @@ def book_appointment(request):
     services = Service.objects.filter(is_active=True)
     contact_info = ContactInfo.objects.filter(is_active=True).first()
     
-    # Debug: Print form choices
-    print("Date choices:", form.fields['appointment_date'].widget.choices)
-    print("Services count:", services.count())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Date choices: %s", form.fields['appointment_date'].widget.choices)
+        logger.debug("Services count: %d", services.count())
     
     context = {
         'form': form,
@@ -507,7 +516,8 @@ def book_appointment_ajax(request):
 
 def dynamic_theme_css(request):
     """Serve dynamic CSS based on theme settings"""
-    css_content = render_to_string('salon/dynamic_theme.css')
+    fonts, faces, _ = font_faces()
+    css_content = render_to_string('salon/dynamic_theme.css', {'fonts': fonts, 'font_faces': faces})
     response = HttpResponse(css_content, content_type='text/css')
     response['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
     return response
\ No newline at end of file